@@ -0,0 +1,33 @@
+from datetime import datetime
+import json
+import logging
+from shared_code.services.orchestrator_service import HTTP_DEADLINE_SECONDS, OrchestratorService
+
+import azure.functions as func
+
+# One service per worker; backfills reuse its settings and stores
+_service = OrchestratorService()
+
+
+def main(req: func.HttpRequest) -> func.HttpResponse:
+    logging.info('Python HTTP trigger function processed a backfill request.')
+
+    start = req.params.get('start')
+    end = req.params.get('end')
+    try:
+        start_date = datetime.strptime(start, '%Y-%m-%d').date()
+        end_date = datetime.strptime(end, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return func.HttpResponse(
+            'Query parameters start and end are required in YYYY-MM-DD format',
+            status_code=400
+        )
+
+    # Unfinished windows are reported as pending and resumed by the next call
+    report = _service.backfillInverterPower(start_date, end_date, deadline_seconds=HTTP_DEADLINE_SECONDS)
+
+    return func.HttpResponse(
+        json.dumps(report),
+        status_code=500 if 'error' in report else 200,
+        mimetype='application/json'
+    )
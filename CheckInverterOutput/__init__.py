@@ -1,19 +1,59 @@
-from datetime import datetime
-import logging
-from shared_code.services.orchestrator_service import OrchestratorService
-
-import azure.functions as func
-
-
-def main(req: func.HttpRequest) -> func.HttpResponse:
-    logging.info('Python HTTP trigger function processed a request.')
-
-    date = req.params.get('date')
-    service = OrchestratorService()
-    result = service.checkInverterPower(
-        datetime.strptime(date, '%Y-%m-%d'))
-
-    return func.HttpResponse(
-        result,
-        status_code=200
-    )
+from datetime import datetime
+import logging
+from shared_code.models.check_report import MIMETYPES, formatReport, getOutputFormat
+from shared_code.services.orchestrator_service import OrchestratorService
+
+import azure.functions as func
+
+# Built once per worker so warm invocations reuse parsed settings, caches and connections
+_service = OrchestratorService()
+
+
+async def main(req: func.HttpRequest) -> func.HttpResponse:
+    logging.info('Python HTTP trigger function processed a request.')
+
+    date = req.params.get('date')
+    try:
+        check_date = datetime.strptime(date, '%Y-%m-%d').date() if date else None
+    except ValueError:
+        return func.HttpResponse(
+            'Query parameter date must be in YYYY-MM-DD format',
+            status_code=400
+        )
+
+    requested_format = req.params.get('format')
+    if getOutputFormat(requested_format, None) is None:
+        return func.HttpResponse(
+            'Query parameter format must be text, json or ndjson',
+            status_code=400
+        )
+
+    # Identical concurrent requests share one check; repeats are served from the result cache.
+    # SolarEdge requests are awaited, so other requests on this worker run while they wait
+    result = await _service.getCheckResponseAsync(check_date)
+    report, text = result.value
+    output_format = getOutputFormat(requested_format, req.headers.get('Accept'), text is not None)
+    max_age = result.getMaxAge()
+    # Results of past days are the same for every caller, so shared caches may keep them too
+    scope = 'public' if check_date is not None and check_date < datetime.now().date() else 'private'
+    headers = {
+        'Cache-Control': f'{scope}, max-age={max_age}' if max_age else 'no-store',
+        'X-Cache': result.status,
+        'Vary': 'Accept'
+    }
+    if result.etag:
+        # Each format is a different representation of the same result
+        etag = f'{result.etag[:-1]}-{output_format}"'
+        headers['ETag'] = etag
+        # Also answered after the cached result expired: the recomputed result is compared, and an unchanged one
+        # still saves sending the body
+        if_none_match = req.headers.get('If-None-Match', '')
+        if etag in [tag.strip() for tag in if_none_match.split(',')]:
+            return func.HttpResponse(status_code=304, headers=headers)
+
+    return func.HttpResponse(
+        formatReport(report, text, output_format),
+        status_code=200,
+        mimetype=MIMETYPES[output_format],
+        headers=headers
+    )
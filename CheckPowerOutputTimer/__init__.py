@@ -1,19 +1,28 @@
-import datetime
-import logging
-from shared_code.services.orchestrator_service import OrchestratorService
-
-import azure.functions as func
-
-
-def main(mytimer: func.TimerRequest) -> None:
-    utc_timestamp = datetime.datetime.utcnow().replace(
-        tzinfo=datetime.timezone.utc).isoformat()
-
-    if mytimer.past_due:
-        logging.info('The timer is past due!')
-
-    service = OrchestratorService()
-    result = service.checkInverterPower(None)
-    logging.info(result)
-
-    logging.info('Python timer trigger function ran at %s', utc_timestamp)
+import asyncio
+import datetime
+import json
+import logging
+from shared_code.services.orchestrator_service import OrchestratorService
+from shared_code.services.request_scheduler import PRIORITY_SCHEDULED
+
+import azure.functions as func
+
+# Shared by every run in this worker
+_service = OrchestratorService()
+
+
+async def main(mytimer: func.TimerRequest) -> None:
+    utc_timestamp = datetime.datetime.utcnow().replace(
+        tzinfo=datetime.timezone.utc).isoformat()
+
+    if mytimer.past_due:
+        logging.info('The timer is past due!')
+
+    if _service.isFleetConfigured():
+        report = await asyncio.to_thread(_service.checkFleetPower, None, None, PRIORITY_SCHEDULED)
+        result = json.dumps(report)
+    else:
+        result = await _service.checkInverterPowerAsync(None, PRIORITY_SCHEDULED)
+    logging.info(result)
+
+    logging.info('Python timer trigger function ran at %s', utc_timestamp)
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Benchmark the monitoring pipeline against the local SolarEdge simulator.
+
+Measures latency percentiles, throughput and peak memory of getAllInverterPower,
+checkInverterPower, checkFleetPower and backfills as inverter count, site count and
+window length grow. Results are written as JSON so runs can be compared over time.
+
+Usage:
+    python benchmarks/benchmark_pipeline.py --output bench_output.json
+    python benchmarks/benchmark_pipeline.py --quick
+"""
+import argparse
+import datetime
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from benchmarks.solaredge_simulator import SolarEdgeSimulator
+from shared_code.models.site_config import SiteConfig
+from shared_code.services.backfill_service import BackfillService
+from shared_code.services.data_manager import DataManager
+from shared_code.services.orchestrator_service import OrchestratorService
+from shared_code.services.parallel_analyzer import getParallelAnalyzer
+from shared_code.services.telemetry_store import TelemetryStore
+
+BENCHMARK_DATE = datetime.date(2025, 6, 21)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def measure(run, repeat, simulator):
+    """Run a benchmark body repeatedly and summarize latency, memory and traffic"""
+    # Warm-up run so connection setup and imports are not counted
+    run()
+
+    simulator.resetCounters()
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        latencies.append((time.perf_counter() - started) * 1000.0)
+    requests_per_run = simulator.request_count / repeat
+    bytes_per_run = simulator.bytes_sent / repeat
+    errors = simulator.error_count
+
+    # Separate run for memory, since tracing slows everything down
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'runs': repeat,
+        'latency_ms': {
+            'mean': statistics.mean(latencies),
+            'min': min(latencies),
+            'p50': percentile(latencies, 0.50),
+            'p90': percentile(latencies, 0.90),
+            'p99': percentile(latencies, 0.99),
+            'max': max(latencies)
+        },
+        'peak_memory_mb': peak / 1e6,
+        'requests_per_run': requests_per_run,
+        'response_bytes_per_run': bytes_per_run,
+        'errors': errors
+    }
+
+
+def benchmarkInverters(simulator, inverter_counts, window_hours, max_workers, repeat, stream):
+    results = []
+    for inverters in inverter_counts:
+        for hours in window_hours:
+            simulator.inverters_per_site = inverters
+            start = datetime.datetime.combine(BENCHMARK_DATE, datetime.time(12, 0))
+            if hours >= 24:
+                start = datetime.datetime.combine(BENCHMARK_DATE, datetime.time(0, 0))
+            end = start + datetime.timedelta(hours=hours) - datetime.timedelta(seconds=1)
+            data_manager = DataManager(max_workers=max_workers, stream_telemetry=stream)
+
+            def run():
+                data_manager.getAllInverterPower(
+                    simulator.url, 'BENCH', 'bench-key',
+                    start.strftime('%Y-%m-%d %H:%M:%S'), end.strftime('%Y-%m-%d %H:%M:%S'), 200.0)
+
+            result = measure(run, repeat, simulator)
+            result['benchmark'] = 'getAllInverterPower'
+            result['parameters'] = {'inverters': inverters, 'window_hours': hours, 'max_workers': max_workers, 'stream': stream}
+            result['throughput_inverters_per_s'] = inverters / (result['latency_ms']['mean'] / 1000.0)
+            results.append(result)
+            logging.info(f'getAllInverterPower inverters={inverters} hours={hours}: p50={result["latency_ms"]["p50"]:.1f}ms')
+    return results
+
+
+def benchmarkCheck(simulator, inverter_counts, repeat):
+    results = []
+    service = OrchestratorService()
+    for inverters in inverter_counts:
+        simulator.inverters_per_site = inverters
+
+        def run():
+            service.checkInverterPower(BENCHMARK_DATE)
+
+        result = measure(run, repeat, simulator)
+        result['benchmark'] = 'checkInverterPower'
+        result['parameters'] = {'inverters': inverters}
+        result['throughput_inverters_per_s'] = inverters / (result['latency_ms']['mean'] / 1000.0)
+        results.append(result)
+        logging.info(f'checkInverterPower inverters={inverters}: p50={result["latency_ms"]["p50"]:.1f}ms')
+    return results
+
+
+def benchmarkFleet(simulator, site_counts, inverters, repeat):
+    results = []
+    service = OrchestratorService()
+    simulator.inverters_per_site = inverters
+    for sites in site_counts:
+        fleet = [SiteConfig(f'SITE{index:04d}', f'key-{index}', 200.0, simulator.url) for index in range(sites)]
+
+        def run():
+            service.checkFleetPower(fleet, BENCHMARK_DATE)
+
+        result = measure(run, repeat, simulator)
+        result['benchmark'] = 'checkFleetPower'
+        result['parameters'] = {'sites': sites, 'inverters_per_site': inverters}
+        result['throughput_inverters_per_s'] = sites * inverters / (result['latency_ms']['mean'] / 1000.0)
+        results.append(result)
+        logging.info(f'checkFleetPower sites={sites}: p50={result["latency_ms"]["p50"]:.1f}ms')
+    return results
+
+
+def benchmarkBackfill(simulator, inverter_counts, day_counts, max_workers, processes, repeat):
+    """Backfill per-minute telemetry from a warm telemetry store, so aggregation rather than the API dominates"""
+    results = []
+    store_dir = tempfile.mkdtemp(prefix='solaredge-bench-')
+    simulator.sample_interval_minutes = 1
+    try:
+        telemetry_store = TelemetryStore(os.path.join(store_dir, 'telemetry.db'))
+        for inverters in inverter_counts:
+            simulator.inverters_per_site = inverters
+            for days in day_counts:
+                start_date = BENCHMARK_DATE - datetime.timedelta(days=days - 1)
+                for pool_processes in sorted({0, processes}):
+                    analyzer = getParallelAnalyzer(pool_processes) if pool_processes else None
+                    backfill = BackfillService(DataManager(max_workers=max_workers, telemetry_store=telemetry_store),
+                                               max_parallel_chunks=max_workers, analyzer=analyzer)
+
+                    def run():
+                        backfill.runBackfill(simulator.url, 'BENCH', 'bench-key', start_date, BENCHMARK_DATE, 200.0)
+
+                    result = measure(run, repeat, simulator)
+                    result['benchmark'] = 'backfill'
+                    result['parameters'] = {'inverters': inverters, 'days': days, 'analysis_processes': pool_processes}
+                    result['throughput_inverter_days_per_s'] = inverters * days / (result['latency_ms']['mean'] / 1000.0)
+                    results.append(result)
+                    logging.info(f'backfill inverters={inverters} days={days} processes={pool_processes}: '
+                                 f'p50={result["latency_ms"]["p50"]:.1f}ms')
+    finally:
+        simulator.sample_interval_minutes = 5
+        shutil.rmtree(store_dir, ignore_errors=True)
+    return results
+
+
+def configureEnvironment(simulator, max_workers):
+    """Point the service at the simulator and switch off caches, quotas and email"""
+    os.environ.update({
+        'baseURL': simulator.url,
+        'siteId': 'BENCH',
+        'solarEdgeApiKey': 'bench-key',
+        'alertPowerThreshold': '200',
+        'maxConcurrentRequests': str(max_workers),
+        'equipmentCacheTtlSeconds': '0',
+        'apiDailyQuota': '0',
+        'apiRequestsPerSecond': '1000000',
+        'apiRequestBurst': '1000000',
+        'apiMaxConcurrentRequestsPerKey': '1000',
+        'apiMaxRetries': '0'
+    })
+    for key in ('sendGridApiKey', 'toEmail', 'fromEmail', 'telemetryStorePath', 'alertStatePath', 'fleetSites'):
+        os.environ.pop(key, None)
+
+
+def getGitCommit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=project_root, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the SolarEdge monitoring pipeline offline')
+    parser.add_argument('--output', help='write JSON results to this file (default: stdout)')
+    parser.add_argument('--repeat', type=int, default=5, help='measured runs per scenario')
+    parser.add_argument('--latency-ms', type=float, default=20.0, help='simulated API latency')
+    parser.add_argument('--latency-jitter-ms', type=float, default=20.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--max-workers', type=int, default=8, help='DataManager max_workers')
+    parser.add_argument('--stream', action='store_true', help='use streaming telemetry parsing')
+    parser.add_argument('--analysis-processes', type=int, default=os.cpu_count() or 1,
+                        help='worker processes for the backfill analysis scenarios')
+    parser.add_argument('--quick', action='store_true', help='run a reduced scenario grid')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    # The services log every request; keep benchmark output readable
+    logging.getLogger().setLevel(logging.WARNING)
+
+    if args.quick:
+        inverter_counts, window_hours, site_counts, backfill_days = [1, 8], [1, 24], [1, 4], [28]
+    else:
+        inverter_counts, window_hours, site_counts, backfill_days = [1, 8, 32, 128], [1, 24, 168], [1, 4, 16, 64], [28, 91]
+
+    simulator = SolarEdgeSimulator(latency_ms=args.latency_ms, latency_jitter_ms=args.latency_jitter_ms,
+                                   error_rate=args.error_rate).start()
+    configureEnvironment(simulator, args.max_workers)
+
+    try:
+        results = []
+        results += benchmarkInverters(simulator, inverter_counts, window_hours, args.max_workers, args.repeat, args.stream)
+        results += benchmarkCheck(simulator, inverter_counts, args.repeat)
+        results += benchmarkFleet(simulator, site_counts, inverter_counts[1], args.repeat)
+        results += benchmarkBackfill(simulator, inverter_counts[1:3], backfill_days, args.max_workers,
+                                     args.analysis_processes, args.repeat)
+    finally:
+        simulator.stop()
+
+    report = {
+        'metadata': {
+            'timestamp': datetime.datetime.utcnow().isoformat() + 'Z',
+            'git_commit': getGitCommit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'settings': vars(args)
+        },
+        'results': results
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+        print(f'Wrote {len(results)} benchmark results to {args.output}')
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
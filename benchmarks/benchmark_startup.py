@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Benchmark Function cold start and warm invocation time against the local SolarEdge simulator.
+
+Every cold sample runs in a fresh Python process: it imports the CheckInverterOutput entry
+point, invokes it once (cold) and then several more times (warm). The report also lists the
+slowest imports from `python -X importtime` and which heavy modules a plain check loads.
+
+Usage:
+    python benchmarks/benchmark_startup.py --output startup.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from benchmarks.solaredge_simulator import SolarEdgeSimulator
+
+HEAVY_MODULES = ('numpy', 'requests', 'sendgrid', 'aiohttp', 'pyarrow')
+
+# Runs in the child process; prints one JSON line with its timings
+CHILD_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import azure.functions as func
+import CheckInverterOutput
+imported = time.perf_counter()
+
+request = func.HttpRequest('GET', '/api/CheckInverterOutput', params={'date': sys.argv[1]}, body=b'')
+timings = []
+for _ in range(int(sys.argv[2]) + 1):
+    invocation_started = time.perf_counter()
+    response = CheckInverterOutput.main(request)
+    timings.append((time.perf_counter() - invocation_started) * 1000.0)
+    assert response.status_code == 200, response.get_body()
+
+print(json.dumps({
+    'import_ms': (imported - started) * 1000.0,
+    'cold_invocation_ms': timings[0],
+    'warm_invocation_ms': timings[1:],
+    'modules_loaded': {name: name in sys.modules for name in sys.argv[3].split(',')}
+}))
+"""
+
+
+def runChild(env, date, warm_invocations):
+    output = subprocess.check_output(
+        [sys.executable, '-c', CHILD_SCRIPT, date, str(warm_invocations), ','.join(HEAVY_MODULES)],
+        cwd=project_root, env=env, text=True, stderr=subprocess.DEVNULL)
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def getSlowestImports(env, count):
+    """Import the entry point under -X importtime and return the modules with the highest cumulative time"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import CheckInverterOutput'],
+                            cwd=project_root, env=env, text=True, capture_output=True)
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        imports.append({'module': name.strip(), 'cumulative_ms': int(cumulative) / 1000.0})
+    # Package names only; their submodules are already included in the package's cumulative time
+    top_level = [entry for entry in imports if '.' not in entry['module']]
+    return sorted(top_level, key=lambda entry: entry['cumulative_ms'], reverse=True)[:count]
+
+
+def summarize(values):
+    ordered = sorted(values)
+    return {
+        'mean': statistics.mean(ordered),
+        'p50': ordered[len(ordered) // 2],
+        'p90': ordered[min(len(ordered) - 1, int(round(0.9 * (len(ordered) - 1))))],
+        'min': ordered[0],
+        'max': ordered[-1]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Function cold start and warm invocations offline')
+    parser.add_argument('--output', help='write JSON results to this file (default: stdout)')
+    parser.add_argument('--cold-runs', type=int, default=5, help='fresh processes to start')
+    parser.add_argument('--warm-invocations', type=int, default=5, help='invocations after the first, per process')
+    parser.add_argument('--inverters', type=int, default=8)
+    parser.add_argument('--latency-ms', type=float, default=20.0, help='simulated API latency')
+    args = parser.parse_args()
+
+    simulator = SolarEdgeSimulator(inverters_per_site=args.inverters, latency_ms=args.latency_ms).start()
+    env = dict(os.environ)
+    env.update({
+        'PYTHONPATH': str(project_root),
+        'baseURL': simulator.url,
+        'siteId': 'BENCH',
+        'solarEdgeApiKey': 'bench-key',
+        'apiDailyQuota': '0',
+        'apiRequestsPerSecond': '1000000',
+        'apiRequestBurst': '1000000',
+        'apiMaxConcurrentRequestsPerKey': '1000',
+        'apiMaxRetries': '0'
+    })
+    for key in ('sendGridApiKey', 'toEmail', 'fromEmail', 'fleetSites', 'telemetryStorePath', 'alertStatePath'):
+        env.pop(key, None)
+
+    try:
+        samples = [runChild(env, '2025-06-21', args.warm_invocations) for _ in range(args.cold_runs)]
+    finally:
+        simulator.stop()
+
+    report = {
+        'metadata': {
+            'timestamp': datetime.datetime.utcnow().isoformat() + 'Z',
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'settings': vars(args)
+        },
+        'import_ms': summarize([sample['import_ms'] for sample in samples]),
+        'cold_invocation_ms': summarize([sample['cold_invocation_ms'] for sample in samples]),
+        'warm_invocation_ms': summarize([value for sample in samples for value in sample['warm_invocation_ms']]),
+        'modules_loaded': samples[0]['modules_loaded'],
+        'slowest_imports': getSlowestImports(env, 10)
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+        print(f'Wrote startup benchmark to {args.output}')
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the SolarEdge monitoring API equipment endpoints.
+
+Serves /equipment/{site}/list and /equipment/{site}/{serial}/data with synthetic
+telemetry, configurable latency, error rate and sample density, so the monitoring
+pipeline can be exercised and benchmarked without credentials or API quota.
+"""
+import argparse
+import datetime
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class SolarEdgeSimulator:
+
+    def __init__(self, host='127.0.0.1', port=0, inverters_per_site=4, latency_ms=0.0, latency_jitter_ms=0.0,
+                 error_rate=0.0, error_status=503, sample_interval_minutes=5, peak_power=5000.0,
+                 degraded_ratio=0.0, seed=0):
+        """
+        Args:
+            host: Interface to listen on
+            port: Port to listen on (0 picks a free port)
+            inverters_per_site: Inverters reported by every site's equipment list
+            latency_ms: Base latency added to every response
+            latency_jitter_ms: Random extra latency, uniform between 0 and this value
+            error_rate: Fraction of telemetry requests answered with error_status
+            error_status: HTTP status used for simulated errors (e.g. 429 or 503)
+            sample_interval_minutes: Spacing of telemetry samples, which sets response size per window
+            peak_power: Midday power in Watts of a healthy inverter
+            degraded_ratio: Fraction of inverters producing at 30% of normal output
+            seed: Seed for latency, errors and power noise
+        """
+        self.inverters_per_site = inverters_per_site
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.sample_interval_minutes = sample_interval_minutes
+        self.peak_power = peak_power
+        self.degraded_ratio = degraded_ratio
+        self.request_count = 0
+        self.error_count = 0
+        self.bytes_sent = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._createHandler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def resetCounters(self):
+        with self._lock:
+            self.request_count = 0
+            self.error_count = 0
+            self.bytes_sent = 0
+
+    def getSerials(self, site_id):
+        return [f'{site_id}-INV{index:04d}' for index in range(self.inverters_per_site)]
+
+    def buildEquipmentList(self, site_id):
+        return {
+            'reporters': {
+                'count': self.inverters_per_site,
+                'list': [
+                    {'name': f'Inverter {index + 1}', 'manufacturer': 'SolarEdge', 'model': 'SE7600H-US', 'serialNumber': serial}
+                    for index, serial in enumerate(self.getSerials(site_id))
+                ]
+            }
+        }
+
+    def buildTelemetry(self, serial, start_time, end_time):
+        start = datetime.datetime.strptime(start_time, '%Y-%m-%d %H:%M:%S')
+        end = datetime.datetime.strptime(end_time, '%Y-%m-%d %H:%M:%S')
+        # Per-inverter generator so responses are stable regardless of request order
+        noise = random.Random(serial)
+        degraded = noise.random() < self.degraded_ratio
+        step = datetime.timedelta(minutes=self.sample_interval_minutes)
+
+        telemetries = []
+        timestamp = start
+        total_energy = 0.0
+        while timestamp <= end:
+            hour = timestamp.hour + timestamp.minute / 60.0
+            daylight = max(0.0, math.sin(math.pi * (hour - 6.0) / 12.0))
+            power = self.peak_power * daylight * (0.3 if degraded else 1.0) * noise.uniform(0.9, 1.0)
+            total_energy += power * self.sample_interval_minutes / 60.0
+            telemetries.append({
+                'date': timestamp.strftime('%Y-%m-%d %H:%M:%S'),
+                'totalActivePower': round(power, 1),
+                'dcVoltage': round(380.0 + noise.uniform(-5, 5), 1) if power > 0 else None,
+                'groundFaultResistance': 11000.0,
+                'powerLimit': 100.0,
+                'totalEnergy': round(total_energy, 1),
+                'temperature': round(25.0 + 20.0 * daylight, 1),
+                'inverterMode': 'MPPT' if power > 0 else 'SLEEPING',
+                'operationMode': 0,
+                'L1Data': {
+                    'acCurrent': round(power / 240.0, 2),
+                    'acVoltage': 240.0,
+                    'acFrequency': 60.0,
+                    'apparentPower': round(power, 1),
+                    'activePower': round(power, 1),
+                    'reactivePower': 0.0,
+                    'cosPhi': 1.0
+                }
+            })
+            timestamp += step
+
+        return {'data': {'count': len(telemetries), 'telemetries': telemetries}}
+
+    def _createHandler(simulator):
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Buffer headers and body into one write, otherwise Nagle and delayed ACKs add ~40ms per response
+            wbufsize = -1
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                parts = [part for part in parsed.path.split('/') if part]
+                query = parse_qs(parsed.query)
+
+                with simulator._lock:
+                    simulator.request_count += 1
+                    delay = simulator.latency_ms + simulator._random.uniform(0, simulator.latency_jitter_ms)
+                    fail = simulator._random.random() < simulator.error_rate
+                if delay > 0:
+                    time.sleep(delay / 1000.0)
+
+                if 'api_key' not in query:
+                    return self._send(403, {'String': 'Invalid token'})
+
+                if len(parts) == 3 and parts[0] == 'equipment' and parts[2] == 'list':
+                    return self._send(200, simulator.buildEquipmentList(parts[1]))
+
+                if len(parts) == 4 and parts[0] == 'equipment' and parts[3] == 'data':
+                    if fail:
+                        with simulator._lock:
+                            simulator.error_count += 1
+                        return self._send(simulator.error_status, {'String': 'Simulated error'})
+                    try:
+                        body = simulator.buildTelemetry(parts[2], query['startTime'][0], query['endTime'][0])
+                    except (KeyError, ValueError):
+                        return self._send(400, {'String': 'startTime and endTime are required'})
+                    return self._send(200, body)
+
+                return self._send(404, {'String': 'Not found'})
+
+            def _send(self, status, body):
+                payload = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+                with simulator._lock:
+                    simulator.bytes_sent += len(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a local SolarEdge API simulator')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--inverters', type=int, default=4, help='inverters per site')
+    parser.add_argument('--latency-ms', type=float, default=50.0)
+    parser.add_argument('--latency-jitter-ms', type=float, default=50.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--sample-interval', type=int, default=5, help='minutes between telemetry samples')
+    parser.add_argument('--degraded-ratio', type=float, default=0.0)
+    args = parser.parse_args()
+
+    simulator = SolarEdgeSimulator(
+        args.host, args.port, args.inverters, args.latency_ms, args.latency_jitter_ms,
+        args.error_rate, args.error_status, args.sample_interval, degraded_ratio=args.degraded_ratio).start()
+    print(f'SolarEdge simulator listening on {simulator.url} (set baseURL to this address)')
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        simulator.stop()
+
+
+if __name__ == '__main__':
+    main()
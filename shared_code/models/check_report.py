@@ -0,0 +1,175 @@
+import json
+from typing import Iterator, List, Optional
+
+CHECK_OK = 'ok'
+CHECK_NO_DATA = 'no data'
+CHECK_ERROR = 'error'
+
+FORMAT_TEXT = 'text'
+FORMAT_JSON = 'json'
+FORMAT_NDJSON = 'ndjson'
+FORMATS = (FORMAT_TEXT, FORMAT_JSON, FORMAT_NDJSON)
+
+MIMETYPES = {
+    FORMAT_TEXT: 'text/plain',
+    FORMAT_JSON: 'application/json',
+    FORMAT_NDJSON: 'application/x-ndjson'
+}
+
+
+class CheckReport:
+    """
+    Outcome of a single-site check: per-inverter statistics and alert decisions, digest status and run timing
+
+    toDict has the same shape as a site entry of the fleet report, plus the date and run metrics.
+    """
+
+    def __init__(self, date, site_id=None, status=CHECK_OK, alert_threshold=None, inverters=None, alerts_sent=0,
+                 failed_inverters=None, digest=None, metrics=None, message=None, lines=None):
+        """
+        Args:
+            date: Day checked
+            status: CHECK_OK, CHECK_NO_DATA or CHECK_ERROR
+            inverters: Per-inverter reports (statistics, alert decision and status, violated rules)
+            digest: Alerts, recoveries and send status of the digest email, if one was sent
+            metrics: Run metrics record (duration and per-stage timing)
+            message: What went wrong, for runs that did not complete
+            lines: Human-readable result lines, one or more per inverter
+        """
+        self.date = str(date)
+        self.site_id = site_id
+        self.status = status
+        self.alert_threshold = alert_threshold
+        self.inverters = inverters or []
+        self.alerts_sent = alerts_sent
+        self.failed_inverters = failed_inverters or []
+        self.digest = digest
+        self.metrics = metrics
+        self.message = message
+        self.lines = lines or []
+
+    @staticmethod
+    def failed(date, message, status=CHECK_ERROR, site_id=None, metrics=None) -> 'CheckReport':
+        """Build the report of a check that did not complete"""
+        return CheckReport(date, site_id=site_id, status=status, metrics=metrics, message=message)
+
+    @property
+    def succeeded(self) -> bool:
+        """Whether the check completed for every inverter (only such results are cached)"""
+        return self.status == CHECK_OK and not self.failed_inverters
+
+    def toDict(self) -> dict:
+        """Get the report as plain data, e.g. for JSON responses"""
+        report = {
+            'date': self.date,
+            'site_id': self.site_id,
+            'status': self.status,
+            'alert_threshold': self.alert_threshold,
+            'inverters_checked': len(self.inverters),
+            'alerts_sent': self.alerts_sent,
+            'failed_inverters': self.failed_inverters,
+            'inverters': self.inverters
+        }
+        if self.digest is not None:
+            report['digest'] = self.digest
+        if self.message is not None:
+            report['error'] = self.message
+        if self.metrics is not None:
+            report['metrics'] = self.metrics
+        return report
+
+    def toText(self) -> str:
+        """Get the human-readable summary returned by checkInverterPower"""
+        if self.status != CHECK_OK:
+            return self.message
+        header = f'Checked {len(self.inverters)} inverters on {self.date}, sent {self.alerts_sent} alerts'
+        return header + '\n' + '\n'.join(self.lines)
+
+
+# Report keys that differ between runs over the same telemetry: timing and what became of the alert emails
+_RUN_KEYS = ('metrics', 'elapsed_seconds', 'digest', 'alerts_sent')
+_RUN_INVERTER_KEYS = ('alert_status', 'recovery_status')
+
+
+def getResultContent(report: dict) -> dict:
+    """
+    Get the part of a check or fleet report that identifies its result
+
+    Run timing, run ids and email outcomes are left out, so checks of unchanged telemetry get the same ETag.
+    """
+    content = {key: value for key, value in report.items() if key not in _RUN_KEYS and key not in ('sites', 'inverters')}
+    if 'sites' in report:
+        content['sites'] = [getResultContent(site) for site in report['sites']]
+    if 'inverters' in report:
+        content['inverters'] = [{key: value for key, value in inverter.items() if key not in _RUN_INVERTER_KEYS}
+                                for inverter in report['inverters']]
+    return content
+
+
+def iterReportRecords(report: dict) -> Iterator[dict]:
+    """
+    Flatten a check or fleet report into records: the run, then every site followed by its inverters
+
+    Every record has a 'type' ('fleet', 'site' or 'inverter'); site and inverter records carry the date and
+    site_id, so each line can be processed on its own.
+    """
+    if 'sites' in report:
+        yield dict({'type': 'fleet'}, **{key: value for key, value in report.items() if key != 'sites'})
+        for site in report['sites']:
+            yield from _iterSiteRecords(site, report['date'])
+    else:
+        yield from _iterSiteRecords(report, report['date'])
+
+
+def _iterSiteRecords(site: dict, date: str) -> Iterator[dict]:
+    record = {'type': 'site', 'date': date}
+    record.update((key, value) for key, value in site.items() if key != 'inverters')
+    yield record
+    for inverter in site.get('inverters', []):
+        yield dict({'type': 'inverter', 'date': date, 'site_id': site.get('site_id')}, **inverter)
+
+
+def iterNdjson(report: dict) -> Iterator[str]:
+    """Serialize a check or fleet report as newline-delimited JSON, one record per line"""
+    for record in iterReportRecords(report):
+        yield json.dumps(record) + '\n'
+
+
+def formatReport(report: dict, text: Optional[str], output_format: str) -> str:
+    """
+    Serialize a check or fleet report
+
+    Args:
+        report: Report as plain data
+        text: Human-readable summary, used for FORMAT_TEXT
+        output_format: FORMAT_TEXT, FORMAT_JSON or FORMAT_NDJSON
+    """
+    if output_format == FORMAT_NDJSON:
+        return ''.join(iterNdjson(report))
+    if output_format == FORMAT_TEXT:
+        return text
+    return json.dumps(report)
+
+
+def getOutputFormat(requested: Optional[str], accept: Optional[str], text_available: bool = True) -> Optional[str]:
+    """
+    Pick the response format from a format query parameter or the Accept header
+
+    Args:
+        text_available: Whether the report has a text summary (fleet reports are returned as JSON instead)
+
+    Returns:
+        One of FORMATS, or None if the requested format is not supported
+    """
+    if requested:
+        requested = requested.strip().lower()
+        if requested not in FORMATS:
+            return None
+        return FORMAT_JSON if requested == FORMAT_TEXT and not text_available else requested
+
+    accepted: List[str] = [part.split(';')[0].strip().lower() for part in (accept or '').split(',')]
+    if MIMETYPES[FORMAT_NDJSON] in accepted:
+        return FORMAT_NDJSON
+    if MIMETYPES[FORMAT_JSON] in accepted:
+        return FORMAT_JSON
+    return FORMAT_TEXT if text_available else FORMAT_JSON
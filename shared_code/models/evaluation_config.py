@@ -0,0 +1,85 @@
+import datetime
+
+RULE_POWER = 'power'
+RULE_ENERGY = 'energy'
+RULE_BAND = 'band'
+RULE_PEER_RATIO = 'peer_ratio'
+
+RULE_TYPES = (RULE_POWER, RULE_ENERGY, RULE_BAND, RULE_PEER_RATIO)
+
+# Window statistics a peer ratio rule can compare
+PEER_METRICS = ('average', 'last', 'maximum', 'energy_wh')
+
+
+class EvaluationWindow:
+    __slots__ = ('name', 'start', 'end')
+
+    def __init__(self, name, start, end):
+        """
+        Args:
+            name: Window name used in rules and reports
+            start: Start time of day, 'HH:MM' or 'HH:MM:SS' (inclusive)
+            end: End time of day, 'HH:MM' or 'HH:MM:SS' (inclusive)
+        """
+        self.name = name
+        self.start = _parseTime(start)
+        self.end = _parseTime(end)
+        if self.end < self.start:
+            raise ValueError(f'Evaluation window {name} ends before it starts')
+
+    def getRange(self, date):
+        """Get the window on a date as SolarEdge 'YYYY-MM-DD HH:MM:SS' strings"""
+        return (datetime.datetime.combine(date, self.start).strftime('%Y-%m-%d %H:%M:%S'),
+                datetime.datetime.combine(date, self.end).strftime('%Y-%m-%d %H:%M:%S'))
+
+    @staticmethod
+    def fromDict(values):
+        name = str(values.get('name', '')).strip()
+        if not name or 'start' not in values or 'end' not in values:
+            raise ValueError(f'Evaluation window requires name, start and end: {values}')
+        return EvaluationWindow(name, values['start'], values['end'])
+
+
+class EvaluationRule:
+    __slots__ = ('rule_type', 'windows', 'params')
+
+    def __init__(self, rule_type, windows=None, params=None):
+        """
+        Args:
+            rule_type: One of RULE_TYPES
+            windows: Names of the windows the rule applies to (all windows if not set)
+            params: Rule settings, e.g. threshold, min_wh, field/min/max or min_ratio/metric
+        """
+        if rule_type not in RULE_TYPES:
+            raise ValueError(f'Unknown evaluation rule type {rule_type}, expected one of {", ".join(RULE_TYPES)}')
+        self.rule_type = rule_type
+        self.windows = list(windows) if windows else None
+        self.params = params or {}
+
+        if rule_type == RULE_ENERGY and 'min_wh' not in self.params:
+            raise ValueError('Energy rule requires min_wh')
+        if rule_type == RULE_BAND and ('field' not in self.params or not ('min' in self.params or 'max' in self.params)):
+            raise ValueError('Band rule requires field and min and/or max')
+        if rule_type == RULE_PEER_RATIO and 'min_ratio' not in self.params:
+            raise ValueError('Peer ratio rule requires min_ratio')
+        if rule_type == RULE_PEER_RATIO and self.params.get('metric', 'average') not in PEER_METRICS:
+            raise ValueError(f'Peer ratio metric must be one of {", ".join(PEER_METRICS)}')
+
+    def appliesTo(self, window_name):
+        return self.windows is None or window_name in self.windows
+
+    @staticmethod
+    def fromDict(values):
+        params = {key: value for key, value in values.items() if key not in ('type', 'windows')}
+        return EvaluationRule(values.get('type'), values.get('windows'), params)
+
+
+def _parseTime(value):
+    if isinstance(value, datetime.time):
+        return value
+    for time_format in ('%H:%M:%S', '%H:%M'):
+        try:
+            return datetime.datetime.strptime(str(value), time_format).time()
+        except ValueError:
+            continue
+    raise ValueError(f'Invalid time of day {value}, expected HH:MM or HH:MM:SS')
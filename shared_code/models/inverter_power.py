@@ -1,6 +1,51 @@
 class InverterPower:
+    # Fleet runs keep one of these per inverter; slots avoid a per-instance __dict__
+    __slots__ = ('serial', 'average', 'last', 'minimum', 'maximum', 'p10', 'p50', 'p90',
+                 'energy_wh', 'samples', 'samples_below_threshold')
 
-    def __init__(self, serial, average, last):
+    def __init__(self, serial, average, last, minimum=0.0, maximum=0.0, percentiles=None,
+                 energy_wh=0.0, samples=0, samples_below_threshold=0):
+        percentiles = percentiles or {}
         self.serial = serial
         self.average = average
-        self.last = last
\ No newline at end of file
+        self.last = last
+        self.minimum = minimum
+        self.maximum = maximum
+        self.p10 = percentiles.get('p10', 0.0)
+        self.p50 = percentiles.get('p50', 0.0)
+        self.p90 = percentiles.get('p90', 0.0)
+        self.energy_wh = energy_wh
+        self.samples = samples
+        self.samples_below_threshold = samples_below_threshold
+
+    @property
+    def percentiles(self):
+        return {'p10': self.p10, 'p50': self.p50, 'p90': self.p90}
+
+    def toDict(self):
+        """Get the statistics as a plain dictionary, e.g. for JSON reports"""
+        return {
+            'serial': self.serial,
+            'last': self.last,
+            'average': self.average,
+            'minimum': self.minimum,
+            'maximum': self.maximum,
+            'percentiles': self.percentiles,
+            'energy_wh': self.energy_wh,
+            'samples': self.samples,
+            'samples_below_threshold': self.samples_below_threshold
+        }
+
+    @staticmethod
+    def fromStats(serial, stats):
+        """Build an InverterPower from telemetry aggregator statistics"""
+        return InverterPower(
+            serial,
+            stats['average'],
+            stats['last'],
+            stats['minimum'],
+            stats['maximum'],
+            stats['percentiles'],
+            stats['energy_wh'],
+            stats['samples'],
+            stats['samples_below_threshold'])
@@ -0,0 +1,111 @@
+import os
+
+
+class ServiceSettings:
+    """
+    Function app settings, parsed once per worker
+
+    App settings only change when the Function app restarts, so warm invocations reuse one
+    instance instead of reading and parsing os.environ on every run.
+    """
+
+    def __init__(self, values=None):
+        """
+        Args:
+            values: Mapping of setting names to strings (defaults to os.environ)
+
+        Raises:
+            ValueError: A numeric setting is not a valid number
+        """
+        values = os.environ if values is None else values
+
+        def text(key, default=''):
+            return values.get(key, default)
+
+        def flag(key, default):
+            return values.get(key, default).lower() == 'true'
+
+        # SolarEdge site
+        self.alert_threshold = float(text('alertPowerThreshold', '200'))
+        self.base_url = text('baseURL')
+        self.site_id = text('siteId')
+        self.api_key = text('solarEdgeApiKey')
+
+        # Alert emails
+        self.sendgrid_key = text('sendGridApiKey')
+        self.to_email = text('toEmail')
+        self.from_email = text('fromEmail')
+        self.alert_digest = flag('alertDigest', 'false')
+        self.alert_send_async = flag('alertSendAsync', 'false')
+        self.alert_state_path = text('alertStatePath')
+        self.alert_suppression_hours = float(text('alertSuppressionHours', '24'))
+        self.alert_recovery_notices = flag('alertRecoveryNotices', 'true')
+
+        # Evaluation windows and rules (JSON lists; the 12:00-12:59 power check if not set)
+        self.evaluation_windows = text('evaluationWindows').strip()
+        self.evaluation_rules = text('evaluationRules').strip()
+
+        # Peer and history anomaly detection
+        self.anomaly_detection = flag('anomalyDetection', 'false')
+        self.anomaly_bin_minutes = float(text('anomalyBinMinutes', '15'))
+        self.anomaly_min_peer_ratio = float(text('anomalyMinPeerRatio', '0.75'))
+        self.anomaly_z_threshold = float(text('anomalyZScore', '3.5'))
+        self.anomaly_min_peer_power = float(text('anomalyMinPeerPower', '50'))
+        self.anomaly_history_path = text('anomalyHistoryPath')
+        self.anomaly_history_days = int(text('anomalyHistoryDays', '14'))
+        self.anomaly_min_history_days = int(text('anomalyMinHistoryDays', '5'))
+
+        # Fetching and caching
+        self.max_concurrent_requests = int(text('maxConcurrentRequests', '4'))
+        self.http_pool_size = int(text('httpPoolSize', '0')) or None
+        self.equipment_cache_ttl_seconds = float(text('equipmentCacheTtlSeconds', '86400'))
+        self.equipment_cache_dir = text('equipmentCacheDir') or None
+        self.telemetry_store_path = text('telemetryStorePath')
+        self.telemetry_finalize_hours = float(text('telemetryFinalizeHours', '24'))
+        self.stream_telemetry = flag('streamTelemetry', 'false')
+        self.ingestion_state_path = text('ingestionStatePath')
+        self.ingestion_retention_days = float(text('ingestionRetentionDays', '7'))
+        self.report_archive_dir = text('reportArchiveDir') or None
+        self.report_archive_format = text('reportArchiveFormat', 'ndjson').lower()
+
+        # Fleet mode
+        self.fleet_sites = text('fleetSites').strip()
+        self.fleet_max_parallel_sites = int(text('fleetMaxParallelSites', '8'))
+        self.fleet_max_concurrent_requests = int(text('fleetMaxConcurrentRequests', '32'))
+        self.fleet_timeout_seconds = float(text('fleetTimeoutSeconds', '270'))
+
+        # Backfill
+        self.backfill_max_parallel_chunks = int(text('backfillMaxParallelChunks', str(self.max_concurrent_requests)))
+        self.backfill_chunk_days = int(text('backfillChunkDays', '7'))
+        self.backfill_checkpoint_dir = text('backfillCheckpointDir') or None
+        self.backfill_timeout_seconds = float(text('backfillTimeoutSeconds', '270'))
+        self.backfill_analysis_processes = int(text('backfillAnalysisProcesses', '0'))
+
+        # Request scheduling and quota
+        self.api_requests_per_second = float(text('apiRequestsPerSecond', '3'))
+        self.api_request_burst = int(text('apiRequestBurst', '3'))
+        self.api_max_concurrent_requests_per_key = int(text('apiMaxConcurrentRequestsPerKey', '3'))
+        self.api_daily_quota = int(text('apiDailyQuota', '300'))
+        self.api_quota_reserved_for_timer = int(text('apiQuotaReservedForTimer', '50'))
+        self.api_max_wait_seconds = float(text('apiMaxWaitSeconds', '60'))
+        self.api_quota_state_path = text('apiQuotaStatePath') or None
+
+        # Retries, timeouts and circuit breaker
+        self.api_max_retries = int(text('apiMaxRetries', '3'))
+        self.api_backoff_base_seconds = float(text('apiBackoffBaseSeconds', '0.5'))
+        self.api_backoff_max_seconds = float(text('apiBackoffMaxSeconds', '8'))
+        self.api_retry_budget_seconds = float(text('apiRetryBudgetSeconds', '60'))
+        self.api_connect_timeout_seconds = float(text('apiConnectTimeoutSeconds', '5'))
+        self.api_read_timeout_seconds = float(text('apiReadTimeoutSeconds', '25'))
+        self.api_circuit_failure_threshold = int(text('apiCircuitFailureThreshold', '5'))
+        self.api_circuit_reset_seconds = float(text('apiCircuitResetSeconds', '60'))
+
+        # On-demand check result cache
+        self.result_cache_today_seconds = float(text('resultCacheTodaySeconds', '300'))
+        self.result_cache_past_seconds = float(text('resultCachePastSeconds', '86400'))
+        self.result_cache_max_entries = int(text('resultCacheMaxEntries', '256'))
+
+        # Run metrics
+        self.metrics_export_app_insights = flag('metricsExportAppInsights', 'false')
+        self.app_insights_connection_string = text('APPLICATIONINSIGHTS_CONNECTION_STRING')
+        self.app_insights_instrumentation_key = text('APPINSIGHTS_INSTRUMENTATIONKEY')
@@ -0,0 +1,21 @@
+class SiteConfig:
+
+    def __init__(self, site_id, api_key, alert_threshold=200.0, base_url=None):
+        self.site_id = site_id
+        self.api_key = api_key
+        self.alert_threshold = alert_threshold
+        self.base_url = base_url
+
+    @staticmethod
+    def fromDict(values, default_base_url=None, default_threshold=200.0):
+        """Build a site config from a fleet entry using the same keys as the single-site settings"""
+        site_id = str(values.get('siteId', '')).strip()
+        api_key = str(values.get('solarEdgeApiKey', '')).strip()
+        if not site_id or not api_key:
+            raise ValueError(f'Fleet site entry requires siteId and solarEdgeApiKey: {values.get("siteId")}')
+
+        return SiteConfig(
+            site_id,
+            api_key,
+            float(values.get('alertPowerThreshold', default_threshold)),
+            values.get('baseURL') or default_base_url)
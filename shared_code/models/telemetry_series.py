@@ -0,0 +1,113 @@
+import datetime
+import json
+import struct
+from typing import Dict, Iterator, Optional, Tuple, Union
+
+import numpy as np
+
+_SECONDS_PER_DAY = 86400.0
+
+# Payloads with extra fields start with this marker and a JSON list of field names;
+# payloads without it hold only timestamps and power
+_FIELDS_MARKER = b'TSF1'
+
+
+class TelemetrySeries:
+    """
+    Power telemetry of one inverter held in contiguous float64 buffers
+
+    timestamps are epoch seconds in ascending order, with samples that have no usable
+    timestamp (NaN) at the end. Extra telemetry columns (e.g. dcVoltage) are kept in fields,
+    aligned with timestamps. Slicing by time returns views of the same buffers.
+    """
+    __slots__ = ('serial', 'timestamps', 'power', 'fields')
+
+    def __init__(self, serial, timestamps, power, fields: Optional[Dict[str, np.ndarray]] = None):
+        self.serial = serial
+        self.timestamps = timestamps
+        self.power = power
+        self.fields = fields or {}
+
+    def __len__(self):
+        return int(self.power.size)
+
+    @property
+    def nbytes(self):
+        return int(self.timestamps.nbytes + self.power.nbytes + sum(column.nbytes for column in self.fields.values()))
+
+    def hasFields(self, names) -> bool:
+        """Check whether the series holds every one of the given extra columns"""
+        return all(name in self.fields for name in names)
+
+    def slice(self, start: Union[str, float, None] = None, end: Union[str, float, None] = None) -> 'TelemetrySeries':
+        """
+        Get the samples between start and end (both inclusive) without copying
+
+        Args:
+            start: 'YYYY-MM-DD HH:MM:SS' or epoch seconds; from the first sample if not set
+            end: 'YYYY-MM-DD HH:MM:SS' or epoch seconds; up to the last timestamped sample if not set
+        """
+        # NaN timestamps sort last, so they are never inside a time range
+        first = 0 if start is None else int(np.searchsorted(self.timestamps, _toEpochSeconds(start), side='left'))
+        last = int(np.searchsorted(self.timestamps, np.inf if end is None else _toEpochSeconds(end), side='right'))
+        return self._view(first, last)
+
+    def splitByDay(self) -> Iterator[Tuple[datetime.date, 'TelemetrySeries']]:
+        """Yield (date, series) for every day with samples, each series a view of this one"""
+        timestamped = self.slice()
+        if len(timestamped) == 0:
+            return
+
+        days = np.floor(timestamped.timestamps / _SECONDS_PER_DAY).astype(np.int64)
+        boundaries = np.flatnonzero(np.diff(days)) + 1
+        starts = np.concatenate(([0], boundaries))
+        ends = np.concatenate((boundaries, [days.size]))
+        for first, last in zip(starts, ends):
+            day = datetime.date(1970, 1, 1) + datetime.timedelta(days=int(days[first]))
+            yield day, timestamped._view(int(first), int(last))
+
+    def _view(self, first: int, last: int) -> 'TelemetrySeries':
+        return TelemetrySeries(self.serial, self.timestamps[first:last], self.power[first:last],
+                               {name: column[first:last] for name, column in self.fields.items()})
+
+    def getColumns(self) -> dict:
+        """Get the series as columns keyed by API field name, with epoch seconds under 'timestamps'"""
+        columns = {'timestamps': self.timestamps, 'totalActivePower': self.power}
+        columns.update(self.fields)
+        return columns
+
+    def toBytes(self) -> bytes:
+        """Pack the series into a compact binary form (timestamps, power, then any extra fields)"""
+        names = list(self.fields)
+        values = np.concatenate([self.timestamps, self.power] + [self.fields[name] for name in names])
+        data = values.astype('<f8', copy=False).tobytes()
+        if not names:
+            return data
+        header = json.dumps(names).encode('utf-8')
+        return _FIELDS_MARKER + struct.pack('<I', len(header)) + header + data
+
+    @staticmethod
+    def fromBytes(serial, payload: bytes) -> 'TelemetrySeries':
+        """Unpack a series written by toBytes; all columns are read-only views of the payload"""
+        names = []
+        offset = 0
+        if payload[:len(_FIELDS_MARKER)] == _FIELDS_MARKER:
+            offset = len(_FIELDS_MARKER) + 4
+            (header_size,) = struct.unpack_from('<I', payload, len(_FIELDS_MARKER))
+            names = json.loads(payload[offset:offset + header_size].decode('utf-8'))
+            offset += header_size
+
+        values = np.frombuffer(payload, dtype='<f8', offset=offset)
+        count = values.size // (2 + len(names))
+        fields = {name: values[(2 + index) * count:(3 + index) * count] for index, name in enumerate(names)}
+        return TelemetrySeries(serial, values[:count], values[count:2 * count], fields)
+
+    @staticmethod
+    def empty(serial) -> 'TelemetrySeries':
+        return TelemetrySeries(serial, np.empty(0, dtype=np.float64), np.empty(0, dtype=np.float64))
+
+
+def _toEpochSeconds(value: Union[str, float]) -> float:
+    if isinstance(value, str):
+        return float(np.datetime64(value.replace(' ', 'T'), 's').astype(np.int64))
+    return float(value)
@@ -0,0 +1,147 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+# SQLite limits the number of bound parameters per statement
+_LOOKUP_BATCH_SIZE = 500
+
+STATE_OK = 'ok'
+STATE_ALERT = 'alert'
+
+ACTION_NONE = 'none'
+ACTION_ALERT = 'alert'
+ACTION_SUPPRESS = 'suppress'
+ACTION_RECOVER = 'recover'
+
+# Stores are kept open at module level so warm invocations reuse the SQLite connection
+_stores: Dict[str, 'AlertStateStore'] = {}
+_stores_lock = threading.Lock()
+
+
+def getAlertStateStore(db_path: str, suppression_hours: float = 24) -> 'AlertStateStore':
+    """Get the process-wide alert state store for a database file"""
+    with _stores_lock:
+        store = _stores.get(db_path)
+        if store is None:
+            store = AlertStateStore(db_path, suppression_hours)
+            _stores[db_path] = store
+        store.suppression_hours = suppression_hours
+        return store
+
+
+class AlertStateStore:
+
+    def __init__(self, db_path: str, suppression_hours: float = 24):
+        """
+        Args:
+            db_path: SQLite database file holding the last alert state per inverter
+            suppression_hours: Hours before an inverter that is still failing is alerted again
+        """
+        self.db_path = db_path
+        self.suppression_hours = suppression_hours
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock:
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS alert_state ('
+                ' serial TEXT PRIMARY KEY,'
+                ' site_id TEXT,'
+                ' state TEXT NOT NULL,'
+                ' last_alert_at REAL,'
+                ' state_changed_at REAL NOT NULL'
+                ') WITHOUT ROWID')
+            self._connection.commit()
+
+    def getStates(self, serials: Iterable[str]) -> Dict[str, dict]:
+        """Get the stored state of many inverters in a few indexed lookups"""
+        serials = list(serials)
+        states = {}
+        with self._lock:
+            for index in range(0, len(serials), _LOOKUP_BATCH_SIZE):
+                batch = serials[index:index + _LOOKUP_BATCH_SIZE]
+                placeholders = ','.join('?' * len(batch))
+                rows = self._connection.execute(
+                    f'SELECT serial, site_id, state, last_alert_at, state_changed_at FROM alert_state '
+                    f'WHERE serial IN ({placeholders})', batch).fetchall()
+                for serial, site_id, state, last_alert_at, state_changed_at in rows:
+                    states[serial] = {
+                        'site_id': site_id,
+                        'state': state,
+                        'last_alert_at': last_alert_at,
+                        'state_changed_at': state_changed_at
+                    }
+        return states
+
+    def getAction(self, previous: Optional[dict], needs_alert: bool, now: Optional[float] = None) -> str:
+        """
+        Decide what to do for an inverter given its stored state and the current check
+
+        Returns:
+            ACTION_ALERT for a new problem or a reminder after the suppression window,
+            ACTION_SUPPRESS for a problem already alerted within the window,
+            ACTION_RECOVER when a previously alerted inverter is healthy again, otherwise ACTION_NONE
+        """
+        now = time.time() if now is None else now
+        last_alert_at = previous.get('last_alert_at') if previous else None
+
+        if needs_alert:
+            if last_alert_at is None or previous['state'] != STATE_ALERT:
+                return ACTION_ALERT
+            if now - last_alert_at >= self.suppression_hours * 3600:
+                return ACTION_ALERT
+            return ACTION_SUPPRESS
+
+        if previous and previous['state'] == STATE_ALERT and last_alert_at is not None:
+            return ACTION_RECOVER
+        return ACTION_NONE
+
+    def saveStates(self, updates: List[dict], now: Optional[float] = None) -> None:
+        """
+        Store the outcome of a check in one transaction
+
+        Args:
+            updates: Entries with serial, site_id, state and alerted (True if a notification went out)
+        """
+        if not updates:
+            return
+
+        now = time.time() if now is None else now
+        rows = [
+            (update['serial'], update.get('site_id'), update['state'], now if update.get('alerted') else None, now)
+            for update in updates
+        ]
+        with self._lock:
+            # Keep last_alert_at and state_changed_at unless this check changed them
+            self._connection.executemany(
+                'INSERT INTO alert_state (serial, site_id, state, last_alert_at, state_changed_at) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT(serial) DO UPDATE SET '
+                ' site_id = excluded.site_id,'
+                ' last_alert_at = CASE WHEN excluded.state = \'ok\' THEN NULL'
+                '  ELSE COALESCE(excluded.last_alert_at, alert_state.last_alert_at) END,'
+                ' state_changed_at = CASE WHEN alert_state.state = excluded.state'
+                '  THEN alert_state.state_changed_at ELSE excluded.state_changed_at END,'
+                ' state = excluded.state', rows)
+            self._connection.commit()
+        logging.info(f'Saved alert state for {len(rows)} inverters')
+
+    def clear(self, serial: Optional[str] = None) -> None:
+        """Forget the state of one inverter, or of every inverter if none is given"""
+        with self._lock:
+            if serial is None:
+                self._connection.execute('DELETE FROM alert_state')
+            else:
+                self._connection.execute('DELETE FROM alert_state WHERE serial = ?', (serial,))
+            self._connection.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,190 @@
+import datetime
+import logging
+import warnings
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from shared_code.models.telemetry_series import TelemetrySeries
+from shared_code.services.anomaly_history_store import AnomalyHistoryStore
+
+# Peer statistics need a median that one bad inverter cannot drag along
+MIN_PEERS = 3
+
+# Scales the median absolute deviation to a standard deviation for normally distributed power
+_MAD_SCALE = 1.4826
+
+# Spread floors, so inverters that track each other closely are not flagged for tiny differences
+MIN_RELATIVE_SPREAD = 0.05
+MIN_HISTORY_SPREAD = 0.02
+
+
+def buildPowerMatrix(series_list: List[TelemetrySeries], start: float, end: float, bin_seconds: float) -> np.ndarray:
+    """
+    Average every inverter's power into common time bins
+
+    Samples of all inverters are binned together with one bincount, so the cost does not depend
+    on how many inverters there are beyond the samples themselves.
+
+    Args:
+        series_list: One series per inverter
+        start: Epoch seconds of the first bin's start
+        end: Epoch seconds of the last sample to include
+        bin_seconds: Bin width
+
+    Returns:
+        Matrix with one row per series and one column per bin; NaN where an inverter has no samples in a bin
+    """
+    bin_count = int((end - start) // bin_seconds) + 1
+    rows = len(series_list)
+    if rows == 0:
+        return np.empty((0, bin_count))
+
+    timestamps = np.concatenate([series.timestamps for series in series_list])
+    # Missing power readings count as zero, as in the per-inverter statistics
+    power = np.nan_to_num(np.concatenate([series.power for series in series_list]), nan=0.0)
+    row_index = np.repeat(np.arange(rows), [len(series) for series in series_list])
+
+    bins = np.floor((timestamps - start) / bin_seconds)
+    valid = ~np.isnan(bins) & (bins >= 0) & (bins < bin_count)
+    cells = row_index[valid] * bin_count + bins[valid].astype(np.int64)
+
+    sums = np.bincount(cells, weights=power[valid], minlength=rows * bin_count)
+    counts = np.bincount(cells, minlength=rows * bin_count)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (sums / counts).reshape(rows, bin_count)
+
+
+def comparePeers(matrix: np.ndarray, min_peer_power: float) -> Dict[str, np.ndarray]:
+    """
+    Compare every inverter with the site median, bin by bin
+
+    Bins where the site median is below min_peer_power (night, heavy overcast) are left out, since
+    they say nothing about one inverter versus the rest.
+
+    Returns:
+        Per inverter: median ratio to the site median, median robust z-score and number of bins compared
+    """
+    with warnings.catch_warnings():
+        # Rows and columns without any samples produce all-NaN slices
+        warnings.simplefilter('ignore', RuntimeWarning)
+        peer_median = np.nanmedian(matrix, axis=0)
+        spread = np.nanmedian(np.abs(matrix - peer_median), axis=0) * _MAD_SCALE
+        spread = np.maximum(spread, peer_median * MIN_RELATIVE_SPREAD)
+
+        usable = peer_median >= min_peer_power
+        compared = np.where(usable, matrix, np.nan)
+        ratio = np.nanmedian(compared / np.where(usable, peer_median, np.nan), axis=1)
+        zscore = np.nanmedian((compared - peer_median) / np.where(usable, spread, np.nan), axis=1)
+
+    return {'ratio': ratio, 'zscore': zscore, 'bins': np.count_nonzero(~np.isnan(compared), axis=1)}
+
+
+def compareHistory(ratios: np.ndarray, history: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Compare every inverter's ratio to the site median with its own earlier ratios
+
+    Returns:
+        Per inverter: mean of the earlier ratios, z-score of the current ratio against them and number of earlier days
+    """
+    days = np.count_nonzero(~np.isnan(history), axis=1)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        mean = np.nanmean(history, axis=1)
+        spread = np.maximum(np.nanstd(history, axis=1), MIN_HISTORY_SPREAD)
+    return {'mean': mean, 'zscore': (ratios - mean) / spread, 'days': days}
+
+
+class AnomalyDetector:
+    """
+    Flags inverters that fall behind the other inverters of their site, or behind their own recent history
+
+    Comparing against peers instead of a fixed threshold ignores weather that affects the whole site,
+    and still catches an inverter that is degraded but above the threshold. The history comparison
+    tracks each inverter's ratio to its peers, so it catches a new drop in an inverter that always ran
+    a little below the others.
+    """
+
+    def __init__(self, bin_minutes: float = 15, min_peer_ratio: float = 0.75, z_threshold: float = 3.5,
+                 min_peer_power: float = 50.0, history_store: Optional[AnomalyHistoryStore] = None,
+                 history_days: int = 14, min_history_days: int = 5):
+        """
+        Args:
+            bin_minutes: Width of the time bins inverters are compared in
+            min_peer_ratio: Flag inverters producing less than this fraction of the site median
+            z_threshold: Flag inverters more than this many robust standard deviations below the site median,
+                or below their own history
+            min_peer_power: Bins where the site median is below this many Watts are not compared
+            history_store: Store for daily ratios to the site median (no history comparison if not set)
+            history_days: Days of history to compare against
+            min_history_days: Days of history needed before the history comparison is used
+        """
+        self.bin_seconds = float(bin_minutes) * 60.0
+        self.min_peer_ratio = min_peer_ratio
+        self.z_threshold = z_threshold
+        self.min_peer_power = min_peer_power
+        self.history_store = history_store
+        self.history_days = max(1, int(history_days))
+        self.min_history_days = max(1, int(min_history_days))
+
+    def detect(self, site_id: str, date: datetime.date, series_list: List[TelemetrySeries], start_datetime: str,
+               end_datetime: str) -> Dict[str, dict]:
+        """
+        Compare the inverters of one site over a time range
+
+        Args:
+            site_id: Site the inverters belong to (history is kept per site)
+            date: Day checked; its ratios are added to the history
+            series_list: One series per inverter
+            start_datetime: 'YYYY-MM-DD HH:MM:SS' start of the compared range
+            end_datetime: 'YYYY-MM-DD HH:MM:SS' end of the compared range
+
+        Returns:
+            Per serial: peer ratio, peer z-score, history z-score and days (None where not available) and readable reasons
+        """
+        serials = [series.serial for series in series_list]
+        results = {serial: {'peer_ratio': None, 'peer_zscore': None, 'history_zscore': None, 'history_days': 0,
+                            'reasons': []} for serial in serials}
+        if len(series_list) < MIN_PEERS:
+            logging.info(f'Site {site_id} has {len(series_list)} inverters, at least {MIN_PEERS} are needed for peer comparison')
+            return results
+
+        start = _toEpochSeconds(start_datetime)
+        matrix = buildPowerMatrix(series_list, start, _toEpochSeconds(end_datetime), self.bin_seconds)
+        peers = comparePeers(matrix, self.min_peer_power)
+        compared = peers['bins'] > 0
+        logging.info(f'Compared {int(np.count_nonzero(compared))} of {len(serials)} inverters at site {site_id} '
+                     f'over {matrix.shape[1]} bins')
+
+        history = None
+        if self.history_store is not None:
+            history = compareHistory(peers['ratio'], self.history_store.getRatios(site_id, serials, date, self.history_days))
+            self.history_store.saveRatios(site_id, date, {
+                serial: float(ratio) for serial, ratio, usable in zip(serials, peers['ratio'], compared) if usable})
+
+        for index, serial in enumerate(serials):
+            if not compared[index]:
+                continue
+            result = results[serial]
+            ratio = float(peers['ratio'][index])
+            zscore = float(peers['zscore'][index])
+            result['peer_ratio'] = ratio
+            result['peer_zscore'] = zscore
+            if ratio < self.min_peer_ratio:
+                result['reasons'].append(f'producing {ratio:.0%} of the site median, below {self.min_peer_ratio:.0%}')
+            elif zscore < -self.z_threshold:
+                result['reasons'].append(f'{-zscore:.1f} standard deviations below the site median')
+
+            if history is not None and history['days'][index] >= self.min_history_days:
+                history_zscore = float(history['zscore'][index])
+                result['history_zscore'] = history_zscore
+                result['history_days'] = int(history['days'][index])
+                if history_zscore < -self.z_threshold:
+                    result['reasons'].append(f'producing {ratio:.0%} of the site median against {history["mean"][index]:.0%} '
+                                             f'over the last {result["history_days"]} days')
+
+        return results
+
+
+def _toEpochSeconds(value: str) -> float:
+    return float(np.datetime64(value.replace(' ', 'T'), 's').astype(np.int64))
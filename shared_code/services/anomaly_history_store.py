@@ -0,0 +1,91 @@
+import datetime
+import os
+import sqlite3
+import threading
+from typing import Dict, List
+
+import numpy as np
+
+# SQLite limits the number of bound parameters per statement
+_LOOKUP_BATCH_SIZE = 500
+
+# Stores are kept open at module level so warm invocations reuse the SQLite connection
+_stores: Dict[str, 'AnomalyHistoryStore'] = {}
+_stores_lock = threading.Lock()
+
+
+def getAnomalyHistoryStore(db_path: str) -> 'AnomalyHistoryStore':
+    """Get the process-wide anomaly history store for a database file"""
+    with _stores_lock:
+        store = _stores.get(db_path)
+        if store is None:
+            store = AnomalyHistoryStore(db_path)
+            _stores[db_path] = store
+        return store
+
+
+class AnomalyHistoryStore:
+
+    def __init__(self, db_path: str):
+        """
+        Args:
+            db_path: SQLite database file holding each inverter's daily ratio to its site's median power
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock:
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS peer_ratio_history ('
+                ' site_id TEXT NOT NULL,'
+                ' serial TEXT NOT NULL,'
+                ' day TEXT NOT NULL,'
+                ' ratio REAL NOT NULL,'
+                ' PRIMARY KEY (site_id, serial, day)'
+                ') WITHOUT ROWID')
+            self._connection.commit()
+
+    def getRatios(self, site_id: str, serials: List[str], before: datetime.date, days: int) -> np.ndarray:
+        """
+        Get the stored ratios of the days before a date as an inverters x days matrix
+
+        Returns:
+            Matrix with one row per serial (in the given order) and one column per day, oldest first; NaN where no ratio is stored
+        """
+        first_day = before - datetime.timedelta(days=days)
+        history = np.full((len(serials), days), np.nan)
+        rows_by_serial = {serial: index for index, serial in enumerate(serials)}
+
+        with self._lock:
+            for index in range(0, len(serials), _LOOKUP_BATCH_SIZE):
+                batch = serials[index:index + _LOOKUP_BATCH_SIZE]
+                placeholders = ','.join('?' * len(batch))
+                rows = self._connection.execute(
+                    f'SELECT serial, day, ratio FROM peer_ratio_history '
+                    f'WHERE site_id = ? AND day >= ? AND day < ? AND serial IN ({placeholders})',
+                    [site_id, first_day.isoformat(), before.isoformat()] + batch).fetchall()
+                for serial, day, ratio in rows:
+                    column = (datetime.date.fromisoformat(day) - first_day).days
+                    history[rows_by_serial[serial], column] = ratio
+
+        return history
+
+    def saveRatios(self, site_id: str, day: datetime.date, ratios: Dict[str, float]) -> None:
+        """Store the ratios of one day, replacing those of an earlier run on the same day"""
+        if not ratios:
+            return
+        with self._lock:
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO peer_ratio_history (site_id, serial, day, ratio) VALUES (?, ?, ?, ?)',
+                [(site_id, serial, day.isoformat(), ratio) for serial, ratio in ratios.items()])
+            self._connection.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
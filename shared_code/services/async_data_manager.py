@@ -0,0 +1,305 @@
+import asyncio
+import json
+import logging
+import time
+from contextlib import AsyncExitStack
+from typing import Awaitable, Callable, List, Mapping, Optional, Sequence, Tuple, TypeVar
+from urllib.parse import urlparse
+
+import aiohttp
+from requests.exceptions import HTTPError
+
+from shared_code.models.inverter_power import InverterPower
+from shared_code.models.telemetry_series import TelemetrySeries
+from shared_code.services.async_session_manager import AsyncSessionManager
+from shared_code.services.data_manager import DataManager
+from shared_code.services.request_scheduler import QuotaExceededError, SchedulerTimeoutError
+from shared_code.services.resilience import ADMITTED, ADMITTED_TRIAL, RETRY_STATUS_CODES, CircuitOpenError
+from shared_code.services.run_metrics import span
+
+T = TypeVar('T')
+
+
+class AsyncDataManager(DataManager):
+    """
+    DataManager with coroutine variants of its fetch methods, on a shared aiohttp session
+
+    Takes the same arguments as DataManager and shares its caches, stores, scheduler, retry policy
+    and circuit breakers. While a telemetry request is waiting on SolarEdge the event loop is free,
+    so concurrent invocations on the same worker overlap their I/O. The sync methods keep working.
+
+    request_limiter is not applied to async requests; fleet checks stay on the sync path.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._async_session_manager: Optional[AsyncSessionManager] = None
+        connect_timeout, read_timeout = self.timeouts
+        self._client_timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+
+    def getSessionStats(self) -> dict:
+        """Get HTTP connection stats for this run (of the async session once it has been used)"""
+        if self._async_session_manager is None:
+            return super().getSessionStats()
+        return self._async_session_manager.getStats()
+
+    def _getAsyncSessionManager(self) -> AsyncSessionManager:
+        # Created on first use, inside the running event loop the session belongs to
+        if self._async_session_manager is None:
+            self._async_session_manager = AsyncSessionManager()
+        return self._async_session_manager
+
+    async def _getAsync(self, url: str, parameters: dict) -> Tuple[int, bytes]:
+        """Issue a SolarEdge API request, retrying transient errors and honouring the host circuit breaker"""
+        breaker = self.circuit_breakers.get(urlparse(url).netloc) if self.circuit_breakers else None
+        max_retries = self.retry_policy.max_retries if self.retry_policy else 0
+        started = time.monotonic()
+        attempt = 0
+
+        while True:
+            admission = breaker.allowRequest() if breaker is not None else ADMITTED
+            if admission is None:
+                raise CircuitOpenError(f'Circuit open for {breaker.host}, not calling the SolarEdge API')
+
+            retry_after = None
+            try:
+                status, body, headers = await self._sendAsync(url, parameters)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if breaker is not None:
+                    breaker.recordFailure()
+                if not self._shouldRetry(attempt, max_retries, started):
+                    raise
+                logging.warning(f'Transient error calling SolarEdge API (attempt {attempt + 1}): {e!r}')
+            except BaseException:
+                # Quota, local scheduling and other client errors (or cancellation) say nothing about the host
+                if admission == ADMITTED_TRIAL:
+                    breaker.releaseTrial()
+                raise
+            else:
+                if status not in RETRY_STATUS_CODES:
+                    if breaker is not None:
+                        breaker.recordSuccess()
+                    return status, body
+
+                # Throttling means the host is up; only server errors count against the breaker
+                if breaker is not None:
+                    if status >= 500:
+                        breaker.recordFailure()
+                    else:
+                        breaker.recordSuccess()
+                if not self._shouldRetry(attempt, max_retries, started):
+                    return status, body
+                logging.warning(f'SolarEdge API returned {status} (attempt {attempt + 1}), retrying')
+                retry_after = headers.get('Retry-After')
+
+            await asyncio.sleep(self.retry_policy.getDelay(attempt, retry_after))
+            attempt += 1
+
+    async def _sendAsync(self, url: str, parameters: dict) -> Tuple[int, bytes, Mapping[str, str]]:
+        """Send a single request through the scheduler, if set, and read the whole body"""
+        session = self._getAsyncSessionManager()
+        async with AsyncExitStack() as stack:
+            if self.scheduler is not None:
+                await stack.enter_async_context(self.scheduler.acquireAsync(parameters['api_key'], self.priority))
+            async with session.get(url, params=parameters, timeout=self._client_timeout) as response:
+                return response.status, await response.read(), response.headers
+
+    def _raiseForStatus(self, status: int, url: str) -> None:
+        # Same exception type as the sync path, so callers handle both alike
+        if status >= 400:
+            raise HTTPError(f'{status} {"Client" if status < 500 else "Server"} Error for url: {url}')
+
+    async def fetchEquipmentAsync(self, url_base: str, site_id: str, token: str) -> Optional[dict]:
+        """Fetch equipment list from SolarEdge API"""
+        try:
+            url = f"{url_base}/equipment/{site_id}/list"
+            parameters = {'api_key': token}
+
+            logging.info(f'Fetching equipment data for site {site_id}')
+
+            status, body = await self._getAsync(url, parameters)
+            self._raiseForStatus(status, url)
+
+            data = json.loads(body)
+            logging.info(f'Successfully fetched equipment data for site {site_id}')
+            return data
+
+        except HTTPError as e:
+            logging.error(f'HTTP error fetching equipment data: {e}')
+            raise
+        except Exception as e:
+            logging.error(f'Unexpected error fetching equipment data: {e}')
+            raise
+
+    async def fetchInverterDataAsync(self, url_base: str, site_id: str, inverter_serial: str, token: str,
+                                     start_datetime: str, end_datetime: str) -> Optional[dict]:
+        """Fetch inverter data from SolarEdge API"""
+        try:
+            with span(self.metrics, 'telemetry_fetch', site_id=site_id, serial=inverter_serial, source='api') as attributes:
+                url = f"{url_base}/equipment/{site_id}/{inverter_serial}/data"
+                parameters = {
+                    'startTime': start_datetime,
+                    'endTime': end_datetime,
+                    'api_key': token
+                }
+
+                logging.info(f'Fetching inverter data for serial {inverter_serial} from {start_datetime} to {end_datetime}')
+
+                status, body = await self._getAsync(url, parameters)
+                attributes['status'] = status
+                self._raiseForStatus(status, url)
+
+                attributes['bytes'] = len(body)
+                data = json.loads(body)
+                attributes['samples'] = len((data or {}).get('data', {}).get('telemetries', []))
+                logging.info(f'Successfully fetched data for inverter {inverter_serial}')
+                return data
+
+        except HTTPError as e:
+            logging.error(f'HTTP error fetching inverter data for {inverter_serial}: {e}')
+            raise
+        except Exception as e:
+            logging.error(f'Unexpected error fetching inverter data for {inverter_serial}: {e}')
+            raise
+
+    async def fetchInverterSeriesAsync(self, url_base: str, site_id: str, inverter_serial: str, token: str,
+                                       start_datetime: str, end_datetime: str,
+                                       fields: Sequence[str] = ()) -> Optional[TelemetrySeries]:
+        """Fetch inverter telemetry as a TelemetrySeries, from the local store for finalized windows"""
+        if self.telemetry_store is None:
+            inverter_data = await self.fetchInverterDataAsync(url_base, site_id, inverter_serial, token, start_datetime, end_datetime)
+            return self._toStoredSeries(site_id, inverter_serial, start_datetime, end_datetime, inverter_data, fields)
+
+        # Store reads and writes decompress or compress the series and wait on SQLite, so they run in a worker thread
+        stored = await asyncio.to_thread(self._getStoredSeries, site_id, inverter_serial, start_datetime, end_datetime, fields)
+        if stored is not None:
+            return stored
+
+        inverter_data = await self.fetchInverterDataAsync(url_base, site_id, inverter_serial, token, start_datetime, end_datetime)
+        return await asyncio.to_thread(self._toStoredSeries, site_id, inverter_serial, start_datetime, end_datetime,
+                                       inverter_data, fields)
+
+    async def getInverterSerialNumbersAsync(self, url_base: str, site_id: str, token: str) -> List[str]:
+        """Get list of inverter serial numbers from equipment list"""
+        try:
+            with span(self.metrics, 'equipment_fetch', site_id=site_id) as attributes:
+                # The cache may read or write its file, which is kept off the event loop
+                data = await asyncio.to_thread(self.equipment_cache.get, site_id) if self.equipment_cache else None
+                attributes['cached'] = data is not None
+                if data is None:
+                    data = await self.fetchEquipmentAsync(url_base, site_id, token)
+                    if data and self.equipment_cache:
+                        await asyncio.to_thread(self.equipment_cache.set, site_id, data)
+
+            return self._parseInverterSerials(data)
+
+        except Exception as e:
+            logging.error(f'Error getting inverter serial numbers: {e}')
+            raise
+
+    async def getAllInverterPowerAsync(self, url_base: str, site_id: str, token: str, start_datetime: str,
+                                       end_datetime: str, alert_threshold: Optional[float] = None) -> List[InverterPower]:
+        """Get power data for all inverters in the site"""
+        try:
+            inverter_serials = await self.getInverterSerialNumbersAsync(url_base, site_id, token)
+
+            if not inverter_serials:
+                logging.warning("No inverters found to process")
+                return []
+
+            logging.info(f'Processing {len(inverter_serials)} inverters with up to {self.max_workers} concurrent requests')
+
+            result = await self._gatherInverters(lambda serial: self.getInverterPowerAsync(
+                url_base, site_id, serial, token, start_datetime, end_datetime, alert_threshold), inverter_serials)
+
+            logging.info(f'Successfully processed {len(result)} inverters')
+            return result
+
+        except Exception as e:
+            logging.error(f'Error getting inverter power data: {e}')
+            raise
+
+    async def getAllInverterSeriesAsync(self, url_base: str, site_id: str, token: str, start_datetime: str,
+                                        end_datetime: str, fields: Sequence[str] = ()) -> List[TelemetrySeries]:
+        """Get the telemetry series of all inverters in the site, with one fetch per inverter"""
+        try:
+            inverter_serials = await self.getInverterSerialNumbersAsync(url_base, site_id, token)
+
+            if not inverter_serials:
+                logging.warning("No inverters found to process")
+                return []
+
+            logging.info(f'Processing {len(inverter_serials)} inverters with up to {self.max_workers} concurrent requests')
+
+            result = await self._gatherInverters(lambda serial: self.getInverterSeriesAsync(
+                url_base, site_id, serial, token, start_datetime, end_datetime, fields), inverter_serials)
+
+            logging.info(f'Successfully processed {len(result)} inverters')
+            return result
+
+        except Exception as e:
+            logging.error(f'Error getting inverter series data: {e}')
+            raise
+
+    async def _gatherInverters(self, fetch: Callable[[str], Awaitable[T]], inverter_serials: List[str]) -> List[T]:
+        """Run fetch for every inverter, concurrently up to max_workers, in inverter_serials order"""
+        limit = asyncio.Semaphore(self.max_workers)
+
+        async def limited(serial: str) -> T:
+            async with limit:
+                return await fetch(serial)
+
+        tasks = [asyncio.ensure_future(limited(serial)) for serial in inverter_serials]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        finally:
+            # A failing inverter fails the whole run (e.g. quota or circuit open), so the others stop spending requests
+            pending = [task for task in tasks if not task.done()]
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        errors = [task.exception() for task in tasks if not task.cancelled() and task.exception() is not None]
+        if errors:
+            raise errors[0]
+        return [task.result() for task in tasks]
+
+    async def getInverterPowerAsync(self, url_base: str, site_id: str, inverter_serial: str, token: str,
+                                    start_datetime: str, end_datetime: str,
+                                    alert_threshold: Optional[float] = None) -> InverterPower:
+        """Get power data for a single inverter, returning zero power if it cannot be fetched"""
+        if self.ingestion_store is not None or self.stream_telemetry:
+            # Incremental and streamed parsing read the body as it arrives, which the sync client does;
+            # a worker thread keeps the event loop free meanwhile
+            return await asyncio.to_thread(self.getInverterPower, url_base, site_id, inverter_serial, token,
+                                           start_datetime, end_datetime, alert_threshold)
+
+        try:
+            series = await self.fetchInverterSeriesAsync(url_base, site_id, inverter_serial, token, start_datetime, end_datetime)
+            return self._summarizeSeries(site_id, inverter_serial, series, alert_threshold)
+
+        except (QuotaExceededError, SchedulerTimeoutError, CircuitOpenError):
+            raise
+        except Exception as e:
+            logging.error(f'Error processing inverter {inverter_serial}: {e}')
+            self._failed_inverters.append(inverter_serial)
+            return InverterPower(inverter_serial, 0.0, 0.0)
+
+    async def getInverterSeriesAsync(self, url_base: str, site_id: str, inverter_serial: str, token: str,
+                                     start_datetime: str, end_datetime: str, fields: Sequence[str] = ()) -> TelemetrySeries:
+        """Get the telemetry series of a single inverter, empty if it cannot be fetched"""
+        try:
+            series = await self.fetchInverterSeriesAsync(url_base, site_id, inverter_serial, token, start_datetime,
+                                                         end_datetime, fields)
+            if series is None or len(series) == 0:
+                logging.warning(f'No telemetry samples found for inverter {inverter_serial}')
+                return TelemetrySeries.empty(inverter_serial)
+            return series
+
+        except (QuotaExceededError, SchedulerTimeoutError, CircuitOpenError):
+            raise
+        except Exception as e:
+            logging.error(f'Error processing inverter {inverter_serial}: {e}')
+            self._failed_inverters.append(inverter_serial)
+            return TelemetrySeries.empty(inverter_serial)
@@ -0,0 +1,73 @@
+import asyncio
+import logging
+import threading
+from typing import Dict, Tuple
+
+import aiohttp
+
+# Sessions are bound to the event loop they were created on; the Functions worker keeps one loop
+# for async functions, so warm invocations reuse the same session and its open connections
+_shared_sessions: Dict[int, Tuple[aiohttp.ClientSession, Dict[str, int], asyncio.AbstractEventLoop]] = {}
+_shared_sessions_lock = threading.Lock()
+
+
+def getSharedClientSession() -> Tuple[aiohttp.ClientSession, Dict[str, int]]:
+    """Get the keep-alive client session of the running event loop and its connection counters"""
+    loop = asyncio.get_running_loop()
+    key = id(loop)
+    with _shared_sessions_lock:
+        entry = _shared_sessions.get(key)
+        # A closed loop's id can be reused by a new loop (e.g. repeated asyncio.run calls)
+        if entry is None or entry[0].closed or entry[2] is not loop:
+            for stale_key in [other_key for other_key, other in _shared_sessions.items() if other[2].is_closed()]:
+                del _shared_sessions[stale_key]
+            counters = {'connections': 0, 'requests': 0}
+
+            async def onRequestStart(session, context, params):
+                counters['requests'] += 1
+
+            async def onConnectionCreated(session, context, params):
+                counters['connections'] += 1
+
+            trace_config = aiohttp.TraceConfig()
+            trace_config.on_request_start.append(onRequestStart)
+            trace_config.on_connection_create_end.append(onConnectionCreated)
+
+            # Not capped like the sync pool: a connector limit would queue concurrent invocations behind each
+            # other, and each check is already bounded by its max_workers and the scheduler's per-key limit
+            session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=0),
+                headers={'Accept-Encoding': 'gzip, deflate'},
+                trace_configs=[trace_config])
+            entry = (session, counters, loop)
+            _shared_sessions[key] = entry
+            logging.info('Created shared async HTTP session')
+        return entry[0], entry[1]
+
+
+class AsyncSessionManager:
+    """Async counterpart of SessionManager on a shared aiohttp session"""
+
+    def __init__(self):
+        """Must be created while the event loop that will use it is running"""
+        self.session, self._counters = getSharedClientSession()
+        self.resetStats()
+
+    def get(self, url: str, **kwargs):
+        """Issue a GET request over the shared session (use as an async context manager or await it)"""
+        return self.session.get(url, **kwargs)
+
+    def resetStats(self) -> None:
+        """Start a new stats window, e.g. at the beginning of a run"""
+        self._baseline = (self._counters['connections'], self._counters['requests'])
+
+    def getStats(self) -> dict:
+        """Get connection stats since the last reset"""
+        baseline_connections, baseline_requests = self._baseline
+        new_connections = max(0, self._counters['connections'] - baseline_connections)
+        total_requests = max(0, self._counters['requests'] - baseline_requests)
+        return {
+            'requests': total_requests,
+            'new_connections': new_connections,
+            'reused_connections': max(0, total_requests - new_connections)
+        }
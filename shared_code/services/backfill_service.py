@@ -0,0 +1,212 @@
+import datetime
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Tuple
+
+from shared_code.services.data_manager import DataManager
+from shared_code.services.parallel_analyzer import ParallelAnalyzer
+from shared_code.services.telemetry_aggregator import aggregateSeries
+
+# SolarEdge equipment data requests may span at most one week
+MAX_CHUNK_DAYS = 7
+
+
+class MissingTelemetryError(Exception):
+    """Raised when SolarEdge returned no telemetry payload for a backfill window"""
+
+
+def splitDateRange(start_date: datetime.date, end_date: datetime.date, chunk_days: int = MAX_CHUNK_DAYS) -> List[Tuple[str, str]]:
+    """Split an inclusive date range into API time windows of at most chunk_days days"""
+    if end_date < start_date:
+        raise ValueError(f'Backfill end date {end_date} is before start date {start_date}')
+
+    chunk_days = max(1, min(int(chunk_days), MAX_CHUNK_DAYS))
+    chunks = []
+    chunk_start = start_date
+    while chunk_start <= end_date:
+        chunk_end = min(chunk_start + datetime.timedelta(days=chunk_days - 1), end_date)
+        chunks.append((f'{chunk_start} 00:00:00', f'{chunk_end} 23:59:59'))
+        chunk_start = chunk_end + datetime.timedelta(days=1)
+    return chunks
+
+
+class BackfillService:
+
+    def __init__(self, data_manager: DataManager, max_parallel_chunks: int = 4, chunk_days: int = MAX_CHUNK_DAYS,
+                 checkpoint_dir: Optional[str] = None, analyzer: Optional[ParallelAnalyzer] = None):
+        """
+        Args:
+            data_manager: Data manager used for the equipment and telemetry calls
+            max_parallel_chunks: Number of (inverter, chunk) windows fetched at the same time
+            chunk_days: Days per telemetry request (capped at the API limit of 7)
+            checkpoint_dir: Directory for checkpoint files so an interrupted backfill resumes where it stopped
+            analyzer: Process pool that aggregates the fetched windows (aggregated in the fetching thread if not set)
+        """
+        self.data_manager = data_manager
+        self.max_parallel_chunks = max(1, int(max_parallel_chunks))
+        self.chunk_days = chunk_days
+        self.checkpoint_dir = checkpoint_dir
+        self.analyzer = analyzer
+        self._checkpoint_lock = threading.Lock()
+
+    def runBackfill(self, url_base: str, site_id: str, token: str, start_date: datetime.date, end_date: datetime.date,
+                    alert_threshold: Optional[float] = None, timeout_seconds: Optional[float] = None) -> dict:
+        """
+        Fetch and aggregate per-day telemetry for every inverter of a site over a date range
+
+        Args:
+            url_base: SolarEdge API base URL
+            site_id: Site to backfill
+            token: SolarEdge API key
+            start_date: First day of the range
+            end_date: Last day of the range (inclusive)
+            alert_threshold: Power threshold in Watts used to count low samples
+            timeout_seconds: Stop waiting after this long; unfinished chunks are reported as pending
+
+        Returns:
+            Report with per-day statistics for every inverter and chunk progress counters
+        """
+        chunks = splitDateRange(start_date, end_date, self.chunk_days)
+        inverter_serials = self.data_manager.getInverterSerialNumbers(url_base, site_id, token)
+
+        checkpoint_path = self._getCheckpointPath(site_id, start_date, end_date)
+        completed = self._loadCheckpoint(checkpoint_path)
+
+        tasks = [
+            (serial, chunk_start, chunk_end)
+            for serial in inverter_serials
+            for chunk_start, chunk_end in chunks
+            if self._getChunkKey(serial, chunk_start, chunk_end) not in completed
+        ]
+        logging.info(f'Backfilling site {site_id} from {start_date} to {end_date}: {len(inverter_serials)} inverters, '
+                     f'{len(chunks)} chunks each, {len(tasks)} windows to fetch ({len(completed)} already done)')
+
+        failed = {}
+        if tasks:
+            # Each window holds its thread while a worker process aggregates it, so every process needs a thread;
+            # SolarEdge requests are still limited by the scheduler
+            parallel_chunks = max(self.max_parallel_chunks, self.analyzer.processes if self.analyzer else 0)
+            executor = ThreadPoolExecutor(max_workers=min(parallel_chunks, len(tasks)))
+            try:
+                futures = {
+                    executor.submit(self._runChunk, url_base, site_id, token, serial, chunk_start, chunk_end,
+                                    alert_threshold, completed, checkpoint_path):
+                        (serial, chunk_start, chunk_end)
+                    for serial, chunk_start, chunk_end in tasks
+                }
+                done, _ = wait(futures, timeout=timeout_seconds)
+            finally:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+            for future in done:
+                serial, chunk_start, chunk_end = futures[future]
+                key = self._getChunkKey(serial, chunk_start, chunk_end)
+                try:
+                    future.result()
+                except Exception as e:
+                    logging.error(f'Backfill chunk {key} failed: {e}')
+                    failed[key] = self._describeError(e)
+
+        # Chunks still running past the timeout may keep writing to completed
+        with self._checkpoint_lock:
+            completed = dict(completed)
+
+        days: Dict[str, Dict[str, dict]] = {}
+        chunks_completed = 0
+        for serial in inverter_serials:
+            for chunk_start, chunk_end in chunks:
+                key = self._getChunkKey(serial, chunk_start, chunk_end)
+                if key not in completed:
+                    continue
+                chunks_completed += 1
+                for day, stats in completed[key].items():
+                    days.setdefault(day, {})[serial] = stats
+
+        chunks_total = len(inverter_serials) * len(chunks)
+        pending = chunks_total - chunks_completed - len(failed)
+        report = {
+            'site_id': site_id,
+            'start_date': str(start_date),
+            'end_date': str(end_date),
+            'inverters': inverter_serials,
+            'chunks_total': chunks_total,
+            'chunks_completed': chunks_completed,
+            'chunks_failed': failed,
+            'chunks_pending': pending,
+            'days': {day: days[day] for day in sorted(days)}
+        }
+        logging.info(f'Backfill of site {site_id}: {report["chunks_completed"]}/{report["chunks_total"]} chunks done, '
+                     f'{len(failed)} failed, {pending} pending')
+        return report
+
+    def _runChunk(self, url_base: str, site_id: str, token: str, serial: str, chunk_start: str, chunk_end: str,
+                  alert_threshold: Optional[float], completed: Dict[str, Dict[str, dict]], checkpoint_path: Optional[str]) -> None:
+        """Fetch one chunk and checkpoint it as soon as it completes"""
+        result = self._fetchChunk(url_base, site_id, token, serial, chunk_start, chunk_end, alert_threshold)
+        key = self._getChunkKey(serial, chunk_start, chunk_end)
+        with self._checkpoint_lock:
+            completed[key] = result
+            self._appendCheckpoint(checkpoint_path, key, result)
+
+    def _fetchChunk(self, url_base: str, site_id: str, token: str, serial: str, chunk_start: str, chunk_end: str,
+                    alert_threshold: Optional[float]) -> Dict[str, dict]:
+        """Fetch one telemetry window and aggregate it per day"""
+        series = self.data_manager.fetchInverterSeries(url_base, site_id, serial, token, chunk_start, chunk_end)
+        if series is None:
+            # Unlike a window without samples, this says nothing about the window; fail it so a resumed run refetches it
+            raise MissingTelemetryError(f'No telemetry payload for inverter {serial} from {chunk_start} to {chunk_end}')
+
+        if self.analyzer is not None:
+            return self.analyzer.aggregateByDay(series, alert_threshold)
+
+        # Each day is a contiguous view of the chunk's buffers, no per-day copies
+        return {str(day): aggregateSeries(day_series, alert_threshold) for day, day_series in series.splitByDay()}
+
+    def _describeError(self, error: Exception) -> str:
+        """Summarize a chunk failure without echoing the request URL, which carries the API key"""
+        response = getattr(error, 'response', None)
+        if response is not None:
+            return f'{type(error).__name__}: HTTP {response.status_code}'
+        return type(error).__name__
+
+    def _getChunkKey(self, serial: str, chunk_start: str, chunk_end: str) -> str:
+        return f'{serial}|{chunk_start}|{chunk_end}'
+
+    def _getCheckpointPath(self, site_id: str, start_date: datetime.date, end_date: datetime.date) -> Optional[str]:
+        if not self.checkpoint_dir:
+            return None
+        return os.path.join(self.checkpoint_dir, f'backfill_{site_id}_{start_date}_{end_date}.ndjson')
+
+    def _loadCheckpoint(self, checkpoint_path: Optional[str]) -> Dict[str, Dict[str, dict]]:
+        """Read completed chunks from the append-only checkpoint file"""
+        completed = {}
+        if not checkpoint_path:
+            return completed
+        try:
+            with open(checkpoint_path, 'r') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A run killed mid-write leaves a partial last line
+                        continue
+                    completed[entry['chunk']] = entry['days']
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logging.warning(f'Ignoring unreadable backfill checkpoint {checkpoint_path}: {e}')
+        return completed
+
+    def _appendCheckpoint(self, checkpoint_path: Optional[str], key: str, days: Dict[str, dict]) -> None:
+        """Record a completed chunk; callers hold the checkpoint lock"""
+        if not checkpoint_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(checkpoint_path) or '.', exist_ok=True)
+            with open(checkpoint_path, 'a') as f:
+                f.write(json.dumps({'chunk': key, 'days': days}) + '\n')
+        except OSError as e:
+            logging.warning(f'Failed to write backfill checkpoint {checkpoint_path}: {e}')
@@ -1,30 +1,166 @@
-import requests
 import logging
-from typing import List, Optional
-from requests.exceptions import RequestException, HTTPError, Timeout
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple, TypeVar
+from urllib.parse import urlparse
+import requests
+from requests.exceptions import ConnectionError, RequestException, HTTPError, Timeout
 
 from shared_code.models.inverter_power import InverterPower
+from shared_code.models.telemetry_series import TelemetrySeries
+from shared_code.services.equipment_cache import EquipmentCache
+from shared_code.services.ingestion_state_store import IngestionStateStore
+from shared_code.services.request_scheduler import PRIORITY_ADHOC, QuotaExceededError, RequestScheduler, SchedulerTimeoutError
+from shared_code.services.resilience import (
+    ADMITTED, ADMITTED_TRIAL, RETRY_STATUS_CODES, CircuitBreakerRegistry, CircuitOpenError, RetryPolicy)
+from shared_code.services.run_metrics import RunMetrics, span
+from shared_code.services.session_manager import SessionManager
+from shared_code.services.telemetry_aggregator import (
+    RunningAggregator, aggregateSeries, formatTimestamp, parseTimestamp, toSeries)
+from shared_code.services.telemetry_store import TelemetryStore
+from shared_code.services.telemetry_stream import iterTelemetries
+
+T = TypeVar('T')
+
 
 class DataManager:
 
+    def __init__(self, max_workers: int = 1, pool_size: Optional[int] = None, request_limiter: Optional[threading.Semaphore] = None,
+                 equipment_cache: Optional[EquipmentCache] = None, telemetry_store: Optional[TelemetryStore] = None,
+                 stream_telemetry: bool = False, scheduler: Optional[RequestScheduler] = None, priority: int = PRIORITY_ADHOC,
+                 retry_policy: Optional[RetryPolicy] = None, circuit_breakers: Optional[CircuitBreakerRegistry] = None,
+                 timeouts: Tuple[float, float] = (10, 30), metrics: Optional[RunMetrics] = None,
+                 ingestion_store: Optional[IngestionStateStore] = None):
+        """
+        Args:
+            max_workers: Maximum number of inverter telemetry requests in flight at once (1 = sequential)
+            pool_size: Keep-alive connections to pool per host (defaults to max_workers, at least 10)
+            request_limiter: Semaphore shared between data managers to cap requests in flight across sites
+            equipment_cache: Cache for equipment lists (every call hits the API if not set)
+            telemetry_store: Local store serving telemetry for finalized windows without calling the API
+            stream_telemetry: Parse telemetry responses incrementally into a running aggregator instead of
+                building the whole sample list (streamed windows are not written to the telemetry store)
+            scheduler: Rate, concurrency and quota scheduler every API request goes through
+            priority: Scheduler priority of this manager's requests (scheduled runs go first)
+            retry_policy: Retry and backoff settings for transient errors (single attempt if not set)
+            circuit_breakers: Per-host circuit breakers that fail fast once the API is clearly down
+            timeouts: Connect and read timeouts in seconds
+            metrics: Run metrics receiving equipment fetch, telemetry fetch and aggregation spans
+            ingestion_store: Cursor store for incremental polling; power statistics then only fetch samples
+                newer than the previous poll and fold them into the stored running aggregate
+        """
+        self.max_workers = max(1, int(max_workers))
+        self.session_manager = SessionManager(pool_size or max(10, self.max_workers))
+        self.request_limiter = request_limiter
+        self.equipment_cache = equipment_cache
+        self.telemetry_store = telemetry_store
+        self.stream_telemetry = stream_telemetry
+        self.scheduler = scheduler
+        self.priority = priority
+        self.retry_policy = retry_policy
+        self.circuit_breakers = circuit_breakers
+        self.timeouts = timeouts
+        self.metrics = metrics
+        self.ingestion_store = ingestion_store
+        self._failed_inverters: List[str] = []
+        # Equipment list order, which failed inverters are reported in
+        self._inverter_serials: List[str] = []
+
+    def getFailedInverters(self) -> List[str]:
+        """Get the serials of inverters reported with zero power because their data could not be fetched"""
+        # Inverters fail in whatever order their fetches finish; report them in equipment order
+        order = {serial: index for index, serial in enumerate(self._inverter_serials)}
+        return sorted(self._failed_inverters, key=lambda serial: (order.get(serial, len(order)), serial))
+
+    def getSessionStats(self) -> dict:
+        """Get HTTP connection stats (new vs reused connections) for this run"""
+        return self.session_manager.getStats()
+
+    def _get(self, url: str, parameters: dict, stream: bool = False) -> requests.Response:
+        """Issue a SolarEdge API request, retrying transient errors and honouring the host circuit breaker"""
+        breaker = self.circuit_breakers.get(urlparse(url).netloc) if self.circuit_breakers else None
+        max_retries = self.retry_policy.max_retries if self.retry_policy else 0
+        started = time.monotonic()
+        attempt = 0
+
+        while True:
+            admission = breaker.allowRequest() if breaker is not None else ADMITTED
+            if admission is None:
+                raise CircuitOpenError(f'Circuit open for {breaker.host}, not calling the SolarEdge API')
+
+            retry_after = None
+            try:
+                response = self._send(url, parameters, stream)
+            except (ConnectionError, Timeout) as e:
+                if breaker is not None:
+                    breaker.recordFailure()
+                if not self._shouldRetry(attempt, max_retries, started):
+                    raise
+                logging.warning(f'Transient error calling SolarEdge API (attempt {attempt + 1}): {e}')
+            except BaseException:
+                # Quota, local scheduling and other client errors (or cancellation) say nothing about the host
+                if admission == ADMITTED_TRIAL:
+                    breaker.releaseTrial()
+                raise
+            else:
+                if response.status_code not in RETRY_STATUS_CODES:
+                    if breaker is not None:
+                        breaker.recordSuccess()
+                    return response
+
+                # Throttling means the host is up; only server errors count against the breaker
+                if breaker is not None:
+                    if response.status_code >= 500:
+                        breaker.recordFailure()
+                    else:
+                        breaker.recordSuccess()
+                if not self._shouldRetry(attempt, max_retries, started):
+                    return response
+                logging.warning(f'SolarEdge API returned {response.status_code} (attempt {attempt + 1}), retrying')
+                retry_after = response.headers.get('Retry-After')
+                response.close()
+
+            time.sleep(self.retry_policy.getDelay(attempt, retry_after))
+            attempt += 1
+
+    def _shouldRetry(self, attempt: int, max_retries: int, started: float) -> bool:
+        if attempt >= max_retries:
+            return False
+        return time.monotonic() - started < self.retry_policy.retry_budget_seconds
+
+    def _send(self, url: str, parameters: dict, stream: bool) -> requests.Response:
+        """Send a single request through the scheduler and shared request limit, if set"""
+        with ExitStack() as stack:
+            if self.scheduler is not None:
+                stack.enter_context(self.scheduler.acquire(parameters['api_key'], self.priority))
+            if self.request_limiter is not None:
+                stack.enter_context(self.request_limiter)
+            return self.session_manager.get(url, params=parameters, timeout=self.timeouts, stream=stream)
+
     def fetchInverterData(self, url_base: str, site_id: str, inverter_serial: str, token: str, start_datetime: str, end_datetime: str) -> Optional[dict]:
         """Fetch inverter data from SolarEdge API"""
         try:
-            url = f"{url_base}/equipment/{site_id}/{inverter_serial}/data"
-            parameters = {
-                'startTime': start_datetime, 
-                'endTime': end_datetime, 
-                'api_key': token
-            }
+            with span(self.metrics, 'telemetry_fetch', site_id=site_id, serial=inverter_serial, source='api') as attributes:
+                url = f"{url_base}/equipment/{site_id}/{inverter_serial}/data"
+                parameters = {
+                    'startTime': start_datetime, 
+                    'endTime': end_datetime, 
+                    'api_key': token
+                }
 
-            logging.info(f'Fetching inverter data for serial {inverter_serial} from {start_datetime} to {end_datetime}')
-            
-            response = requests.get(url, params=parameters, timeout=30)
-            response.raise_for_status()
-            
-            data = response.json()
-            logging.info(f'Successfully fetched data for inverter {inverter_serial}')
-            return data
+                logging.info(f'Fetching inverter data for serial {inverter_serial} from {start_datetime} to {end_datetime}')
+                
+                response = self._get(url, parameters)
+                attributes['status'] = response.status_code
+                response.raise_for_status()
+                
+                attributes['bytes'] = len(response.content)
+                data = response.json()
+                attributes['samples'] = len((data or {}).get('data', {}).get('telemetries', []))
+                logging.info(f'Successfully fetched data for inverter {inverter_serial}')
+                return data
             
         except HTTPError as e:
             logging.error(f'HTTP error fetching inverter data for {inverter_serial}: {e}')
@@ -39,6 +175,185 @@ class DataManager:
             logging.error(f'Unexpected error fetching inverter data for {inverter_serial}: {e}')
             raise
 
+    def fetchInverterSeries(self, url_base: str, site_id: str, inverter_serial: str, token: str, start_datetime: str,
+                            end_datetime: str, fields: Sequence[str] = ()) -> Optional[TelemetrySeries]:
+        """
+        Fetch inverter power telemetry as a TelemetrySeries, from the local store for finalized windows
+
+        Args:
+            fields: Extra telemetry fields to keep in the series besides timestamps and power
+
+        Returns:
+            The series, or None if the API returned no data
+        """
+        stored = self._getStoredSeries(site_id, inverter_serial, start_datetime, end_datetime, fields)
+        if stored is not None:
+            return stored
+
+        inverter_data = self.fetchInverterData(url_base, site_id, inverter_serial, token, start_datetime, end_datetime)
+        return self._toStoredSeries(site_id, inverter_serial, start_datetime, end_datetime, inverter_data, fields)
+
+    def _getStoredSeries(self, site_id: str, inverter_serial: str, start_datetime: str, end_datetime: str,
+                         fields: Sequence[str]) -> Optional[TelemetrySeries]:
+        """Get a finalized window from the telemetry store, or None if it has to be fetched"""
+        if self.telemetry_store is None or not self.telemetry_store.isFinalized(end_datetime):
+            return None
+
+        with span(self.metrics, 'telemetry_fetch', site_id=site_id, serial=inverter_serial, source='store') as attributes:
+            stored = self.telemetry_store.get(site_id, inverter_serial, start_datetime, end_datetime)
+            if stored is not None and not stored.hasFields(fields):
+                # Stored before these fields were needed; refetch so the store gets a complete copy
+                stored = None
+            attributes['hit'] = stored is not None
+            if stored is not None:
+                attributes['samples'] = len(stored)
+        if stored is not None:
+            logging.info(f'Using stored telemetry for inverter {inverter_serial} from {start_datetime} to {end_datetime}')
+        return stored
+
+    def _toStoredSeries(self, site_id: str, inverter_serial: str, start_datetime: str, end_datetime: str,
+                        inverter_data: Optional[dict], fields: Sequence[str]) -> Optional[TelemetrySeries]:
+        """Convert an API response into a series, keeping it in the telemetry store if its window is finalized"""
+        if not inverter_data or 'data' not in inverter_data:
+            return None
+
+        # Only the needed columns are kept; the sample dicts can be freed right away
+        series = toSeries(inverter_serial, inverter_data['data'].get('telemetries', []), fields)
+        if self.telemetry_store is not None and self.telemetry_store.isFinalized(end_datetime) and len(series):
+            self.telemetry_store.put(site_id, inverter_serial, start_datetime, end_datetime, series)
+        return series
+
+    def fetchInverterStats(self, url_base: str, site_id: str, inverter_serial: str, token: str, start_datetime: str, end_datetime: str,
+                           alert_threshold: Optional[float] = None) -> dict:
+        """Stream inverter telemetry from SolarEdge API straight into a running aggregator"""
+        aggregator = RunningAggregator(alert_threshold)
+
+        if self.telemetry_store is not None and self.telemetry_store.isFinalized(end_datetime):
+            stored = self.telemetry_store.get(site_id, inverter_serial, start_datetime, end_datetime)
+            if stored is not None:
+                logging.info(f'Using stored telemetry for inverter {inverter_serial} from {start_datetime} to {end_datetime}')
+                with span(self.metrics, 'aggregation', site_id=site_id, serial=inverter_serial, samples=len(stored)):
+                    return aggregateSeries(stored, alert_threshold)
+
+        try:
+            url = f"{url_base}/equipment/{site_id}/{inverter_serial}/data"
+            parameters = {
+                'startTime': start_datetime,
+                'endTime': end_datetime,
+                'api_key': token
+            }
+
+            logging.info(f'Streaming inverter data for serial {inverter_serial} from {start_datetime} to {end_datetime}')
+
+            # Parsing and aggregation happen while the body streams in, so they are part of this span
+            with span(self.metrics, 'telemetry_fetch', site_id=site_id, serial=inverter_serial, source='stream') as attributes:
+                response = self._get(url, parameters, stream=True)
+                attributes['status'] = response.status_code
+                attributes['bytes'] = 0
+                try:
+                    response.raise_for_status()
+                    for sample in iterTelemetries(self._countBytes(response.iter_content(chunk_size=65536), attributes)):
+                        aggregator.update(sample)
+                finally:
+                    # Return the connection to the pool even if parsing stopped early
+                    response.close()
+                attributes['samples'] = aggregator.samples
+
+            logging.info(f'Successfully streamed {aggregator.samples} samples for inverter {inverter_serial}')
+            return aggregator.getStats()
+
+        except HTTPError as e:
+            logging.error(f'HTTP error streaming inverter data for {inverter_serial}: {e}')
+            raise
+        except Timeout as e:
+            logging.error(f'Timeout streaming inverter data for {inverter_serial}: {e}')
+            raise
+        except RequestException as e:
+            logging.error(f'Request error streaming inverter data for {inverter_serial}: {e}')
+            raise
+        except Exception as e:
+            logging.error(f'Unexpected error streaming inverter data for {inverter_serial}: {e}')
+            raise
+
+    def fetchInverterStatsIncremental(self, url_base: str, site_id: str, inverter_serial: str, token: str,
+                                      start_datetime: str, end_datetime: str, alert_threshold: Optional[float] = None) -> dict:
+        """
+        Update an inverter window's running statistics with the samples published since the previous poll
+
+        Samples at or before the stored high-water mark are skipped, so each poll costs O(new samples).
+        Windows whose high-water mark has reached the window end, or that are finalized, are served
+        without calling the API.
+        """
+        cursor = self.ingestion_store.get(site_id, inverter_serial, start_datetime, end_datetime)
+        high_water = None
+        aggregator = RunningAggregator(alert_threshold)
+        if cursor is not None:
+            stored_high_water, state = cursor
+            if state.get('alert_threshold') == alert_threshold:
+                high_water = stored_high_water
+                aggregator = RunningAggregator.fromState(state)
+            else:
+                # Low-sample counts depend on the threshold, so a changed threshold starts the window over
+                logging.info(f'Alert threshold changed, re-ingesting window for inverter {inverter_serial}')
+
+        window_end = parseTimestamp(end_datetime)
+        with span(self.metrics, 'telemetry_fetch', site_id=site_id, serial=inverter_serial, source='incremental') as attributes:
+            if high_water is not None and window_end is not None and high_water >= window_end:
+                attributes['samples'] = 0
+                logging.info(f'Window for inverter {inverter_serial} is complete, not calling the API')
+                return aggregator.getStats()
+
+            fetch_start = start_datetime if high_water is None else formatTimestamp(high_water + 1)
+            url = f"{url_base}/equipment/{site_id}/{inverter_serial}/data"
+            parameters = {
+                'startTime': fetch_start,
+                'endTime': end_datetime,
+                'api_key': token
+            }
+
+            logging.info(f'Fetching new inverter data for serial {inverter_serial} from {fetch_start} to {end_datetime}')
+
+            try:
+                response = self._get(url, parameters, stream=True)
+                attributes['status'] = response.status_code
+                attributes['bytes'] = 0
+                new_samples = 0
+                try:
+                    response.raise_for_status()
+                    for sample in iterTelemetries(self._countBytes(response.iter_content(chunk_size=65536), attributes)):
+                        timestamp = parseTimestamp(sample.get('date'))
+                        # Undated samples cannot be tracked by the cursor and older ones are already counted
+                        if timestamp is None or (high_water is not None and timestamp <= high_water):
+                            continue
+                        aggregator.update(sample)
+                        high_water = timestamp
+                        new_samples += 1
+                finally:
+                    response.close()
+                attributes['samples'] = new_samples
+
+            except HTTPError as e:
+                logging.error(f'HTTP error fetching new inverter data for {inverter_serial}: {e}')
+                raise
+            except Timeout as e:
+                logging.error(f'Timeout fetching new inverter data for {inverter_serial}: {e}')
+                raise
+            except RequestException as e:
+                logging.error(f'Request error fetching new inverter data for {inverter_serial}: {e}')
+                raise
+
+        if window_end is not None and self.ingestion_store.isFinalized(end_datetime):
+            # Nothing newer can arrive, so later polls are answered from the stored aggregate
+            high_water = max(high_water or window_end, window_end)
+        self.ingestion_store.put(site_id, inverter_serial, start_datetime, end_datetime, high_water, aggregator.toState())
+        logging.info(f'Added {new_samples} new samples for inverter {inverter_serial}, {aggregator.samples} in window')
+        return aggregator.getStats()
+
+    def _countBytes(self, chunks: Iterator[bytes], attributes: dict) -> Iterator[bytes]:
+        for chunk in chunks:
+            attributes['bytes'] += len(chunk)
+            yield chunk
+
     def fetchEquipment(self, url_base: str, site_id: str, token: str) -> Optional[dict]:
         """Fetch equipment list from SolarEdge API"""
         try:
@@ -47,7 +362,7 @@ class DataManager:
 
             logging.info(f'Fetching equipment data for site {site_id}')
             
-            response = requests.get(url, params=parameters, timeout=30)
+            response = self._get(url, parameters)
             response.raise_for_status()
             
             data = response.json()
@@ -67,42 +382,91 @@ class DataManager:
             logging.error(f'Unexpected error fetching equipment data: {e}')
             raise
 
+    def invalidateEquipmentCache(self, site_id: Optional[str] = None) -> None:
+        """Force the next lookup for a site (or all sites) to refetch the equipment list"""
+        if self.equipment_cache:
+            self.equipment_cache.invalidate(site_id)
+
     def getInverterSerialNumbers(self, url_base: str, site_id: str, token: str) -> List[str]:
         """Get list of inverter serial numbers from equipment list"""
         try:
-            data = self.fetchEquipment(url_base, site_id, token)
+            with span(self.metrics, 'equipment_fetch', site_id=site_id) as attributes:
+                data = self.equipment_cache.get(site_id) if self.equipment_cache else None
+                attributes['cached'] = data is not None
+                if data is None:
+                    data = self.fetchEquipment(url_base, site_id, token)
+                    if data and self.equipment_cache:
+                        self.equipment_cache.set(site_id, data)
+
+            return self._parseInverterSerials(data)
+            
+        except Exception as e:
+            logging.error(f'Error getting inverter serial numbers: {e}')
+            raise
+
+    def _parseInverterSerials(self, data: Optional[dict]) -> List[str]:
+        """Get the inverter serial numbers from an equipment list response"""
+        if not data:
+            logging.error("No equipment data received from API")
+            raise ValueError("No equipment data received from API")
+
+        equipment_list = data.get('reporters', {}).get('list', [])
+
+        if not equipment_list:
+            logging.warning("No equipment found in the site")
+            return []
 
-            if not data:
-                logging.error("No equipment data received from API")
-                raise ValueError("No equipment data received from API")
+        result = []
+        for item in equipment_list:
+            if item.get('name', '').startswith('Inverter'):
+                serial = item.get('serialNumber')
+                if serial:
+                    result.append(serial)
+                    logging.info(f'Found inverter with serial: {serial}')
 
-            equipment_list = data.get('reporters', {}).get('list', [])
+        if not result:
+            logging.warning("No inverters found in equipment list")
+        else:
+            logging.info(f'Found {len(result)} inverters total')
 
-            if not equipment_list:
-                logging.warning("No equipment found in the site")
+        self._inverter_serials = result
+        return result
+
+    def getAllInverterPower(self, url_base: str, site_id: str, token: str, start_datetime: str, end_datetime: str,
+                            alert_threshold: Optional[float] = None) -> List[InverterPower]:
+        """Get power data for all inverters in the site"""
+        try:
+            inverter_serials = self.getInverterSerialNumbers(url_base, site_id, token)
+
+            if not inverter_serials:
+                logging.warning("No inverters found to process")
                 return []
 
-            result = []
-            for item in equipment_list:
-                if item.get('name', '').startswith('Inverter'):
-                    serial = item.get('serialNumber')
-                    if serial:
-                        result.append(serial)
-                        logging.info(f'Found inverter with serial: {serial}')
+            logging.info(f'Processing {len(inverter_serials)} inverters with up to {self.max_workers} concurrent requests')
 
-            if not result:
-                logging.warning("No inverters found in equipment list")
-            else:
-                logging.info(f'Found {len(result)} inverters total')
+            def fetch(serial: str) -> InverterPower:
+                return self.getInverterPower(url_base, site_id, serial, token, start_datetime, end_datetime, alert_threshold)
+
+            result = self._mapInverters(fetch, inverter_serials)
 
+            logging.info(f'Successfully processed {len(result)} inverters')
             return result
             
         except Exception as e:
-            logging.error(f'Error getting inverter serial numbers: {e}')
+            logging.error(f'Error getting inverter power data: {e}')
             raise
 
-    def getAllInverterPower(self, url_base: str, site_id: str, token: str, start_datetime: str, end_datetime: str) -> List[InverterPower]:
-        """Get power data for all inverters in the site"""
+    def getAllInverterSeries(self, url_base: str, site_id: str, token: str, start_datetime: str, end_datetime: str,
+                             fields: Sequence[str] = ()) -> List[TelemetrySeries]:
+        """
+        Get the telemetry series of all inverters in the site, with one fetch per inverter
+
+        Args:
+            fields: Extra telemetry fields to keep in each series besides timestamps and power
+
+        Returns:
+            One series per inverter in equipment list order (empty for inverters that could not be fetched)
+        """
         try:
             inverter_serials = self.getInverterSerialNumbers(url_base, site_id, token)
 
@@ -110,44 +474,84 @@ class DataManager:
                 logging.warning("No inverters found to process")
                 return []
 
-            result = []
-            logging.info(f'Processing {len(inverter_serials)} inverters')
+            logging.info(f'Processing {len(inverter_serials)} inverters with up to {self.max_workers} concurrent requests')
 
-            for serial in inverter_serials:
-                try:
-                    inverter_data = self.fetchInverterData(url_base, site_id, serial, token, start_datetime, end_datetime)
-                    
-                    if not inverter_data or 'data' not in inverter_data:
-                        logging.warning(f'No data received for inverter {serial}')
-                        result.append(InverterPower(serial, 0.0, 0.0))
-                        continue
+            def fetch(serial: str) -> TelemetrySeries:
+                return self.getInverterSeries(url_base, site_id, serial, token, start_datetime, end_datetime, fields)
 
-                    all_samples = inverter_data['data'].get('telemetries', [])
+            result = self._mapInverters(fetch, inverter_serials)
+
+            logging.info(f'Successfully processed {len(result)} inverters')
+            return result
+
+        except Exception as e:
+            logging.error(f'Error getting inverter series data: {e}')
+            raise
 
-                    if not all_samples:
-                        logging.warning(f'No telemetry samples found for inverter {serial}')
-                        result.append(InverterPower(serial, 0.0, 0.0))
-                        continue
+    def _mapInverters(self, fetch: Callable[[str], T], inverter_serials: List[str]) -> List[T]:
+        """Run fetch for every inverter, concurrently up to max_workers"""
+        if self.max_workers == 1 or len(inverter_serials) == 1:
+            return [fetch(serial) for serial in inverter_serials]
+        # map() yields in submission order, so results line up with inverter_serials
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(inverter_serials))) as executor:
+            return list(executor.map(fetch, inverter_serials))
 
-                    # Calculate last and average power
-                    last_sample = all_samples[-1]
-                    last_power = last_sample.get('totalActivePower', 0.0)
+    def getInverterSeries(self, url_base: str, site_id: str, inverter_serial: str, token: str, start_datetime: str,
+                          end_datetime: str, fields: Sequence[str] = ()) -> TelemetrySeries:
+        """Get the telemetry series of a single inverter, empty if it cannot be fetched"""
+        try:
+            series = self.fetchInverterSeries(url_base, site_id, inverter_serial, token, start_datetime, end_datetime, fields)
+            if series is None or len(series) == 0:
+                logging.warning(f'No telemetry samples found for inverter {inverter_serial}')
+                return TelemetrySeries.empty(inverter_serial)
+            return series
 
-                    total_power = sum(sample.get('totalActivePower', 0.0) for sample in all_samples)
-                    average_power = total_power / len(all_samples) if all_samples else 0.0
+        except (QuotaExceededError, SchedulerTimeoutError, CircuitOpenError):
+            raise
+        except Exception as e:
+            logging.error(f'Error processing inverter {inverter_serial}: {e}')
+            self._failed_inverters.append(inverter_serial)
+            return TelemetrySeries.empty(inverter_serial)
 
-                    logging.info(f'Inverter {serial}: {len(all_samples)} samples, avg={average_power:.1f}W, last={last_power:.1f}W')
-                    result.append(InverterPower(serial, average_power, last_power))
+    def getInverterPower(self, url_base: str, site_id: str, inverter_serial: str, token: str, start_datetime: str, end_datetime: str,
+                         alert_threshold: Optional[float] = None) -> InverterPower:
+        """Get power data for a single inverter, returning zero power if it cannot be fetched"""
+        try:
+            if self.ingestion_store is not None or self.stream_telemetry:
+                fetch = self.fetchInverterStatsIncremental if self.ingestion_store is not None else self.fetchInverterStats
+                stats = fetch(url_base, site_id, inverter_serial, token, start_datetime, end_datetime, alert_threshold)
+                if stats['samples'] == 0:
+                    logging.warning(f'No telemetry samples found for inverter {inverter_serial}')
+                    return InverterPower(inverter_serial, 0.0, 0.0)
+                return InverterPower.fromStats(inverter_serial, stats)
 
-                except Exception as e:
-                    logging.error(f'Error processing inverter {serial}: {e}')
-                    # Add zero power entry for failed inverter to maintain visibility
-                    result.append(InverterPower(serial, 0.0, 0.0))
-                    continue
+            series = self.fetchInverterSeries(url_base, site_id, inverter_serial, token, start_datetime, end_datetime)
+            return self._summarizeSeries(site_id, inverter_serial, series, alert_threshold)
 
-            logging.info(f'Successfully processed {len(result)} inverters')
-            return result
-            
+        except (QuotaExceededError, SchedulerTimeoutError, CircuitOpenError):
+            # Out of quota, no free request slot or API down says nothing about the inverter,
+            # so fail the run instead of reporting zero power
+            raise
         except Exception as e:
-            logging.error(f'Error getting inverter power data: {e}')
-            raise
\ No newline at end of file
+            logging.error(f'Error processing inverter {inverter_serial}: {e}')
+            # Add zero power entry for failed inverter to maintain visibility
+            self._failed_inverters.append(inverter_serial)
+            return InverterPower(inverter_serial, 0.0, 0.0)
+
+    def _summarizeSeries(self, site_id: str, inverter_serial: str, series: Optional[TelemetrySeries],
+                         alert_threshold: Optional[float]) -> InverterPower:
+        """Aggregate a fetched series into InverterPower, with zero power if there is no data"""
+        if series is None:
+            logging.warning(f'No data received for inverter {inverter_serial}')
+            return InverterPower(inverter_serial, 0.0, 0.0)
+
+        if len(series) == 0:
+            logging.warning(f'No telemetry samples found for inverter {inverter_serial}')
+            return InverterPower(inverter_serial, 0.0, 0.0)
+
+        with span(self.metrics, 'aggregation', site_id=site_id, serial=inverter_serial, samples=len(series)):
+            stats = aggregateSeries(series, alert_threshold)
+
+        logging.info(f'Inverter {inverter_serial}: {stats["samples"]} samples, avg={stats["average"]:.1f}W, last={stats["last"]:.1f}W, '
+                     f'min={stats["minimum"]:.1f}W, max={stats["maximum"]:.1f}W, energy={stats["energy_wh"]:.1f}Wh')
+        return InverterPower.fromStats(inverter_serial, stats)
@@ -1,18 +1,193 @@
-import sendgrid
 import logging
-from sendgrid.helpers.mail import Mail, Email, To, Content
-from typing import Optional
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from shared_code.services.run_metrics import RunMetrics, span
+
+if TYPE_CHECKING:
+    import sendgrid
+
+# Clients and the send pool are shared so warm invocations reuse them
+_clients: Dict[str, 'sendgrid.SendGridAPIClient'] = {}
+_clients_lock = threading.Lock()
+_send_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='email-send')
+
+
+def getSendGridClient(api_key: str) -> 'sendgrid.SendGridAPIClient':
+    """Get the shared SendGrid client for an API key"""
+    # Imported on first send; most runs send no email and should not pay for loading sendgrid
+    import sendgrid
+
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = sendgrid.SendGridAPIClient(api_key=api_key)
+            _clients[api_key] = client
+        return client
+
 
 class EmailManager:
 
-    def sendAlertEmail(self, api_key: str, to: str, from_email: str, serial: str) -> Optional[dict]:
-        """Send alert email via SendGrid"""
+    def __init__(self, metrics: Optional[RunMetrics] = None):
+        """
+        Args:
+            metrics: Run metrics receiving a span per email sent
+        """
+        self.metrics = metrics
+
+    def sendAlertEmailAsync(self, api_key: str, to: str, from_email: str, serial: str,
+                            reasons: Optional[List[str]] = None) -> Future:
+        """Queue an alert email on the background send pool"""
+        return _send_executor.submit(self.sendAlertEmail, api_key, to, from_email, serial, reasons)
+
+    def sendRecoveryEmailAsync(self, api_key: str, to: str, from_email: str, serial: str) -> Future:
+        """Queue a recovery notice on the background send pool"""
+        return _send_executor.submit(self.sendRecoveryEmail, api_key, to, from_email, serial)
+
+    def sendAlertDigestAsync(self, api_key: str, to: str, from_email: str, alerts: List[dict]) -> Future:
+        """Queue an alert digest on the background send pool"""
+        return _send_executor.submit(self.sendAlertDigest, api_key, to, from_email, alerts)
+
+    def sendAlertDigest(self, api_key: str, to: str, from_email: str, alerts: List[dict]) -> Optional[dict]:
+        """
+        Send every alert from a run in a single email via SendGrid
+
+        Args:
+            api_key: SendGrid API key
+            to: Recipient address
+            from_email: Sender address
+            alerts: Alert entries with serial, last, average and threshold, plus site_id for fleet runs and
+                reasons for the violated rules; entries with recovered set are listed as recovery notices
+        """
+        if not alerts:
+            return None
+
+        try:
+            from sendgrid.helpers.mail import Content, Email, Mail, To
+
+            sg = getSendGridClient(api_key)
+
+            failing = [alert for alert in alerts if not alert.get('recovered')]
+            recovered = [alert for alert in alerts if alert.get('recovered')]
+
+            sites = sorted({str(alert['site_id']) for alert in failing if alert.get('site_id')})
+            if failing:
+                subject = f"🔴 SolarEdge Power Alert: {len(failing)} inverter{'s' if len(failing) != 1 else ''}"
+                if sites:
+                    subject += f" at {len(sites)} site{'s' if len(sites) != 1 else ''}"
+            else:
+                subject = f"🟢 SolarEdge Power Recovered: {len(recovered)} inverter{'s' if len(recovered) != 1 else ''}"
+
+            sections = []
+            if failing:
+                sections.append('Power generation of the following inverters is outside of acceptable parameters:\n\n'
+                                + '\n'.join(self._formatDigestLine(alert) for alert in failing))
+            if recovered:
+                sections.append('The following inverters are generating normally again:\n\n'
+                                + '\n'.join(self._formatDigestLine(alert) for alert in recovered))
+            alert_text = '\n\n'.join(sections)
+
+            content_text = f"""
+SolarEdge Power Generation Alert
+
+{alert_text}
+
+Next Steps:
+1. Login to your SolarEdge portal to review generation data
+2. Check for any system maintenance notifications
+3. Contact your installer if the issue persists
+
+This is an automated alert from your solar monitoring system.
+            """.strip()
+
+            mail = Mail(Email(from_email), To(to), subject, Content("text/plain", content_text))
+
+            logging.info(f'Sending alert digest for {len(failing)} failing and {len(recovered)} recovered inverters to {to}')
+            with span(self.metrics, 'email_send', kind='digest', notices=len(alerts)) as attributes:
+                response = sg.send(mail)
+                attributes['status'] = response.status_code
+
+            if response.status_code == 202:
+                logging.info(f'Alert digest sent successfully for {len(alerts)} inverters')
+            else:
+                logging.warning(f'Alert digest sent with status code {response.status_code}')
+
+            return {
+                'status_code': response.status_code,
+                'body': response.body,
+                'headers': dict(response.headers)
+            }
+
+        except Exception as e:
+            logging.error(f'Failed to send alert digest for {len(alerts)} inverters: {e}')
+            raise
+
+    def sendRecoveryEmail(self, api_key: str, to: str, from_email: str, serial: str) -> Optional[dict]:
+        """Send a notice via SendGrid that a previously alerted inverter is healthy again"""
         try:
-            sg = sendgrid.SendGridAPIClient(api_key=api_key)
+            from sendgrid.helpers.mail import Content, Email, Mail, To
+
+            sg = getSendGridClient(api_key)
+
+            content_text = f"""
+SolarEdge Power Generation Recovered
+
+Your solar inverter is generating within acceptable parameters again.
+
+Inverter Details:
+- Serial Number: {serial}
+
+No action is needed. This is an automated notice from your solar monitoring system.
+            """.strip()
+
+            mail = Mail(Email(from_email), To(to), "🟢 SolarEdge Power Recovered", Content("text/plain", content_text))
+
+            logging.info(f'Sending recovery email for inverter {serial} to {to}')
+            with span(self.metrics, 'email_send', kind='recovery', serial=serial) as attributes:
+                response = sg.send(mail)
+                attributes['status'] = response.status_code
+
+            if response.status_code == 202:
+                logging.info(f'Recovery email sent successfully for inverter {serial}')
+            else:
+                logging.warning(f'Recovery email sent with status code {response.status_code} for inverter {serial}')
+
+            return {
+                'status_code': response.status_code,
+                'body': response.body,
+                'headers': dict(response.headers)
+            }
+
+        except Exception as e:
+            logging.error(f'Failed to send recovery email for inverter {serial}: {e}')
+            raise
+
+    def _formatDigestLine(self, alert: dict) -> str:
+        site = f"Site {alert['site_id']}, " if alert.get('site_id') else ''
+        line = (f"- {site}Serial Number: {alert['serial']} "
+                f"(last={alert['last']:.1f}W, average={alert['average']:.1f}W, threshold={alert['threshold']:.1f}W)")
+        if alert.get('reasons') and not alert.get('recovered'):
+            line += ''.join(f"\n    {reason}" for reason in alert['reasons'])
+        return line
+
+    def sendAlertEmail(self, api_key: str, to: str, from_email: str, serial: str,
+                       reasons: Optional[List[str]] = None) -> Optional[dict]:
+        """
+        Send alert email via SendGrid
+
+        Args:
+            reasons: Violated evaluation rules to list in the email
+        """
+        try:
+            from sendgrid.helpers.mail import Content, Email, Mail, To
+
+            sg = getSendGridClient(api_key)
             
             from_email_obj = Email(from_email)
             to_email_obj = To(to)
             subject = "🔴 SolarEdge Power Alert"
+            failed_checks = ''.join(f"\n- Failed check: {reason}" for reason in reasons or [])
             
             content_text = f"""
 SolarEdge Power Generation Alert
@@ -21,7 +196,7 @@ Your solar inverter power generation is outside of acceptable parameters.
 
 Inverter Details:
 - Serial Number: {serial}
-- Alert Time: Please check the monitoring portal for exact timing
+- Alert Time: Please check the monitoring portal for exact timing{failed_checks}
 
 Next Steps:
 1. Login to your SolarEdge portal to review generation data
@@ -35,7 +210,9 @@ This is an automated alert from your solar monitoring system.
             mail = Mail(from_email_obj, to_email_obj, subject, content)
             
             logging.info(f'Sending alert email for inverter {serial} to {to}')
-            response = sg.send(mail)
+            with span(self.metrics, 'email_send', kind='alert', serial=serial) as attributes:
+                response = sg.send(mail)
+                attributes['status'] = response.status_code
             
             if response.status_code == 202:
                 logging.info(f'Alert email sent successfully for inverter {serial}')
@@ -0,0 +1,105 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+# Shared by every cache instance so warm Azure Functions invocations skip the equipment call
+_memory_cache: Dict[str, Tuple[float, dict]] = {}
+_memory_cache_lock = threading.Lock()
+
+
+class EquipmentCache:
+
+    def __init__(self, ttl_seconds: float = 86400, cache_dir: Optional[str] = None):
+        """
+        Args:
+            ttl_seconds: How long a cached equipment list stays valid
+            cache_dir: Directory for the file-backed layer that survives cold starts (memory only if not set)
+        """
+        self.ttl_seconds = ttl_seconds
+        self.cache_dir = cache_dir
+
+    def get(self, site_id: str) -> Optional[dict]:
+        """Get the cached equipment list for a site, or None if missing or expired"""
+        now = time.time()
+
+        with _memory_cache_lock:
+            entry = _memory_cache.get(site_id)
+        if entry and now - entry[0] < self.ttl_seconds:
+            logging.info(f'Equipment cache hit (memory) for site {site_id}')
+            return entry[1]
+
+        entry = self._readFile(site_id)
+        if entry and now - entry[0] < self.ttl_seconds:
+            logging.info(f'Equipment cache hit (file) for site {site_id}')
+            with _memory_cache_lock:
+                _memory_cache[site_id] = entry
+            return entry[1]
+
+        return None
+
+    def set(self, site_id: str, data: dict) -> None:
+        """Store the equipment list for a site in every cache layer"""
+        entry = (time.time(), data)
+        with _memory_cache_lock:
+            _memory_cache[site_id] = entry
+        self._writeFile(site_id, entry)
+
+    def invalidate(self, site_id: Optional[str] = None) -> None:
+        """Drop the cached equipment list for a site, or for every site if none is given"""
+        with _memory_cache_lock:
+            if site_id is None:
+                site_ids = list(_memory_cache.keys())
+                _memory_cache.clear()
+            else:
+                site_ids = [site_id]
+                _memory_cache.pop(site_id, None)
+
+        if self.cache_dir:
+            if site_id is None:
+                site_ids = [
+                    name[len('equipment_'):-len('.json')]
+                    for name in os.listdir(self.cache_dir)
+                    if name.startswith('equipment_') and name.endswith('.json')
+                ] if os.path.isdir(self.cache_dir) else []
+            for cached_site in site_ids:
+                try:
+                    os.remove(self._getFilePath(cached_site))
+                except FileNotFoundError:
+                    pass
+
+        logging.info(f'Invalidated equipment cache for {site_id or "all sites"}')
+
+    def _getFilePath(self, site_id: str) -> str:
+        return os.path.join(self.cache_dir, f'equipment_{site_id}.json')
+
+    def _readFile(self, site_id: str) -> Optional[Tuple[float, dict]]:
+        if not self.cache_dir:
+            return None
+
+        try:
+            with open(self._getFilePath(site_id), 'r') as f:
+                cached = json.load(f)
+            return float(cached['fetched_at']), cached['data']
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError, OSError) as e:
+            logging.warning(f'Ignoring unreadable equipment cache file for site {site_id}: {e}')
+            return None
+
+    def _writeFile(self, site_id: str, entry: Tuple[float, dict]) -> None:
+        if not self.cache_dir:
+            return
+
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self._getFilePath(site_id)
+            # Write to a temp file first so concurrent readers never see a partial file
+            temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(temp_path, 'w') as f:
+                json.dump({'fetched_at': entry[0], 'data': entry[1]}, f)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logging.warning(f'Failed to write equipment cache file for site {site_id}: {e}')
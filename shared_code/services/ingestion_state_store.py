@@ -0,0 +1,111 @@
+import datetime
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, Optional, Tuple
+
+# Stores are kept open at module level so warm invocations reuse the SQLite connection
+_stores: Dict[str, 'IngestionStateStore'] = {}
+_stores_lock = threading.Lock()
+
+
+def getIngestionStateStore(db_path: str, retention_days: float = 7, finalize_after_hours: float = 24) -> 'IngestionStateStore':
+    """Get the process-wide ingestion state store for a database file"""
+    with _stores_lock:
+        store = _stores.get(db_path)
+        if store is None:
+            store = IngestionStateStore(db_path, retention_days, finalize_after_hours)
+            _stores[db_path] = store
+        store.finalize_after_hours = finalize_after_hours
+        return store
+
+
+class IngestionStateStore:
+    """
+    Keeps a high-water mark and running aggregate per inverter window between polls
+
+    Each poll only asks SolarEdge for samples newer than the high-water mark and folds them
+    into the stored aggregate, so frequent polling costs O(new samples) instead of refetching
+    the whole window every time.
+    """
+
+    def __init__(self, db_path: str, retention_days: float = 7, finalize_after_hours: float = 24):
+        """
+        Args:
+            db_path: SQLite database file holding the ingestion cursors
+            retention_days: Cursors not updated for this many days are removed when the store is opened
+            finalize_after_hours: Hours after a window ends before no more samples are expected for it
+        """
+        self.db_path = db_path
+        self.finalize_after_hours = finalize_after_hours
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock:
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS ingestion_cursor ('
+                ' site_id TEXT NOT NULL,'
+                ' serial TEXT NOT NULL,'
+                ' start_time TEXT NOT NULL,'
+                ' end_time TEXT NOT NULL,'
+                ' high_water REAL,'
+                ' updated_at REAL NOT NULL,'
+                ' state BLOB NOT NULL,'
+                ' PRIMARY KEY (site_id, serial, start_time, end_time)'
+                ') WITHOUT ROWID')
+            removed = self._connection.execute(
+                'DELETE FROM ingestion_cursor WHERE updated_at < ?', (time.time() - retention_days * 86400,)).rowcount
+            self._connection.commit()
+        if removed:
+            logging.info(f'Removed {removed} expired ingestion cursors')
+
+    def isFinalized(self, end_datetime: str) -> bool:
+        """Check whether a window ended long enough ago that polling it again cannot return new samples"""
+        try:
+            window_end = datetime.datetime.strptime(end_datetime, '%Y-%m-%d %H:%M:%S')
+        except ValueError:
+            return False
+        # Window times are site-local; the margin covers timezone offsets and late uploads
+        return window_end + datetime.timedelta(hours=self.finalize_after_hours) <= datetime.datetime.utcnow()
+
+    def get(self, site_id: str, serial: str, start_datetime: str, end_datetime: str) -> Optional[Tuple[Optional[float], dict]]:
+        """Get the high-water mark (epoch seconds, None before the first sample) and aggregator state of an inverter window"""
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT high_water, state FROM ingestion_cursor '
+                'WHERE site_id = ? AND serial = ? AND start_time = ? AND end_time = ?',
+                (site_id, serial, start_datetime, end_datetime)).fetchone()
+
+        if row is None:
+            return None
+
+        high_water, payload = row
+        try:
+            return high_water, json.loads(zlib.decompress(payload))
+        except (zlib.error, ValueError) as e:
+            logging.warning(f'Ignoring corrupt ingestion cursor for inverter {serial}: {e}')
+            return None
+
+    def put(self, site_id: str, serial: str, start_datetime: str, end_datetime: str, high_water: Optional[float],
+            state: dict) -> None:
+        """Save the high-water mark and aggregator state of an inverter window"""
+        payload = zlib.compress(json.dumps(state).encode('utf-8'))
+        with self._lock:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO ingestion_cursor (site_id, serial, start_time, end_time, high_water, updated_at, state) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (site_id, serial, start_datetime, end_datetime, high_water, time.time(), payload))
+            self._connection.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
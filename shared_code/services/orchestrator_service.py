@@ -1,113 +1,972 @@
+import asyncio
 import datetime
 import os
 import logging
-from typing import Optional
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple, Union
 
+from shared_code.models.check_report import CHECK_NO_DATA, CheckReport, getResultContent
+from shared_code.models.inverter_power import InverterPower
+from shared_code.models.service_settings import ServiceSettings
+from shared_code.models.site_config import SiteConfig
+from shared_code.models.telemetry_series import TelemetrySeries
+from shared_code.services.alert_state_store import (
+    ACTION_ALERT, ACTION_NONE, ACTION_SUPPRESS, ACTION_RECOVER, STATE_ALERT, STATE_OK, AlertStateStore, getAlertStateStore)
+from shared_code.services.anomaly_detector import AnomalyDetector
+from shared_code.services.anomaly_history_store import getAnomalyHistoryStore
+from shared_code.services.backfill_service import BackfillService
 from shared_code.services.data_manager import DataManager
 from shared_code.services.email_manager import EmailManager
+from shared_code.services.ingestion_state_store import IngestionStateStore, getIngestionStateStore
+from shared_code.services.equipment_cache import EquipmentCache
+from shared_code.services.parallel_analyzer import getParallelAnalyzer
+from shared_code.services.report_archive import ReportArchive
+from shared_code.services.request_scheduler import (
+    PRIORITY_ADHOC, PRIORITY_BACKFILL, RequestScheduler, getRequestScheduler)
+from shared_code.services.resilience import RetryPolicy, getCircuitBreakerRegistry
+from shared_code.services.result_cache import CACHE_MISS, CachedResult, ResultCache, getResultCache
+from shared_code.services.rule_evaluator import RuleEvaluator
+from shared_code.services.run_metrics import AppInsightsExporter, RunMetrics, span
+from shared_code.services.telemetry_aggregator import aggregateWindows
+from shared_code.services.telemetry_store import TelemetryStore, getTelemetryStore
+
+if TYPE_CHECKING:
+    from shared_code.services.async_data_manager import AsyncDataManager
+
+# Azure drops HTTP responses that take longer than 230 seconds; runs inside a request stop waiting before that
+HTTP_DEADLINE_SECONDS = 220
 
 
 class OrchestratorService:
-    def checkInverterPower(self, date: Optional[datetime.date] = None) -> str:
+
+    def __init__(self, settings: Optional[ServiceSettings] = None):
+        """
+        Args:
+            settings: Parsed app settings (read from the environment on first use if not given)
+        """
+        self._settings = settings
+        self._components: Optional[dict] = None
+        self._fleet_sites: Optional[List[SiteConfig]] = None
+        self._lock = threading.RLock()
+
+    def checkInverterPower(self, date: Optional[datetime.date] = None, priority: int = PRIORITY_ADHOC) -> str:
         """
         Check inverter power output and send alerts if below threshold
         
         Args:
             date: Date to check (defaults to today)
+            priority: Request scheduler priority (PRIORITY_SCHEDULED for the timer run)
             
         Returns:
             String summary of results
         """
-        try:
-            # Determine date to check
-            if date is None:
-                today = datetime.date.today()
-            else:
-                today = date
+        return self._runInverterCheck(date, priority).toText()
 
-            logging.info(f'Checking inverter power for date: {today}')
+    def checkInverterPowerReport(self, date: Optional[datetime.date] = None, priority: int = PRIORITY_ADHOC) -> CheckReport:
+        """
+        Check inverter power output and send alerts if below threshold, returning the structured result
 
-            # Define time window (12 PM to 1 PM)
-            today_start = f'{today.year}-{today.month:02d}-{today.day:02d} 12:00:00'
-            today_end = f'{today.year}-{today.month:02d}-{today.day:02d} 12:59:59'
+        Args:
+            date: Date to check (defaults to today)
+            priority: Request scheduler priority (PRIORITY_SCHEDULED for the timer run)
 
-            # Get configuration values
-            try:
-                alert_value = float(os.environ.get("alertPowerThreshold", "200"))
-                base_url = os.environ.get("baseURL", "")
-                site_id = os.environ.get("siteId", "")
-                api_key = os.environ.get("solarEdgeApiKey", "")
-                sendgrid_key = os.environ.get("sendGridApiKey", "")
-                to_email = os.environ.get("toEmail", "")
-                from_email = os.environ.get("fromEmail", "")
-                
-                # Validate required configuration
-                if not all([base_url, site_id, api_key]):
-                    raise ValueError("Missing required SolarEdge configuration (baseURL, siteId, solarEdgeApiKey)")
-                
-                logging.info(f'Configuration: threshold={alert_value}W, site={site_id}, time_window={today_start} to {today_end}')
-                
-            except (ValueError, KeyError) as e:
-                logging.error(f'Configuration error: {e}')
-                return f'Configuration error: {e}'
-
-            # Initialize services
-            data_manager = DataManager()
-            email_manager = EmailManager()
+        Returns:
+            Report with per-inverter statistics, alert decisions and run timing
+        """
+        return self._runInverterCheck(date, priority)
+
+    async def checkInverterPowerAsync(self, date: Optional[datetime.date] = None, priority: int = PRIORITY_ADHOC) -> str:
+        """
+        Coroutine variant of checkInverterPower for async function entry points
+
+        SolarEdge requests run on the event loop, so other invocations on the worker proceed while
+        they wait; evaluation, stores and alert emails run in a worker thread.
+
+        Args:
+            date: Date to check (defaults to today)
+            priority: Request scheduler priority (PRIORITY_SCHEDULED for the timer run)
+
+        Returns:
+            String summary of results
+        """
+        return (await self._runInverterCheckAsync(date, priority)).toText()
+
+    def getCheckResponse(self, date: Optional[datetime.date] = None) -> CachedResult:
+        """
+        Run the on-demand check for a date, sharing the run with identical concurrent calls and caching the result
+
+        Failed runs are not cached.
+
+        Args:
+            date: Date to check (defaults to today)
+
+        Returns:
+            Cached result whose value is the report as plain data and its text summary (None for fleet reports),
+            to be serialized with check_report.formatReport
+        """
+        today = date if date is not None else datetime.date.today()
+        fleet = self.isFleetConfigured()
+
+        def compute() -> Tuple[Tuple[dict, Optional[str]], bool]:
+            if fleet:
+                return self._getFleetResponse(today)
+            report = self._runInverterCheck(today, PRIORITY_ADHOC)
+            return (report.toDict(), report.toText()), report.succeeded
+
+        caching = self._getResultCaching(today, fleet)
+        if caching is None:
+            # Let the check itself report the configuration error
+            value, _ = compute()
+            return CachedResult(value, '', 0.0, CACHE_MISS)
+
+        result_cache, key, ttl_seconds = caching
+        return result_cache.getOrCompute(key, compute, ttl_seconds, self._identifyCheckResponse)
+
+    async def getCheckResponseAsync(self, date: Optional[datetime.date] = None) -> CachedResult:
+        """Coroutine variant of getCheckResponse; it shares runs and cached results with the sync variant"""
+        today = date if date is not None else datetime.date.today()
+        fleet = self.isFleetConfigured()
+
+        async def compute() -> Tuple[Tuple[dict, Optional[str]], bool]:
+            if fleet:
+                # Fleet checks bound their requests across sites with threads
+                return await asyncio.to_thread(self._getFleetResponse, today)
+            report = await self._runInverterCheckAsync(today, PRIORITY_ADHOC)
+            return (report.toDict(), report.toText()), report.succeeded
+
+        caching = self._getResultCaching(today, fleet)
+        if caching is None:
+            value, _ = await compute()
+            return CachedResult(value, '', 0.0, CACHE_MISS)
+
+        result_cache, key, ttl_seconds = caching
+        return await result_cache.getOrComputeAsync(key, compute, ttl_seconds, self._identifyCheckResponse)
+
+    def _identifyCheckResponse(self, value: Tuple[dict, Optional[str]]) -> dict:
+        """ETag source of a check response: the report without run timing or email outcomes"""
+        return getResultContent(value[0])
+
+    def _getFleetResponse(self, today: datetime.date) -> Tuple[Tuple[dict, None], bool]:
+        report = self.checkFleetPower(None, today, deadline_seconds=HTTP_DEADLINE_SECONDS)
+        succeeded = ('error' not in report and not report['failed_sites'] and not report['timed_out_sites']
+                     and not any(site.get('failed_inverters') for site in report['sites']))
+        return (report, None), succeeded
+
+    def _getResultCaching(self, today: datetime.date, fleet: bool) -> Optional[Tuple[ResultCache, str, float]]:
+        """Get the result cache, key and time to live of an on-demand check (None if the configuration is invalid)"""
+        try:
+            settings = self._getSettings()
+            result_cache = self._getComponents()['result_cache']
+        except ValueError:
+            return None
+
+        # Past days only change through late uploads, so they are kept much longer than today
+        ttl_seconds = settings.result_cache_today_seconds if today >= datetime.date.today() else settings.result_cache_past_seconds
+        key = f'{"fleet" if fleet else settings.site_id}|{today}'
+        return result_cache, key, ttl_seconds
+
+    def _runInverterCheck(self, date: Optional[datetime.date], priority: int) -> CheckReport:
+        """Run the single-site check and return its report"""
+        try:
+            check = self._prepareInverterCheck(date, priority, DataManager)
+            if isinstance(check, CheckReport):
+                return check
 
             # Fetch inverter data
             try:
-                inverter_data = data_manager.getAllInverterPower(
-                    base_url, site_id, api_key, today_start, today_end)
-                
-                if not inverter_data:
-                    logging.warning('No inverter data received')
-                    return 'No inverter data available for the specified time period'
-                    
+                fetched = self._fetchInverterData(check['data_manager'], check['components'], check['base_url'],
+                                                  check['site_id'], check['api_key'], check['today'], check['alert_value'])
             except Exception as e:
-                logging.error(f'Failed to fetch inverter data: {e}')
-                return f'Failed to fetch inverter data: {e}'
+                return self._reportFetchFailure(check, e)
 
-            # Process results and send alerts
-            result_lines = []
-            alerts_sent = 0
-            
-            for inverter_power in inverter_data:
-                serial = inverter_power.serial
-                last_power = inverter_power.last
-                average_power = inverter_power.average
-                
-                result_line = f'Inverter {serial}: last={last_power:.1f}W, average={average_power:.1f}W'
-                result_lines.append(result_line)
-                
-                # Check if alert needed
-                needs_alert = last_power < alert_value or average_power < alert_value
-                
-                if needs_alert:
-                    logging.warning(f'Alert condition met for inverter {serial}: last={last_power}W, avg={average_power}W, threshold={alert_value}W')
-                    
-                    # Send alert email if email is configured
-                    if sendgrid_key and to_email and from_email:
-                        try:
-                            email_manager.sendAlertEmail(sendgrid_key, to_email, from_email, serial)
-                            alerts_sent += 1
-                            result_lines.append(f'  → Alert sent for {serial}')
-                        except Exception as e:
-                            logging.error(f'Failed to send alert email for {serial}: {e}')
-                            result_lines.append(f'  → Alert failed for {serial}: {e}')
-                    else:
-                        logging.warning(f'Email not configured - alert not sent for {serial}')
-                        result_lines.append(f'  → Alert needed for {serial} but email not configured')
-                else:
-                    logging.info(f'Inverter {serial} operating normally')
+            return self._completeInverterCheck(check, fetched)
 
-            # Create summary
-            summary = f'Checked {len(inverter_data)} inverters on {today}, sent {alerts_sent} alerts\n' + '\n'.join(result_lines)
-            logging.info(f'Check complete: {len(inverter_data)} inverters, {alerts_sent} alerts sent')
-            
-            return summary
+        except Exception as e:
+            error_msg = f'Unexpected error during inverter check: {e}'
+            logging.error(error_msg)
+            return CheckReport.failed(date or datetime.date.today(), error_msg)
+
+    async def _runInverterCheckAsync(self, date: Optional[datetime.date], priority: int) -> CheckReport:
+        """Run the single-site check with async SolarEdge requests and return its report"""
+        try:
+            # Imported here so sync entry points do not load the async HTTP client
+            from shared_code.services.async_data_manager import AsyncDataManager
+
+            check = self._prepareInverterCheck(date, priority, AsyncDataManager)
+            if isinstance(check, CheckReport):
+                return check
+
+            try:
+                fetched = await self._fetchInverterDataAsync(
+                    check['data_manager'], check['components'], check['base_url'], check['site_id'], check['api_key'],
+                    check['today'], check['alert_value'])
+            except Exception as e:
+                # The run metrics may be exported to Application Insights with a blocking request
+                return await asyncio.to_thread(self._reportFetchFailure, check, e)
+
+            return await asyncio.to_thread(self._completeInverterCheck, check, fetched)
 
         except Exception as e:
             error_msg = f'Unexpected error during inverter check: {e}'
             logging.error(error_msg)
-            return error_msg
\ No newline at end of file
+            return CheckReport.failed(date or datetime.date.today(), error_msg)
+
+    def _prepareInverterCheck(self, date: Optional[datetime.date], priority: int, data_manager_class: type) -> Union[dict, CheckReport]:
+        """Resolve the configuration and services of a single-site check, or return the report of a configuration error"""
+        # Determine date to check
+        if date is None:
+            today = datetime.date.today()
+        else:
+            today = date
+
+        logging.info(f'Checking inverter power for date: {today}')
+
+        # Get configuration values
+        try:
+            settings = self._getSettings()
+            components = self._getComponents()
+            alert_value = settings.alert_threshold
+            base_url = settings.base_url
+            site_id = settings.site_id
+            api_key = settings.api_key
+            today_start, today_end = components['evaluator'].getFetchRange(today)
+
+            # Validate required configuration
+            if not all([base_url, site_id, api_key]):
+                raise ValueError("Missing required SolarEdge configuration (baseURL, siteId, solarEdgeApiKey)")
+
+            logging.info(f'Configuration: threshold={alert_value}W, site={site_id}, time_window={today_start} to {today_end}')
+
+        except (ValueError, KeyError) as e:
+            logging.error(f'Configuration error: {e}')
+            return CheckReport.failed(today, f'Configuration error: {e}')
+
+        # Initialize services
+        metrics = RunMetrics('checkInverterPower', site_id=site_id, date=str(today), priority=priority)
+        data_manager = data_manager_class(max_workers=settings.max_concurrent_requests, pool_size=settings.http_pool_size,
+                                          equipment_cache=components['equipment_cache'],
+                                          telemetry_store=components['telemetry_store'],
+                                          stream_telemetry=settings.stream_telemetry, scheduler=components['scheduler'],
+                                          priority=priority, metrics=metrics,
+                                          ingestion_store=components['ingestion_store'], **components['resilience_settings'])
+        return {
+            'today': today,
+            'components': components,
+            'alert_value': alert_value,
+            'base_url': base_url,
+            'site_id': site_id,
+            'api_key': api_key,
+            'metrics': metrics,
+            'data_manager': data_manager
+        }
+
+    def _reportFetchFailure(self, check: dict, error: Exception) -> CheckReport:
+        logging.error(f'Failed to fetch inverter data: {error}')
+        record = self._emitRunMetrics(check['metrics'], status='error')
+        return CheckReport.failed(check['today'], f'Failed to fetch inverter data: {error}', site_id=check['site_id'],
+                                  metrics=record)
+
+    def _completeInverterCheck(self, check: dict, fetched: Tuple[List[InverterPower], Dict[str, Dict[str, dict]],
+                                                                 Optional[List[TelemetrySeries]]]) -> CheckReport:
+        """Evaluate the fetched data of a single-site check, send alerts and return its report"""
+        today = check['today']
+        components = check['components']
+        metrics = check['metrics']
+        data_manager = check['data_manager']
+        alert_value = check['alert_value']
+        alert_settings = self._getCheckAlertSettings(components['alert_settings'], today)
+        evaluator = components['evaluator']
+        inverter_data, window_stats, series_list = fetched
+
+        if not inverter_data:
+            logging.warning('No inverter data received')
+            record = self._emitRunMetrics(metrics, status='no data')
+            return CheckReport.failed(today, 'No inverter data available for the specified time period', CHECK_NO_DATA,
+                                      check['site_id'], record)
+
+        session_stats = data_manager.getSessionStats()
+        logging.info(f'HTTP session stats: {session_stats["requests"]} requests, '
+                     f'{session_stats["new_connections"]} new connections, '
+                     f'{session_stats["reused_connections"]} reused connections')
+
+        email_manager = EmailManager(metrics)
+
+        # Process results and send alerts
+        digest = [] if alert_settings['digest'] else None
+        with span(metrics, 'evaluation', inverters=len(inverter_data), rules=len(evaluator.rules)):
+            violations, anomalies = self._evaluateInverters(
+                components, metrics, check['site_id'], today, alert_value, window_stats, series_list)
+            result_lines, alerts_sent, inverter_reports = self._processInverterPower(
+                inverter_data, alert_value, email_manager, alert_settings, digest,
+                violations=violations, window_stats=self._getReportedWindows(evaluator, window_stats),
+                anomalies=anomalies)
+
+        digest_report = None
+        if digest:
+            digest_status = self._sendDigest(email_manager, alert_settings, digest)
+            digest_report = {
+                'alerts': self._countDigestAlerts(digest),
+                'recoveries': len(digest) - self._countDigestAlerts(digest),
+                'status': digest_status
+            }
+            if digest_status in ('sent', 'queued'):
+                alerts_sent += digest_report['alerts']
+            result_lines.append(f'Alert digest with {len(digest)} notices {digest_status}')
+
+        record = self._emitRunMetrics(metrics, status='ok', inverters=len(inverter_data), alerts_sent=alerts_sent,
+                                      http_requests=session_stats['requests'],
+                                      new_connections=session_stats['new_connections'])
+
+        failed_inverters = data_manager.getFailedInverters()
+        if failed_inverters:
+            result_lines.append(f'Could not fetch data for {len(failed_inverters)} inverters: {", ".join(failed_inverters)}')
+
+        report = CheckReport(today, check['site_id'], alert_threshold=alert_value, inverters=inverter_reports,
+                             alerts_sent=alerts_sent, failed_inverters=failed_inverters, digest=digest_report,
+                             metrics=record, lines=result_lines)
+        logging.info(f'Check complete: {len(inverter_data)} inverters, {alerts_sent} alerts sent')
+
+        self._archiveReport(components, report.toDict())
+        return report
+
+    def backfillInverterPower(self, start_date: datetime.date, end_date: datetime.date,
+                              deadline_seconds: Optional[float] = None) -> dict:
+        """
+        Produce per-day power statistics for every inverter over a date range
+
+        Args:
+            start_date: First day to backfill
+            end_date: Last day to backfill (inclusive)
+            deadline_seconds: Upper bound for backfillTimeoutSeconds, e.g. HTTP_DEADLINE_SECONDS inside a request
+
+        Returns:
+            Backfill report with per-day statistics; re-run with the same range to resume failed or pending chunks
+        """
+        try:
+            settings = self._getSettings()
+            components = self._getComponents()
+            alert_value = settings.alert_threshold
+            base_url = settings.base_url
+            site_id = settings.site_id
+            api_key = settings.api_key
+            timeout_seconds = settings.backfill_timeout_seconds
+            if deadline_seconds is not None:
+                timeout_seconds = min(timeout_seconds, deadline_seconds)
+
+            if not all([base_url, site_id, api_key]):
+                raise ValueError("Missing required SolarEdge configuration (baseURL, siteId, solarEdgeApiKey)")
+
+            data_manager = DataManager(max_workers=settings.max_concurrent_requests,
+                                       equipment_cache=components['equipment_cache'],
+                                       telemetry_store=components['telemetry_store'], scheduler=components['scheduler'],
+                                       priority=PRIORITY_BACKFILL, **components['resilience_settings'])
+            backfill_service = BackfillService(
+                data_manager,
+                max_parallel_chunks=settings.backfill_max_parallel_chunks,
+                chunk_days=settings.backfill_chunk_days,
+                checkpoint_dir=settings.backfill_checkpoint_dir,
+                analyzer=getParallelAnalyzer(settings.backfill_analysis_processes)
+                if settings.backfill_analysis_processes > 0 else None)
+
+        except (ValueError, KeyError) as e:
+            logging.error(f'Configuration error: {e}')
+            return {'error': f'Configuration error: {e}'}
+
+        try:
+            return backfill_service.runBackfill(
+                base_url, site_id, api_key, start_date, end_date, alert_value, timeout_seconds)
+        except Exception as e:
+            logging.error(f'Backfill failed: {e}')
+            return {'error': f'Backfill failed: {e}'}
+
+    def isFleetConfigured(self) -> bool:
+        """Check whether a multi-site fleet is configured via fleetSites"""
+        try:
+            return bool(self._getSettings().fleet_sites)
+        except ValueError:
+            # Invalid numeric settings are reported by the check itself
+            return bool(os.environ.get("fleetSites", "").strip())
+
+    def checkFleetPower(self, sites: Optional[List[SiteConfig]] = None, date: Optional[datetime.date] = None,
+                        priority: int = PRIORITY_ADHOC, deadline_seconds: Optional[float] = None) -> dict:
+        """
+        Check inverter power output for many sites in parallel and send alerts if below threshold
+
+        Args:
+            sites: Sites to check (defaults to the fleetSites setting)
+            date: Date to check (defaults to today)
+            priority: Request scheduler priority (PRIORITY_SCHEDULED for the timer run)
+            deadline_seconds: Upper bound for fleetTimeoutSeconds, e.g. HTTP_DEADLINE_SECONDS inside a request
+
+        Returns:
+            Aggregated report with one entry per site
+        """
+        started = time.monotonic()
+        today = date if date is not None else datetime.date.today()
+        report = {
+            'date': str(today),
+            'sites_checked': 0,
+            'inverters_checked': 0,
+            'alerts_sent': 0,
+            'failed_sites': 0,
+            'timed_out_sites': 0,
+            'sites': []
+        }
+
+        try:
+            settings = self._getSettings()
+            components = self._getComponents()
+            if sites is None:
+                sites = self._loadFleetSites(settings)
+            max_parallel_sites = settings.fleet_max_parallel_sites
+            max_site_requests = settings.max_concurrent_requests
+            max_total_requests = settings.fleet_max_concurrent_requests
+            timeout_seconds = settings.fleet_timeout_seconds
+            if deadline_seconds is not None:
+                timeout_seconds = min(timeout_seconds, deadline_seconds)
+            alert_settings = self._getCheckAlertSettings(components['alert_settings'], today)
+
+            missing = [site.site_id for site in sites if not site.base_url]
+            if missing:
+                raise ValueError(f'Missing baseURL for sites: {", ".join(missing)}')
+
+        except (ValueError, KeyError) as e:
+            logging.error(f'Fleet configuration error: {e}')
+            report['error'] = f'Configuration error: {e}'
+            return report
+
+        if not sites:
+            logging.warning('No fleet sites configured')
+            return report
+
+        logging.info(f'Checking {len(sites)} sites on {today}: {max_parallel_sites} sites in parallel, '
+                     f'{max_site_requests} requests per site, {max_total_requests} requests overall')
+
+        # Every site's data manager draws from the same pool of request slots
+        max_total_requests = max(1, max_total_requests)
+        request_limiter = threading.BoundedSemaphore(max_total_requests)
+        metrics = RunMetrics('checkFleetPower', sites=len(sites), date=str(today), priority=priority)
+        email_manager = EmailManager(metrics)
+        # One digest for the whole fleet run
+        digest = [] if alert_settings['digest'] else None
+
+        executor = ThreadPoolExecutor(max_workers=max(1, min(max_parallel_sites, len(sites))))
+        try:
+            futures = [
+                executor.submit(self._checkSite, site, today, DataManager(
+                    max_workers=max_site_requests, pool_size=max_total_requests, request_limiter=request_limiter,
+                    equipment_cache=components['equipment_cache'], telemetry_store=components['telemetry_store'],
+                    stream_telemetry=settings.stream_telemetry, scheduler=components['scheduler'], priority=priority,
+                    metrics=metrics, ingestion_store=components['ingestion_store'], **components['resilience_settings']),
+                    email_manager, alert_settings, digest)
+                for site in sites
+            ]
+            done, _ = wait(futures, timeout=timeout_seconds)
+        finally:
+            # Don't block the function on sites that overran the deadline
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        for site, future in zip(sites, futures):
+            if future in done:
+                site_report = future.result()
+            else:
+                logging.error(f'Site {site.site_id} did not finish within {timeout_seconds}s')
+                site_report = {'site_id': site.site_id, 'status': 'timeout', 'inverters': [], 'alerts_sent': 0}
+                report['timed_out_sites'] += 1
+
+            if site_report['status'] == 'error':
+                report['failed_sites'] += 1
+            report['sites_checked'] += 1
+            report['inverters_checked'] += len(site_report['inverters'])
+            report['alerts_sent'] += site_report['alerts_sent']
+            report['sites'].append(site_report)
+
+        if digest:
+            # Sites that overran the deadline may still append, so send a snapshot
+            digest = list(digest)
+            report['digest'] = {
+                'alerts': self._countDigestAlerts(digest),
+                'recoveries': len(digest) - self._countDigestAlerts(digest),
+                'status': self._sendDigest(email_manager, alert_settings, digest)
+            }
+            if report['digest']['status'] in ('sent', 'queued'):
+                report['alerts_sent'] += report['digest']['alerts']
+
+        report['elapsed_seconds'] = round(time.monotonic() - started, 3)
+        report['metrics'] = self._emitRunMetrics(
+            metrics, inverters=report['inverters_checked'], alerts_sent=report['alerts_sent'],
+            failed_sites=report['failed_sites'], timed_out_sites=report['timed_out_sites'])
+        logging.info(f'Fleet check complete: {report["sites_checked"]} sites, {report["inverters_checked"]} inverters, '
+                     f'{report["alerts_sent"]} alerts sent, {report["failed_sites"]} failed, '
+                     f'{report["timed_out_sites"]} timed out in {report["elapsed_seconds"]}s')
+        self._archiveReport(components, report)
+        return report
+
+    def _checkSite(self, site: SiteConfig, today: datetime.date, data_manager: DataManager,
+                   email_manager: EmailManager, alert_settings: dict, digest: Optional[List[dict]]) -> dict:
+        """Check a single fleet site and return its report entry"""
+        site_report = {'site_id': site.site_id, 'status': 'ok', 'alert_threshold': site.alert_threshold, 'inverters': [], 'alerts_sent': 0}
+        try:
+            components = self._getComponents()
+            evaluator = components['evaluator']
+            with span(data_manager.metrics, 'site_check', site_id=site.site_id):
+                inverter_data, window_stats, series_list = self._fetchInverterData(
+                    data_manager, components, site.base_url, site.site_id, site.api_key, today, site.alert_threshold)
+
+                with span(data_manager.metrics, 'evaluation', site_id=site.site_id, inverters=len(inverter_data),
+                          rules=len(evaluator.rules)):
+                    violations, anomalies = self._evaluateInverters(
+                        components, data_manager.metrics, site.site_id, today, site.alert_threshold, window_stats,
+                        series_list)
+                    _, alerts_sent, inverter_reports = self._processInverterPower(
+                        inverter_data, site.alert_threshold, email_manager, alert_settings, digest, site.site_id,
+                        violations, self._getReportedWindows(evaluator, window_stats), anomalies)
+
+            site_report['inverters'] = inverter_reports
+            site_report['alerts_sent'] = alerts_sent
+            site_report['failed_inverters'] = data_manager.getFailedInverters()
+
+        except Exception as e:
+            logging.error(f'Failed to check site {site.site_id}: {e}')
+            site_report['status'] = 'error'
+            site_report['error'] = str(e)
+
+        return site_report
+
+    def _getSettings(self) -> ServiceSettings:
+        """Parse the app settings on first use"""
+        with self._lock:
+            if self._settings is None:
+                self._settings = ServiceSettings()
+            return self._settings
+
+    def _getComponents(self) -> dict:
+        """Build the caches, stores, scheduler and retry settings once and reuse them on warm invocations"""
+        with self._lock:
+            if self._components is None:
+                settings = self._getSettings()
+                self._components = {
+                    'equipment_cache': self._createEquipmentCache(settings),
+                    'telemetry_store': self._createTelemetryStore(settings),
+                    'ingestion_store': self._createIngestionStore(settings),
+                    'scheduler': self._createScheduler(settings),
+                    'resilience_settings': self._getResilienceSettings(settings),
+                    'alert_settings': self._getAlertSettings(settings),
+                    'evaluator': RuleEvaluator.fromSettings(settings.evaluation_windows, settings.evaluation_rules),
+                    'anomaly_detector': self._createAnomalyDetector(settings),
+                    'result_cache': getResultCache(max_entries=settings.result_cache_max_entries),
+                    'report_archive': self._createReportArchive(settings)
+                }
+            return self._components
+
+    def _getAlertSettings(self, settings: ServiceSettings) -> dict:
+        """Collect the alert email settings"""
+        return {
+            'sendgrid_key': settings.sendgrid_key,
+            'to_email': settings.to_email,
+            'from_email': settings.from_email,
+            'digest': settings.alert_digest,
+            'send_async': settings.alert_send_async,
+            'recovery_notices': settings.alert_recovery_notices,
+            'state_store': self._createAlertStateStore(settings)
+        }
+
+    def _getCheckAlertSettings(self, alert_settings: dict, today: datetime.date) -> dict:
+        """Alert settings of a check; checks of past days neither use nor change the alert state"""
+        if alert_settings['state_store'] is None or today >= datetime.date.today():
+            return alert_settings
+        return dict(alert_settings, state_store=None)
+
+    def _createAlertStateStore(self, settings: ServiceSettings) -> Optional[AlertStateStore]:
+        """Open the alert state store if alertStatePath is set"""
+        if not settings.alert_state_path:
+            return None
+        return getAlertStateStore(settings.alert_state_path, settings.alert_suppression_hours)
+
+    def _sendDigest(self, email_manager: EmailManager, alert_settings: dict, digest: List[dict]) -> str:
+        """Send the collected alerts as one email and return its status"""
+        sendgrid_key = alert_settings['sendgrid_key']
+        to_email = alert_settings['to_email']
+        from_email = alert_settings['from_email']
+
+        state_store = alert_settings['state_store']
+        on_sent = (lambda: self._markAlerted(state_store, digest)) if state_store else None
+
+        if alert_settings['send_async']:
+            email_manager.sendAlertDigestAsync(sendgrid_key, to_email, from_email, digest).add_done_callback(
+                self._getSendCallback(f'alert digest with {len(digest)} notices', on_sent))
+            return 'queued'
+
+        try:
+            email_manager.sendAlertDigest(sendgrid_key, to_email, from_email, digest)
+            if on_sent:
+                on_sent()
+            return 'sent'
+        except Exception as e:
+            logging.error(f'Failed to send alert digest: {e}')
+            return f'failed: {e}'
+
+    def _countDigestAlerts(self, digest: List[dict]) -> int:
+        return sum(1 for notification in digest if not notification.get('recovered'))
+
+    def _markAlerted(self, state_store: AlertStateStore, notifications: List[dict]) -> None:
+        """Record the alerts among the notifications as sent, which starts their suppression window"""
+        state_store.saveStates([
+            {'serial': notification['serial'], 'site_id': notification['site_id'], 'state': STATE_ALERT, 'alerted': True}
+            for notification in notifications if not notification.get('recovered')
+        ])
+
+    def _getSendCallback(self, description: str, on_sent: Optional[Callable[[], None]] = None):
+        """Build a callback that logs the outcome of a background email send and runs on_sent if it succeeded"""
+        def callback(future):
+            error = future.exception()
+            if error is not None:
+                logging.error(f'Background send of {description} failed: {error}')
+            elif on_sent is not None:
+                on_sent()
+        return callback
+
+    def _emitRunMetrics(self, metrics: RunMetrics, **attributes) -> dict:
+        """Finish a run's metrics, log the structured record and export it to Application Insights if enabled"""
+        metrics.finish(**attributes)
+        record = metrics.toRecord()
+        logging.info(f'Run metrics: {json.dumps(record)}')
+
+        if self._getSettings().metrics_export_app_insights:
+            exporter = self._createMetricsExporter()
+            if exporter is not None:
+                exporter.export(record)
+            else:
+                logging.warning('metricsExportAppInsights is set but no Application Insights connection string is configured')
+        return record
+
+    def _createMetricsExporter(self) -> Optional[AppInsightsExporter]:
+        """Build the Application Insights exporter from the Function app's own App Insights settings"""
+        settings = self._getSettings()
+        if settings.app_insights_connection_string:
+            return AppInsightsExporter.fromConnectionString(settings.app_insights_connection_string)
+        if settings.app_insights_instrumentation_key:
+            return AppInsightsExporter(settings.app_insights_instrumentation_key)
+        return None
+
+    def _createEquipmentCache(self, settings: ServiceSettings) -> Optional[EquipmentCache]:
+        """Build the equipment cache from settings (disabled when the TTL is 0)"""
+        if settings.equipment_cache_ttl_seconds <= 0:
+            return None
+        return EquipmentCache(settings.equipment_cache_ttl_seconds, settings.equipment_cache_dir)
+
+    def _getResilienceSettings(self, settings: ServiceSettings) -> dict:
+        """Build the retry, circuit breaker and timeout arguments for DataManager from settings"""
+        return {
+            'retry_policy': RetryPolicy(
+                max_retries=settings.api_max_retries,
+                backoff_base_seconds=settings.api_backoff_base_seconds,
+                backoff_max_seconds=settings.api_backoff_max_seconds,
+                retry_budget_seconds=settings.api_retry_budget_seconds),
+            'circuit_breakers': getCircuitBreakerRegistry(
+                failure_threshold=settings.api_circuit_failure_threshold,
+                reset_seconds=settings.api_circuit_reset_seconds),
+            'timeouts': (settings.api_connect_timeout_seconds, settings.api_read_timeout_seconds)
+        }
+
+    def _createScheduler(self, settings: ServiceSettings) -> RequestScheduler:
+        """Get the process-wide request scheduler, configured from settings on first use"""
+        return getRequestScheduler(
+            rate_per_second=settings.api_requests_per_second,
+            burst=settings.api_request_burst,
+            max_concurrent_per_key=settings.api_max_concurrent_requests_per_key,
+            daily_quota=settings.api_daily_quota,
+            reserved_quota=settings.api_quota_reserved_for_timer,
+            max_wait_seconds=settings.api_max_wait_seconds,
+            state_path=settings.api_quota_state_path)
+
+    def _createAnomalyDetector(self, settings: ServiceSettings) -> Optional[AnomalyDetector]:
+        """Build the peer and history anomaly detector if anomalyDetection is set"""
+        if not settings.anomaly_detection:
+            return None
+        history_store = getAnomalyHistoryStore(settings.anomaly_history_path) if settings.anomaly_history_path else None
+        return AnomalyDetector(
+            bin_minutes=settings.anomaly_bin_minutes,
+            min_peer_ratio=settings.anomaly_min_peer_ratio,
+            z_threshold=settings.anomaly_z_threshold,
+            min_peer_power=settings.anomaly_min_peer_power,
+            history_store=history_store,
+            history_days=settings.anomaly_history_days,
+            min_history_days=settings.anomaly_min_history_days)
+
+    def _createTelemetryStore(self, settings: ServiceSettings) -> Optional[TelemetryStore]:
+        """Open the local telemetry store if telemetryStorePath is set"""
+        if not settings.telemetry_store_path:
+            return None
+        return getTelemetryStore(settings.telemetry_store_path, settings.telemetry_finalize_hours)
+
+    def _createReportArchive(self, settings: ServiceSettings) -> Optional[ReportArchive]:
+        """Create the local report archive if reportArchiveDir is set"""
+        if not settings.report_archive_dir:
+            return None
+        return ReportArchive(settings.report_archive_dir, settings.report_archive_format)
+
+    def _archiveReport(self, components: dict, report: dict) -> None:
+        """Add a run's per-inverter results to the report archive, if one is configured"""
+        archive = components['report_archive']
+        if archive is not None:
+            archive.append(report)
+
+    def _createIngestionStore(self, settings: ServiceSettings) -> Optional[IngestionStateStore]:
+        """Open the ingestion cursor store if ingestionStatePath is set"""
+        if not settings.ingestion_state_path:
+            return None
+        return getIngestionStateStore(settings.ingestion_state_path, settings.ingestion_retention_days,
+                                      settings.telemetry_finalize_hours)
+
+    def _loadFleetSites(self, settings: ServiceSettings) -> List[SiteConfig]:
+        """Parse the fleetSites setting (JSON list of site entries) once"""
+        with self._lock:
+            if self._fleet_sites is not None:
+                return self._fleet_sites
+
+            try:
+                entries = json.loads(settings.fleet_sites or '[]')
+            except json.JSONDecodeError as e:
+                raise ValueError(f'fleetSites is not valid JSON: {e}')
+
+            if not isinstance(entries, list):
+                raise ValueError('fleetSites must be a JSON list')
+
+            self._fleet_sites = [SiteConfig.fromDict(entry, settings.base_url, settings.alert_threshold) for entry in entries]
+            return self._fleet_sites
+
+    def _fetchInverterData(self, data_manager: DataManager, components: dict, base_url: str, site_id: str, api_key: str,
+                           today: datetime.date, alert_value: float
+                           ) -> Tuple[List[InverterPower], Dict[str, Dict[str, dict]], Optional[List[TelemetrySeries]]]:
+        """
+        Fetch what the configured rules and anomaly detection need, with one request per inverter
+
+        Returns:
+            Power of every inverter in the first window, statistics per inverter serial and window name, and the
+            fetched series (None when only power statistics were needed)
+        """
+        evaluator = components['evaluator']
+        primary = evaluator.getPrimaryWindow()
+        if evaluator.isSingleWindowPower() and components['anomaly_detector'] is None:
+            # Power statistics are all the rules read, so the streaming path can still be used
+            start_datetime, end_datetime = primary.getRange(today)
+            inverter_data = data_manager.getAllInverterPower(
+                base_url, site_id, api_key, start_datetime, end_datetime, alert_value)
+            return inverter_data, {inverter.serial: {primary.name: inverter.toDict()} for inverter in inverter_data}, None
+
+        start_datetime, end_datetime = evaluator.getFetchRange(today)
+        fields = evaluator.getRequiredFields()
+        series_list = data_manager.getAllInverterSeries(base_url, site_id, api_key, start_datetime, end_datetime, fields)
+        return self._aggregateSeries(data_manager, components, site_id, today, alert_value, series_list)
+
+    def _aggregateSeries(self, data_manager: DataManager, components: dict, site_id: str, today: datetime.date,
+                         alert_value: float, series_list: List[TelemetrySeries]
+                         ) -> Tuple[List[InverterPower], Dict[str, Dict[str, dict]], List[TelemetrySeries]]:
+        evaluator = components['evaluator']
+        primary = evaluator.getPrimaryWindow()
+        fields = evaluator.getRequiredFields()
+        with span(data_manager.metrics, 'aggregation', site_id=site_id, inverters=len(series_list),
+                  windows=len(evaluator.windows)):
+            window_stats = {series.serial: aggregateWindows(series, today, evaluator.windows, alert_value, fields)
+                            for series in series_list}
+        inverter_data = [InverterPower.fromStats(series.serial, window_stats[series.serial][primary.name])
+                         for series in series_list]
+        return inverter_data, window_stats, series_list
+
+    async def _fetchInverterDataAsync(self, data_manager: 'AsyncDataManager', components: dict, base_url: str, site_id: str,
+                                      api_key: str, today: datetime.date, alert_value: float
+                                      ) -> Tuple[List[InverterPower], Dict[str, Dict[str, dict]], Optional[List[TelemetrySeries]]]:
+        """Coroutine variant of _fetchInverterData"""
+        evaluator = components['evaluator']
+        primary = evaluator.getPrimaryWindow()
+        if evaluator.isSingleWindowPower() and components['anomaly_detector'] is None:
+            start_datetime, end_datetime = primary.getRange(today)
+            inverter_data = await data_manager.getAllInverterPowerAsync(
+                base_url, site_id, api_key, start_datetime, end_datetime, alert_value)
+            return inverter_data, {inverter.serial: {primary.name: inverter.toDict()} for inverter in inverter_data}, None
+
+        start_datetime, end_datetime = evaluator.getFetchRange(today)
+        fields = evaluator.getRequiredFields()
+        series_list = await data_manager.getAllInverterSeriesAsync(base_url, site_id, api_key, start_datetime, end_datetime, fields)
+        return self._aggregateSeries(data_manager, components, site_id, today, alert_value, series_list)
+
+    def _evaluateInverters(self, components: dict, metrics: Optional[RunMetrics], site_id: str, today: datetime.date,
+                           alert_value: float, window_stats: Dict[str, Dict[str, dict]],
+                           series_list: Optional[List[TelemetrySeries]]) -> Tuple[Dict[str, List[str]], Optional[Dict[str, dict]]]:
+        """
+        Evaluate the configured rules and, if enabled, compare inverters with their peers and history
+
+        Returns:
+            Reasons to alert per inverter serial, and anomaly scores per serial (None when detection is disabled)
+        """
+        evaluator = components['evaluator']
+        detector = components['anomaly_detector']
+        violations = evaluator.evaluate(window_stats, alert_value)
+        if detector is None or series_list is None:
+            return violations, None
+
+        start_datetime, end_datetime = evaluator.getFetchRange(today)
+        with span(metrics, 'anomaly_detection', site_id=site_id, inverters=len(series_list)):
+            anomalies = detector.detect(site_id, today, series_list, start_datetime, end_datetime)
+        for serial, anomaly in anomalies.items():
+            violations.setdefault(serial, []).extend(anomaly['reasons'])
+        return violations, anomalies
+
+    def _getReportedWindows(self, evaluator: RuleEvaluator,
+                            window_stats: Dict[str, Dict[str, dict]]) -> Optional[Dict[str, Dict[str, dict]]]:
+        """Per-window statistics worth adding to inverter reports (none when they only repeat the inverter's power)"""
+        return None if evaluator.isSingleWindowPower() else window_stats
+
+    def _processInverterPower(self, inverter_data: List[InverterPower], alert_value: float, email_manager: EmailManager,
+                              alert_settings: dict, digest: Optional[List[dict]] = None,
+                              site_id: Optional[str] = None, violations: Optional[Dict[str, List[str]]] = None,
+                              window_stats: Optional[Dict[str, Dict[str, dict]]] = None,
+                              anomalies: Optional[Dict[str, dict]] = None) -> Tuple[List[str], int, List[dict]]:
+        """Evaluate inverters against the threshold and send alerts
+
+        Args:
+            digest: When given, alerts are collected here for one batched email instead of being sent
+            violations: Violated rules per serial from RuleEvaluator (last or average below alert_value if not given)
+            window_stats: Statistics per serial and window name to include in the inverter reports
+            anomalies: Peer and history anomaly scores per serial to include in the inverter reports
+
+        Returns:
+            Summary lines, number of alerts sent and a per-inverter report
+        """
+        state_store = alert_settings['state_store']
+        states = state_store.getStates(inverter.serial for inverter in inverter_data) if state_store else {}
+        state_updates = []
+        result_lines = []
+        inverter_reports = []
+        alerts_sent = 0
+
+        for inverter_power in inverter_data:
+            serial = inverter_power.serial
+            last_power = inverter_power.last
+            average_power = inverter_power.average
+
+            result_line = f'Inverter {serial}: last={last_power:.1f}W, average={average_power:.1f}W'
+            result_lines.append(result_line)
+
+            # Check if alert needed
+            if violations is not None:
+                reasons = violations.get(serial, [])
+            elif last_power < alert_value or average_power < alert_value:
+                reasons = [f'power below {alert_value:.0f}W']
+            else:
+                reasons = []
+            needs_alert = bool(reasons)
+            if state_store:
+                action = state_store.getAction(states.get(serial), needs_alert)
+            else:
+                action = ACTION_ALERT if needs_alert else ACTION_NONE
+
+            inverter_report = inverter_power.toDict()
+            inverter_report['alert'] = needs_alert
+            inverter_report['alert_status'] = None
+            inverter_report['violations'] = reasons
+            if window_stats is not None and serial in window_stats:
+                inverter_report['windows'] = window_stats[serial]
+            if anomalies is not None and serial in anomalies:
+                inverter_report['anomaly'] = anomalies[serial]
+            inverter_reports.append(inverter_report)
+            notification = {
+                'site_id': site_id,
+                'serial': serial,
+                'last': last_power,
+                'average': average_power,
+                'threshold': alert_value,
+                'reasons': reasons
+            }
+
+            alert_status = None
+            if action == ACTION_ALERT:
+                logging.warning(f'Alert condition met for inverter {serial}: last={last_power}W, avg={average_power}W, '
+                                f'threshold={alert_value}W, violations: {"; ".join(reasons)}')
+                if window_stats is not None or anomalies is not None:
+                    result_lines.extend(f'  → {reason}' for reason in reasons)
+
+                alert_status = self._notify(email_manager, alert_settings, digest, notification)
+                inverter_report['alert_status'] = alert_status
+                if alert_status in ('sent', 'queued'):
+                    alerts_sent += 1
+
+                if alert_status == 'sent':
+                    result_lines.append(f'  → Alert sent for {serial}')
+                elif alert_status == 'queued':
+                    result_lines.append(f'  → Alert queued for {serial}')
+                elif alert_status == 'digest':
+                    result_lines.append(f'  → Alert added to digest for {serial}')
+                elif alert_status == 'email not configured':
+                    result_lines.append(f'  → Alert needed for {serial} but email not configured')
+                else:
+                    result_lines.append(f'  → Alert {alert_status} for {serial}')
+            elif action == ACTION_SUPPRESS:
+                logging.info(f'Alert for inverter {serial} suppressed, already alerted within {state_store.suppression_hours}h')
+                inverter_report['alert_status'] = 'suppressed'
+                result_lines.append(f'  → Alert suppressed for {serial} (already alerted)')
+            elif action == ACTION_RECOVER and alert_settings['recovery_notices']:
+                logging.info(f'Inverter {serial} recovered')
+                notification['recovered'] = True
+                recovery_status = self._notify(email_manager, alert_settings, digest, notification)
+                inverter_report['recovery_status'] = recovery_status
+                result_lines.append(f'  → Recovery notice {recovery_status} for {serial}')
+            else:
+                logging.info(f'Inverter {serial} operating normally')
+
+            if state_store:
+                state_updates.append({
+                    'serial': serial,
+                    'site_id': site_id,
+                    'state': STATE_ALERT if needs_alert else STATE_OK,
+                    # Queued and digest alerts are marked by _markAlerted once their email has gone out
+                    'alerted': alert_status == 'sent'
+                })
+
+        if state_store:
+            state_store.saveStates(state_updates)
+
+        return result_lines, alerts_sent, inverter_reports
+
+    def _notify(self, email_manager: EmailManager, alert_settings: dict, digest: Optional[List[dict]],
+                notification: dict) -> str:
+        """Send or queue an alert or recovery notice and return its status"""
+        sendgrid_key = alert_settings['sendgrid_key']
+        to_email = alert_settings['to_email']
+        from_email = alert_settings['from_email']
+        serial = notification['serial']
+        recovered = notification.get('recovered', False)
+        kind = 'recovery email' if recovered else 'alert email'
+
+        if not (sendgrid_key and to_email and from_email):
+            logging.warning(f'Email not configured - {kind} not sent for {serial}')
+            return 'email not configured'
+
+        if digest is not None:
+            digest.append(notification)
+            return 'digest'
+
+        if alert_settings['send_async']:
+            if recovered:
+                future = email_manager.sendRecoveryEmailAsync(sendgrid_key, to_email, from_email, serial)
+            else:
+                future = email_manager.sendAlertEmailAsync(sendgrid_key, to_email, from_email, serial,
+                                                           notification.get('reasons'))
+            state_store = alert_settings['state_store']
+            on_sent = (lambda: self._markAlerted(state_store, [notification])) if state_store and not recovered else None
+            future.add_done_callback(self._getSendCallback(f'{kind} for {serial}', on_sent))
+            return 'queued'
+
+        try:
+            if recovered:
+                email_manager.sendRecoveryEmail(sendgrid_key, to_email, from_email, serial)
+            else:
+                email_manager.sendAlertEmail(sendgrid_key, to_email, from_email, serial, notification.get('reasons'))
+            return 'sent'
+        except Exception as e:
+            logging.error(f'Failed to send {kind} for {serial}: {e}')
+            return f'failed: {e}'
@@ -0,0 +1,137 @@
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from shared_code.models.telemetry_series import TelemetrySeries
+from shared_code.services.telemetry_aggregator import aggregateSeries
+
+# Pools are kept at module level so warm invocations reuse the worker processes
+_analyzers: Dict[int, 'ParallelAnalyzer'] = {}
+_analyzers_lock = threading.Lock()
+
+# Name, serial, sample count and extra field names of a series packed into shared memory
+SharedSeriesDescriptor = Tuple[str, str, int, Tuple[str, ...]]
+
+
+def getParallelAnalyzer(processes: int) -> 'ParallelAnalyzer':
+    """Get the process-wide analyzer with the given number of worker processes"""
+    with _analyzers_lock:
+        analyzer = _analyzers.get(processes)
+        if analyzer is None:
+            analyzer = ParallelAnalyzer(processes)
+            _analyzers[processes] = analyzer
+        return analyzer
+
+
+def packSeries(series: TelemetrySeries) -> Tuple[shared_memory.SharedMemory, SharedSeriesDescriptor]:
+    """
+    Copy a series into a new shared memory block, one float64 column after the other
+
+    The caller owns the block and must close and unlink it once the workers are done with it.
+    """
+    columns = [series.timestamps, series.power] + list(series.fields.values())
+    length = len(series)
+    block = shared_memory.SharedMemory(create=True, size=max(1, len(columns) * length * 8))
+    buffer = np.ndarray((len(columns), length), dtype=np.float64, buffer=block.buf)
+    for row, column in enumerate(columns):
+        buffer[row] = column
+    del buffer
+    return block, (block.name, series.serial, length, tuple(series.fields))
+
+
+def aggregateSharedSeriesByDay(descriptor: SharedSeriesDescriptor, alert_threshold: Optional[float]) -> Dict[str, dict]:
+    """Aggregate a series packed by packSeries per day, reading it in place (runs in the worker processes)"""
+    name, serial, length, field_names = descriptor
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        buffer = np.ndarray((2 + len(field_names), length), dtype=np.float64, buffer=block.buf)
+        series = TelemetrySeries(serial, buffer[0], buffer[1], dict(zip(field_names, buffer[2:])))
+        result = _aggregateByDay(series, alert_threshold)
+        # The block cannot be closed while arrays still point into it
+        del series, buffer
+        return result
+    finally:
+        block.close()
+
+
+def _aggregateByDay(series: TelemetrySeries, alert_threshold: Optional[float]) -> Dict[str, dict]:
+    return {str(day): aggregateSeries(day_series, alert_threshold) for day, day_series in series.splitByDay()}
+
+
+class ParallelAnalyzer:
+    """
+    Aggregates telemetry in a pool of worker processes
+
+    Aggregation is CPU-bound NumPy and Python work, so threads mostly wait on each other for the GIL.
+    Series are handed to the workers in shared memory, which costs one copy of the raw buffers instead
+    of pickling them; only the small per-day statistics travel back.
+    """
+
+    def __init__(self, processes: int):
+        """
+        Args:
+            processes: Number of worker processes
+        """
+        self.processes = max(1, int(processes))
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._broken = False
+
+    def aggregateByDay(self, series: TelemetrySeries, alert_threshold: Optional[float] = None) -> Dict[str, dict]:
+        """
+        Aggregate a series per day in a worker process
+
+        Falls back to this process if the pool cannot be used, e.g. when a worker was killed or workers cannot be
+        started; the pool is not restarted after that, so a failing pool is not respawned for every series.
+
+        Returns:
+            Statistics per 'YYYY-MM-DD' day with samples
+        """
+        if len(series) == 0:
+            return {}
+        if self._broken:
+            return _aggregateByDay(series, alert_threshold)
+
+        try:
+            block, descriptor = packSeries(series)
+        except OSError as e:
+            return self._aggregateHere(series, alert_threshold, e)
+
+        try:
+            return self._getExecutor().submit(aggregateSharedSeriesByDay, descriptor, alert_threshold).result()
+        except (BrokenProcessPool, OSError) as e:
+            return self._aggregateHere(series, alert_threshold, e)
+        finally:
+            block.close()
+            block.unlink()
+
+    def _aggregateHere(self, series: TelemetrySeries, alert_threshold: Optional[float], error: Exception) -> Dict[str, dict]:
+        logging.warning(f'Analysis pool unavailable ({error!r}), aggregating in this process from now on')
+        self._broken = True
+        self._resetExecutor()
+        return _aggregateByDay(series, alert_threshold)
+
+    def close(self) -> None:
+        """Stop the worker processes"""
+        self._resetExecutor()
+
+    def _getExecutor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # Forking would copy the parent's HTTP pools, SQLite connections and held locks into the workers
+                self._executor = ProcessPoolExecutor(max_workers=self.processes,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+                logging.info(f'Started analysis pool with {self.processes} processes')
+            return self._executor
+
+    def _resetExecutor(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,76 @@
+import datetime
+import logging
+import os
+import sqlite3
+import threading
+from typing import Dict
+
+# Days of usage kept; only today's rows are ever read
+_RETENTION_DAYS = 7
+
+
+class QuotaUsageStore:
+    """
+    Counts SolarEdge requests per API key and UTC day in SQLite, shared by every worker using the file
+
+    Each request is added with one atomic increment, so workers counting at the same time add up
+    instead of overwriting each other's counts.
+    """
+
+    def __init__(self, db_path: str):
+        """
+        Args:
+            db_path: SQLite database file holding the request counts
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock:
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS quota_usage ('
+                ' key_id TEXT NOT NULL,'
+                ' day TEXT NOT NULL,'
+                ' used INTEGER NOT NULL,'
+                ' PRIMARY KEY (key_id, day)'
+                ') WITHOUT ROWID')
+            cutoff = (datetime.datetime.utcnow() - datetime.timedelta(days=_RETENTION_DAYS)).strftime('%Y-%m-%d')
+            self._connection.execute('DELETE FROM quota_usage WHERE day < ?', (cutoff,))
+            self._connection.commit()
+
+    def getUsage(self, day: str) -> Dict[str, int]:
+        """Get the requests counted per key on a day"""
+        with self._lock:
+            rows = self._connection.execute('SELECT key_id, used FROM quota_usage WHERE day = ?', (day,)).fetchall()
+        return {key_id: used for key_id, used in rows}
+
+    def increment(self, key_id: str, day: str) -> int:
+        """
+        Count one request for a key
+
+        Returns:
+            Requests counted for the key on that day by every worker, including this one
+        """
+        with self._lock:
+            try:
+                # The insert takes the write lock, so the count read back cannot miss another worker's increment
+                self._connection.execute(
+                    'INSERT INTO quota_usage (key_id, day, used) VALUES (?, ?, 1) '
+                    'ON CONFLICT(key_id, day) DO UPDATE SET used = used + 1', (key_id, day))
+                used = self._connection.execute(
+                    'SELECT used FROM quota_usage WHERE key_id = ? AND day = ?', (key_id, day)).fetchone()[0]
+                self._connection.commit()
+            except sqlite3.Error:
+                self._connection.rollback()
+                raise
+        logging.debug(f'Request quota usage for key {key_id} on {day}: {used}')
+        return used
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,117 @@
+import json
+import logging
+import os
+import threading
+import uuid
+from typing import List, Optional
+
+from shared_code.models.check_report import CHECK_OK
+
+ARCHIVE_PARQUET = 'parquet'
+ARCHIVE_NDJSON = 'ndjson'
+ARCHIVE_FORMATS = (ARCHIVE_PARQUET, ARCHIVE_NDJSON)
+
+# Columns of the archived rows, one row per inverter and run, with their pyarrow type factory for Parquet
+ARCHIVE_COLUMNS = (
+    ('date', 'string'), ('site_id', 'string'), ('run_id', 'string'), ('serial', 'string'),
+    ('last', 'float64'), ('average', 'float64'), ('minimum', 'float64'), ('maximum', 'float64'),
+    ('p10', 'float64'), ('p50', 'float64'), ('p90', 'float64'), ('energy_wh', 'float64'),
+    ('samples', 'int64'), ('samples_below_threshold', 'int64'), ('alert', 'bool_'), ('alert_status', 'string'),
+    ('violations', 'string'), ('peer_ratio', 'float64'), ('peer_zscore', 'float64'), ('history_zscore', 'float64')
+)
+
+
+def toInverterRows(report: dict) -> List[dict]:
+    """
+    Flatten the inverters of a check or fleet report into one row per inverter with ARCHIVE_COLUMNS
+
+    Sites that did not complete are left out; per-window statistics stay in the JSON report.
+    """
+    run_id = (report.get('metrics') or {}).get('run_id')
+    sites = report['sites'] if 'sites' in report else [report]
+    rows = []
+    for site in sites:
+        if site.get('status') != CHECK_OK:
+            continue
+        for inverter in site.get('inverters', []):
+            values = dict(inverter)
+            values.update(inverter.get('percentiles') or {})
+            values.update(inverter.get('anomaly') or {})
+            values.update(date=report['date'], site_id=site.get('site_id'), run_id=run_id,
+                          violations='; '.join(inverter.get('violations') or []))
+            rows.append({name: values.get(name) for name, _ in ARCHIVE_COLUMNS})
+    return rows
+
+
+class ReportArchive:
+    """
+    Keeps every check's per-inverter results on local disk, so history can be analyzed without calling SolarEdge
+
+    Parquet archives write one file per run under a directory per day, readable as one dataset with pyarrow,
+    pandas or DuckDB. NDJSON archives append the rows to one file per day.
+    """
+
+    def __init__(self, directory: str, file_format: str = ARCHIVE_NDJSON):
+        """
+        Args:
+            directory: Directory the archive is written to
+            file_format: ARCHIVE_NDJSON or ARCHIVE_PARQUET (needs pyarrow, NDJSON is written if it is not installed)
+        """
+        if file_format not in ARCHIVE_FORMATS:
+            raise ValueError(f'reportArchiveFormat must be one of {", ".join(ARCHIVE_FORMATS)}, got {file_format!r}')
+        self.directory = directory
+        self.file_format = file_format
+        self._lock = threading.Lock()
+
+    def append(self, report: dict) -> Optional[str]:
+        """
+        Archive the inverters of a check or fleet report
+
+        Returns:
+            Path of the file written to, or None if there was nothing to archive or writing failed
+        """
+        rows = toInverterRows(report)
+        if not rows:
+            return None
+
+        try:
+            if self.file_format == ARCHIVE_PARQUET:
+                try:
+                    # pyarrow is optional and slow to import, so it is only loaded when a Parquet archive is written
+                    import pyarrow
+                    import pyarrow.parquet
+                except ImportError:
+                    logging.warning('pyarrow is not installed, archiving the report as NDJSON instead of Parquet')
+                else:
+                    return self._writeParquet(pyarrow, rows, report['date'])
+            return self._appendNdjson(rows, report['date'])
+
+        # pyarrow conversion errors derive from ValueError and TypeError
+        except (OSError, ValueError, TypeError) as e:
+            logging.warning(f'Failed to archive report for {report["date"]}: {e}')
+            return None
+
+    def _writeParquet(self, pyarrow, rows: List[dict], date: str) -> str:
+        """Write the rows of one run to a new Parquet file"""
+        schema = pyarrow.schema([(name, getattr(pyarrow, type_name)()) for name, type_name in ARCHIVE_COLUMNS])
+        directory = os.path.join(self.directory, date)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{rows[0]["run_id"] or uuid.uuid4().hex}.parquet')
+        # Written under a temporary name so readers never see a partial file
+        temporary_path = path + '.tmp'
+        pyarrow.parquet.write_table(pyarrow.Table.from_pylist(rows, schema=schema), temporary_path)
+        os.replace(temporary_path, path)
+        logging.info(f'Archived {len(rows)} inverter results to {path}')
+        return path
+
+    def _appendNdjson(self, rows: List[dict], date: str) -> str:
+        """Append the rows to the day's NDJSON file"""
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f'inverters_{date}.ndjson')
+        payload = ''.join(json.dumps(row) + '\n' for row in rows)
+        with self._lock:
+            # One write per run, so concurrent runs do not interleave their rows
+            with open(path, 'a') as f:
+                f.write(payload)
+        logging.info(f'Archived {len(rows)} inverter results to {path}')
+        return path
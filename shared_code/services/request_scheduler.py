@@ -0,0 +1,291 @@
+import asyncio
+import datetime
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Callable, Dict, Iterator, Optional
+
+from shared_code.services.quota_usage_store import QuotaUsageStore
+
+# Lower values are served first when requests for the same API key are waiting
+PRIORITY_SCHEDULED = 0
+PRIORITY_ADHOC = 1
+PRIORITY_BACKFILL = 2
+
+# Async waiters are not woken by the condition, so they re-check at least this often
+_ASYNC_POLL_SECONDS = 0.05
+# The event loop never blocks on the scheduler lock; while a thread holds it, it retries this often
+_ASYNC_LOCK_POLL_SECONDS = 0.001
+
+_scheduler: Optional['RequestScheduler'] = None
+_scheduler_lock = threading.Lock()
+
+
+class QuotaExceededError(Exception):
+    """Raised when the daily SolarEdge request quota for an API key is used up"""
+
+
+class SchedulerTimeoutError(Exception):
+    """Raised when a request waited too long for a rate-limit or concurrency slot"""
+
+
+def getRequestScheduler(**settings) -> 'RequestScheduler':
+    """Get the process-wide scheduler, creating it with the given settings on first use"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RequestScheduler(**settings)
+        return _scheduler
+
+
+class _KeyState:
+
+    def __init__(self, burst: float):
+        self.tokens = burst
+        self.last_refill = time.monotonic()
+        self.in_flight = 0
+        self.waiting: Dict[int, int] = {}
+
+
+class RequestScheduler:
+
+    def __init__(self, rate_per_second: float = 3.0, burst: int = 3, max_concurrent_per_key: int = 3,
+                 daily_quota: int = 300, reserved_quota: int = 0, max_wait_seconds: float = 60,
+                 state_path: Optional[str] = None):
+        """
+        Args:
+            rate_per_second: Sustained requests per second allowed per API key (token bucket refill rate)
+            burst: Requests per API key that may start back to back before rate limiting applies
+            max_concurrent_per_key: Requests in flight at once per API key
+            daily_quota: Requests allowed per API key per UTC day (0 disables quota accounting)
+            reserved_quota: Part of the daily quota only scheduled runs may use
+            max_wait_seconds: Longest a request waits for a slot before giving up
+            state_path: SQLite file counting quota usage across invocations and workers (in memory only if not set)
+        """
+        self.rate_per_second = max(0.001, float(rate_per_second))
+        self.burst = max(1, int(burst))
+        self.max_concurrent_per_key = max(1, int(max_concurrent_per_key))
+        self.daily_quota = int(daily_quota)
+        self.reserved_quota = max(0, int(reserved_quota))
+        self.max_wait_seconds = max_wait_seconds
+        self.state_path = state_path
+
+        self._condition = threading.Condition()
+        self._keys: Dict[str, _KeyState] = {}
+        self._store = self._openStore()
+        self._usage = self._loadUsage()
+
+    @contextmanager
+    def acquire(self, api_key: str, priority: int = PRIORITY_ADHOC) -> Iterator[None]:
+        """
+        Wait for a request slot for an API key and hold it for the duration of the block
+
+        Raises:
+            QuotaExceededError: The daily quota available to this priority is used up
+            SchedulerTimeoutError: No slot became free within max_wait_seconds
+        """
+        key_id = self._getKeyId(api_key)
+        deadline = time.monotonic() + self.max_wait_seconds
+
+        with self._condition:
+            self._checkQuota(key_id, priority)
+            state = self._keys.setdefault(key_id, _KeyState(self.burst))
+            state.waiting[priority] = state.waiting.get(priority, 0) + 1
+            try:
+                while True:
+                    wait_seconds = None
+                    higher_priority_waiting = any(count for waiting_priority, count in state.waiting.items()
+                                                  if waiting_priority < priority)
+                    if not higher_priority_waiting and state.in_flight < self.max_concurrent_per_key:
+                        self._refill(state)
+                        if state.tokens >= 1:
+                            break
+                        wait_seconds = (1 - state.tokens) / self.rate_per_second
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise SchedulerTimeoutError(f'No SolarEdge request slot available within {self.max_wait_seconds}s')
+                    self._condition.wait(min(wait_seconds, remaining) if wait_seconds is not None else remaining)
+            finally:
+                state.waiting[priority] -= 1
+                # Lower-priority waiters may be able to proceed now
+                self._condition.notify_all()
+
+            self._checkQuota(key_id, priority)
+            state.tokens -= 1
+            state.in_flight += 1
+            usage_day = self._countUsage(key_id)
+
+        try:
+            if usage_day is not None:
+                self._persistUsage(key_id, usage_day)
+            yield
+        finally:
+            with self._condition:
+                state.in_flight -= 1
+                self._condition.notify_all()
+
+    @asynccontextmanager
+    async def acquireAsync(self, api_key: str, priority: int = PRIORITY_ADHOC) -> AsyncIterator[None]:
+        """
+        Async variant of acquire that waits on the event loop instead of blocking the thread
+
+        Shares slots, rate limits and quota with acquire, so sync and async callers are scheduled together.
+        The event loop only ever tries the scheduler lock, and quota usage is written to the store in a worker
+        thread, so threads holding the lock or writing usage do not stall other coroutines.
+
+        Raises:
+            QuotaExceededError: The daily quota available to this priority is used up
+            SchedulerTimeoutError: No slot became free within max_wait_seconds
+        """
+        key_id = self._getKeyId(api_key)
+        deadline = time.monotonic() + self.max_wait_seconds
+        loop = asyncio.get_running_loop()
+
+        while not self._condition.acquire(blocking=False):
+            await asyncio.sleep(_ASYNC_LOCK_POLL_SECONDS)
+        try:
+            self._checkQuota(key_id, priority)
+            state = self._keys.setdefault(key_id, _KeyState(self.burst))
+            state.waiting[priority] = state.waiting.get(priority, 0) + 1
+        finally:
+            self._condition.release()
+
+        def stopWaiting() -> None:
+            state.waiting[priority] -= 1
+
+        def releaseSlot() -> None:
+            state.in_flight -= 1
+
+        try:
+            while True:
+                wait_seconds = _ASYNC_LOCK_POLL_SECONDS
+                if self._condition.acquire(blocking=False):
+                    try:
+                        wait_seconds = _ASYNC_POLL_SECONDS
+                        higher_priority_waiting = any(count for waiting_priority, count in state.waiting.items()
+                                                      if waiting_priority < priority)
+                        if not higher_priority_waiting and state.in_flight < self.max_concurrent_per_key:
+                            self._refill(state)
+                            if state.tokens >= 1:
+                                self._checkQuota(key_id, priority)
+                                state.tokens -= 1
+                                state.in_flight += 1
+                                usage_day = self._countUsage(key_id)
+                                break
+                            wait_seconds = (1 - state.tokens) / self.rate_per_second
+                    finally:
+                        self._condition.release()
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise SchedulerTimeoutError(f'No SolarEdge request slot available within {self.max_wait_seconds}s')
+                await asyncio.sleep(min(wait_seconds, remaining, _ASYNC_POLL_SECONDS))
+        finally:
+            self._updateFromLoop(loop, stopWaiting)
+
+        try:
+            if usage_day is not None:
+                # Written in the background; this worker's own count is already up to date in memory
+                loop.run_in_executor(None, self._persistUsage, key_id, usage_day)
+            yield
+        finally:
+            self._updateFromLoop(loop, releaseSlot)
+
+    def _updateFromLoop(self, loop: asyncio.AbstractEventLoop, update: Callable[[], None]) -> None:
+        """Apply a key state update from the event loop, in a worker thread if a thread holds the lock right now"""
+        if self._condition.acquire(blocking=False):
+            try:
+                update()
+                self._condition.notify_all()
+            finally:
+                self._condition.release()
+        else:
+            loop.run_in_executor(None, self._update, update)
+
+    def _update(self, update: Callable[[], None]) -> None:
+        with self._condition:
+            update()
+            self._condition.notify_all()
+
+    def getUsage(self, api_key: str) -> dict:
+        """Get today's quota usage for an API key"""
+        with self._condition:
+            used = self._getUsedToday(self._getKeyId(api_key))
+        return {
+            'used': used,
+            'daily_quota': self.daily_quota,
+            'remaining': max(0, self.daily_quota - used) if self.daily_quota > 0 else None
+        }
+
+    def _refill(self, state: _KeyState) -> None:
+        now = time.monotonic()
+        state.tokens = min(self.burst, state.tokens + (now - state.last_refill) * self.rate_per_second)
+        state.last_refill = now
+
+    def _checkQuota(self, key_id: str, priority: int) -> None:
+        if self.daily_quota <= 0:
+            return
+
+        limit = self.daily_quota if priority == PRIORITY_SCHEDULED else self.daily_quota - self.reserved_quota
+        used = self._getUsedToday(key_id)
+        if used >= limit:
+            raise QuotaExceededError(f'Daily SolarEdge request quota reached ({used}/{limit} for this priority)')
+
+    def _getUsedToday(self, key_id: str) -> int:
+        entry = self._usage.get(key_id)
+        if not entry or entry.get('date') != self._getToday():
+            return 0
+        return int(entry.get('used', 0))
+
+    def _countUsage(self, key_id: str) -> Optional[str]:
+        """Count a request in memory (under the lock); returns the day to add it to in the store, if there is one"""
+        if self.daily_quota <= 0:
+            return None
+
+        today = self._getToday()
+        self._usage[key_id] = {'date': today, 'used': self._getUsedToday(key_id) + 1}
+        return today if self._store is not None else None
+
+    def _persistUsage(self, key_id: str, day: str) -> None:
+        """Add a counted request to the store, outside the scheduler lock so waiting callers are not held up"""
+        try:
+            stored = self._store.increment(key_id, day)
+        except sqlite3.Error as e:
+            logging.warning(f'Failed to record request quota usage in {self.state_path}: {e}')
+            return
+
+        with self._condition:
+            entry = self._usage.get(key_id)
+            # The stored count includes requests of other workers sharing the quota
+            if entry and entry['date'] == day and stored > entry['used']:
+                entry['used'] = stored
+
+    def _getToday(self) -> str:
+        return datetime.datetime.utcnow().strftime('%Y-%m-%d')
+
+    def _getKeyId(self, api_key: str) -> str:
+        # API keys are never written to disk, only a digest of them
+        return hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16]
+
+    def _openStore(self) -> Optional[QuotaUsageStore]:
+        if not self.state_path:
+            return None
+        try:
+            return QuotaUsageStore(self.state_path)
+        except (sqlite3.Error, OSError) as e:
+            logging.warning(f'Counting request quota in memory only, cannot open {self.state_path}: {e}')
+            return None
+
+    def _loadUsage(self) -> Dict[str, dict]:
+        if self._store is None:
+            return {}
+        today = self._getToday()
+        try:
+            return {key_id: {'date': today, 'used': used} for key_id, used in self._store.getUsage(today).items()}
+        except sqlite3.Error as e:
+            logging.warning(f'Ignoring unreadable request quota state {self.state_path}: {e}')
+            return {}
@@ -0,0 +1,137 @@
+import logging
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+from requests.exceptions import RequestException
+
+# Responses worth retrying: throttling and transient server errors
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# How CircuitBreaker.allowRequest let a request through
+ADMITTED = 'admitted'
+ADMITTED_TRIAL = 'trial'
+
+_registry: Optional['CircuitBreakerRegistry'] = None
+_registry_lock = threading.Lock()
+
+
+class CircuitOpenError(RequestException):
+    """Raised instead of calling a host whose circuit breaker is open"""
+
+
+def getCircuitBreakerRegistry(**settings) -> 'CircuitBreakerRegistry':
+    """Get the process-wide circuit breaker registry, creating it with the given settings on first use"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = CircuitBreakerRegistry(**settings)
+        return _registry
+
+
+class RetryPolicy:
+
+    def __init__(self, max_retries: int = 3, backoff_base_seconds: float = 0.5, backoff_max_seconds: float = 8.0,
+                 retry_budget_seconds: float = 60.0):
+        """
+        Args:
+            max_retries: Retries after the first attempt for transient errors
+            backoff_base_seconds: Backoff ceiling for the first retry, doubled on every retry after that
+            backoff_max_seconds: Upper bound for a single backoff
+            retry_budget_seconds: No retry is started once this much time has passed since the first attempt
+        """
+        self.max_retries = max(0, int(max_retries))
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.retry_budget_seconds = retry_budget_seconds
+        self._random = random.Random()
+
+    def getDelay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Get the wait before retry number attempt (0-based), using full jitter or the server's Retry-After"""
+        if retry_after:
+            try:
+                return min(self.backoff_max_seconds, max(0.0, float(retry_after)))
+            except ValueError:
+                pass
+        ceiling = min(self.backoff_max_seconds, self.backoff_base_seconds * (2 ** attempt))
+        return self._random.uniform(0, ceiling)
+
+
+class CircuitBreaker:
+
+    def __init__(self, host: str, failure_threshold: int = 5, reset_seconds: float = 60.0):
+        """
+        Args:
+            host: Host this breaker guards
+            failure_threshold: Consecutive failures that open the circuit
+            reset_seconds: How long the circuit stays open before a single trial request is let through
+        """
+        self.host = host
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    def allowRequest(self) -> Optional[str]:
+        """
+        Check whether a request may be sent; lets one trial through once the reset period has passed
+
+        Returns:
+            ADMITTED, ADMITTED_TRIAL for the one trial request of an open circuit, or None if the request must not be sent
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return ADMITTED
+            if self._trial_in_flight or time.monotonic() - self._opened_at < self.reset_seconds:
+                return None
+            self._trial_in_flight = True
+            return ADMITTED_TRIAL
+
+    def recordSuccess(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                logging.info(f'Circuit for {self.host} closed again')
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def releaseTrial(self) -> None:
+        """End a trial request that said nothing about the host's health, so the next request can be the trial"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def recordFailure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None:
+                # Trial request failed, stay open for another period
+                self._opened_at = time.monotonic()
+            elif self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                logging.error(f'Circuit for {self.host} opened after {self._failures} consecutive failures')
+
+    def isOpen(self) -> bool:
+        with self._lock:
+            return self._opened_at is not None
+
+
+class CircuitBreakerRegistry:
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, host: str) -> CircuitBreaker:
+        """Get the circuit breaker for a host"""
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = CircuitBreaker(host, self.failure_threshold, self.reset_seconds)
+                self._breakers[host] = breaker
+            return breaker
@@ -0,0 +1,188 @@
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+CACHE_HIT = 'hit'
+CACHE_MISS = 'miss'
+CACHE_COALESCED = 'coalesced'
+
+_cache: Optional['ResultCache'] = None
+_cache_lock = threading.Lock()
+
+
+def getResultCache(**settings) -> 'ResultCache':
+    """Get the process-wide result cache, creating it with the given settings on first use"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache(**settings)
+        return _cache
+
+
+class CachedResult:
+    __slots__ = ('value', 'etag', 'expires_at', 'status')
+
+    def __init__(self, value: Any, etag: str, expires_at: float, status: str):
+        self.value = value
+        self.etag = etag
+        self.expires_at = expires_at
+        self.status = status
+
+    def getMaxAge(self) -> int:
+        """Seconds until the result expires (0 if it was not cached)"""
+        return max(0, int(self.expires_at - time.monotonic()))
+
+
+class _Flight:
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[CachedResult] = None
+        self.error: Optional[BaseException] = None
+        # Futures of coroutines waiting on the flight, resolved on their own event loop
+        self.waiters: List[asyncio.Future] = []
+
+    def finish(self) -> None:
+        self.done.set()
+        for waiter in self.waiters:
+            waiter.get_loop().call_soon_threadsafe(self._resolve, waiter)
+
+    def _resolve(self, waiter: asyncio.Future) -> None:
+        if not waiter.done():
+            waiter.set_result(None)
+
+
+class ResultCache:
+    """
+    Caches computed results by key and coalesces concurrent computations of the same key
+
+    While a key is being computed, further callers for that key wait for the same result
+    instead of starting their own computation.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        """
+        Args:
+            max_entries: Results kept before the least recently used ones are dropped
+        """
+        self.max_entries = max(1, int(max_entries))
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[str, CachedResult]' = OrderedDict()
+        self._flights: Dict[str, _Flight] = {}
+
+    def getOrCompute(self, key: str, compute: Callable[[], Tuple[Any, bool]], ttl_seconds: float,
+                     identify: Optional[Callable[[Any], Any]] = None) -> CachedResult:
+        """
+        Get the cached result for a key, or compute it once for all concurrent callers
+
+        Args:
+            key: Identifies the computation (e.g. site and date)
+            compute: Returns the value and whether it may be cached (failed runs should not be)
+            ttl_seconds: How long a cacheable value is kept (0 disables caching, coalescing still applies)
+            identify: Picks the part of the value its ETag is derived from (the whole value if not given), so values
+                that only differ in e.g. timing get the same ETag
+
+        Returns:
+            The result, with status CACHE_HIT, CACHE_MISS (computed by this caller) or CACHE_COALESCED
+        """
+        result, flight, leader = self._join(key)
+        if result is not None:
+            return result
+
+        if not leader:
+            logging.info(f'Waiting for in-flight computation of {key}')
+            flight.done.wait()
+            return self._getCoalesced(flight)
+
+        try:
+            value, cacheable = compute()
+            return self._store(key, flight, value, cacheable, ttl_seconds, identify)
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            self._land(key, flight)
+
+    async def getOrComputeAsync(self, key: str, compute: Callable[[], Awaitable[Tuple[Any, bool]]],
+                                ttl_seconds: float, identify: Optional[Callable[[Any], Any]] = None) -> CachedResult:
+        """Coroutine variant of getOrCompute; waiting for another caller's computation does not block the event loop"""
+        waiter = asyncio.get_running_loop().create_future()
+        result, flight, leader = self._join(key, waiter)
+        if result is not None:
+            return result
+
+        if not leader:
+            logging.info(f'Waiting for in-flight computation of {key}')
+            await waiter
+            return self._getCoalesced(flight)
+
+        try:
+            value, cacheable = await compute()
+            return self._store(key, flight, value, cacheable, ttl_seconds, identify)
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            self._land(key, flight)
+
+    def _join(self, key: str, waiter: Optional[asyncio.Future] = None) -> Tuple[Optional[CachedResult], Optional[_Flight], bool]:
+        """Get a cache hit, or the flight computing the key and whether this caller leads it"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    return CachedResult(entry.value, entry.etag, entry.expires_at, CACHE_HIT), None, False
+                del self._entries[key]
+
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = _Flight()
+                self._flights[key] = flight
+                return None, flight, True
+            if waiter is not None:
+                flight.waiters.append(waiter)
+            return None, flight, False
+
+    def _getCoalesced(self, flight: _Flight) -> CachedResult:
+        if flight.error is not None:
+            raise flight.error
+        result = flight.result
+        return CachedResult(result.value, result.etag, result.expires_at, CACHE_COALESCED)
+
+    def _store(self, key: str, flight: _Flight, value: Any, cacheable: bool, ttl_seconds: float,
+               identify: Optional[Callable[[Any], Any]]) -> CachedResult:
+        expires_at = time.monotonic() + ttl_seconds if cacheable and ttl_seconds > 0 else 0.0
+        result = CachedResult(value, self._getETag(value if identify is None else identify(value)), expires_at, CACHE_MISS)
+        flight.result = result
+        if expires_at:
+            with self._lock:
+                self._entries[key] = result
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return result
+
+    def _land(self, key: str, flight: _Flight) -> None:
+        # Waiters joined under the lock, so none can join once the flight is removed
+        with self._lock:
+            self._flights.pop(key, None)
+        flight.finish()
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """Drop one cached result, or all of them if no key is given"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def _getETag(self, value: Any) -> str:
+        """Weak ETag: equal for equivalent results, even if e.g. their timing differs"""
+        content = json.dumps(value, sort_keys=True, default=str)
+        return 'W/"' + hashlib.sha256(content.encode('utf-8')).hexdigest()[:32] + '"'
@@ -0,0 +1,171 @@
+import datetime
+import json
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from shared_code.models.evaluation_config import (
+    RULE_BAND, RULE_ENERGY, RULE_PEER_RATIO, RULE_POWER, EvaluationRule, EvaluationWindow)
+
+DEFAULT_WINDOWS = [{'name': 'noon', 'start': '12:00:00', 'end': '12:59:59'}]
+DEFAULT_RULES = [{'type': RULE_POWER}]
+
+
+class RuleEvaluator:
+    """
+    Evaluates inverters against rules over one or more windows of the same day
+
+    All windows are served by one fetch per inverter spanning them, and rules only read
+    per-window statistics, so adding windows or rules does not add API calls.
+    """
+
+    def __init__(self, windows: Optional[List[EvaluationWindow]] = None, rules: Optional[List[EvaluationRule]] = None):
+        """
+        Args:
+            windows: Evaluation windows; the first one is reported as the inverter's power (defaults to 12:00-12:59)
+            rules: Rules to evaluate (defaults to last or average power below the alert threshold; an empty
+                list disables rules, e.g. when only anomaly detection should raise alerts)
+
+        Raises:
+            ValueError: Windows share a name, or a rule refers to an unknown window
+        """
+        self.windows = windows or [EvaluationWindow.fromDict(window) for window in DEFAULT_WINDOWS]
+        self.rules = rules if rules is not None else [EvaluationRule.fromDict(rule) for rule in DEFAULT_RULES]
+
+        names = [window.name for window in self.windows]
+        if len(set(names)) != len(names):
+            raise ValueError(f'Evaluation window names must be unique: {", ".join(names)}')
+        for rule in self.rules:
+            unknown = [name for name in rule.windows or [] if name not in names]
+            if unknown:
+                raise ValueError(f'Evaluation rule {rule.rule_type} refers to unknown windows: {", ".join(unknown)}')
+
+    @staticmethod
+    def fromSettings(windows_json: str = '', rules_json: str = '') -> 'RuleEvaluator':
+        """Build an evaluator from the evaluationWindows and evaluationRules settings (JSON lists)"""
+        windows = [EvaluationWindow.fromDict(entry) for entry in _parseList('evaluationWindows', windows_json)]
+        rules = [EvaluationRule.fromDict(entry) for entry in _parseList('evaluationRules', rules_json)]
+        return RuleEvaluator(windows, rules if rules_json and rules_json.strip() else None)
+
+    def getPrimaryWindow(self) -> EvaluationWindow:
+        return self.windows[0]
+
+    def isSingleWindowPower(self) -> bool:
+        """Check whether only power rules on a single window are configured, so per-inverter power statistics suffice"""
+        return len(self.windows) == 1 and all(rule.rule_type == RULE_POWER for rule in self.rules)
+
+    def getFetchRange(self, date: datetime.date) -> Tuple[str, str]:
+        """Get the time range covering every window on a date"""
+        start = min(window.start for window in self.windows)
+        end = max(window.end for window in self.windows)
+        return EvaluationWindow('fetch', start, end).getRange(date)
+
+    def getRequiredFields(self) -> Tuple[str, ...]:
+        """Get the extra telemetry fields band rules read, in a stable order"""
+        return tuple(sorted({rule.params['field'] for rule in self.rules if rule.rule_type == RULE_BAND}))
+
+    def evaluate(self, window_stats: Dict[str, Dict[str, dict]], alert_threshold: float) -> Dict[str, List[str]]:
+        """
+        Evaluate every rule against per-window statistics
+
+        Args:
+            window_stats: Statistics per inverter serial and window name (see telemetry_aggregator.aggregateWindows)
+            alert_threshold: Site threshold in Watts, used by power rules without their own threshold
+
+        Returns:
+            Violated rules per inverter serial as readable reasons (empty list when all rules pass)
+        """
+        violations = {serial: [] for serial in window_stats}
+        for rule in self.rules:
+            for window in self.windows:
+                if not rule.appliesTo(window.name):
+                    continue
+                stats_by_serial = {serial: windows[window.name] for serial, windows in window_stats.items()
+                                   if window.name in windows}
+                if rule.rule_type == RULE_PEER_RATIO:
+                    self._evaluatePeerRatio(rule, window.name, stats_by_serial, violations)
+                    continue
+                for serial, stats in stats_by_serial.items():
+                    reason = self._evaluateRule(rule, window.name, stats, alert_threshold)
+                    if reason:
+                        violations[serial].append(reason)
+        return violations
+
+    def _evaluateRule(self, rule: EvaluationRule, window_name: str, stats: dict, alert_threshold: float) -> Optional[str]:
+        params = rule.params
+        if rule.rule_type == RULE_POWER:
+            threshold = float(params.get('threshold', alert_threshold))
+            if stats['last'] < threshold or stats['average'] < threshold:
+                return (f'{window_name}: power below {threshold:.0f}W '
+                        f'(last={stats["last"]:.1f}W, average={stats["average"]:.1f}W)')
+
+        elif rule.rule_type == RULE_ENERGY:
+            min_wh = float(params['min_wh'])
+            if stats['energy_wh'] < min_wh:
+                return f'{window_name}: energy {stats["energy_wh"]:.0f}Wh below {min_wh:.0f}Wh'
+
+        elif rule.rule_type == RULE_BAND:
+            field = params['field']
+            field_stats = stats.get('fields', {}).get(field)
+            if not field_stats or field_stats['samples'] == 0:
+                # No readings (e.g. the inverter was asleep) says nothing about the band
+                return None
+            low = params.get('min')
+            high = params.get('max')
+            if (low is not None and field_stats['minimum'] < float(low)) or (high is not None and field_stats['maximum'] > float(high)):
+                band = f'{"" if low is None else low}..{"" if high is None else high}'
+                return (f'{window_name}: {field} {field_stats["minimum"]:.1f}-{field_stats["maximum"]:.1f} '
+                        f'outside {band}')
+
+        return None
+
+    def _evaluatePeerRatio(self, rule: EvaluationRule, window_name: str, stats_by_serial: Dict[str, dict],
+                           violations: Dict[str, List[str]]) -> None:
+        """Compare each inverter with the median of the other inverters in the same window"""
+        if len(stats_by_serial) < 2:
+            return
+
+        metric = rule.params.get('metric', 'average')
+        min_ratio = float(rule.params['min_ratio'])
+        serials = list(stats_by_serial)
+        values = np.array([float(stats_by_serial[serial][metric]) for serial in serials], dtype=np.float64)
+
+        references = _leaveOneOutMedians(values)
+        for index, serial in enumerate(serials):
+            reference = float(references[index])
+            if reference <= 0:
+                # Peers produced nothing either; power and energy rules cover a site-wide outage
+                continue
+            ratio = values[index] / reference
+            if ratio < min_ratio:
+                violations[serial].append(f'{window_name}: {metric} at {ratio:.0%} of peer median, below {min_ratio:.0%}')
+
+
+def _leaveOneOutMedians(values: np.ndarray) -> np.ndarray:
+    """
+    Median of all other values for every value, from a single sort
+
+    Without the value at sorted position p, the remaining n - 1 values keep their sorted positions before p
+    and move down by one from p on, so a middle position at or after p is read one further along.
+    """
+    count = len(values)
+    order = np.argsort(values, kind='stable')
+    sorted_values = values[order]
+    positions = np.empty(count, dtype=np.intp)
+    positions[order] = np.arange(count)
+    low, high = (count - 2) // 2, (count - 1) // 2
+    return (sorted_values[low + (positions <= low)] + sorted_values[high + (positions <= high)]) / 2
+
+
+def _parseList(name: str, value: str) -> List[dict]:
+    if not value or not value.strip():
+        return []
+    try:
+        entries = json.loads(value)
+    except json.JSONDecodeError as e:
+        raise ValueError(f'{name} is not valid JSON: {e}')
+    if not isinstance(entries, list) or not all(isinstance(entry, dict) for entry in entries):
+        raise ValueError(f'{name} must be a JSON list of objects')
+    logging.info(f'Loaded {len(entries)} entries from {name}')
+    return entries
@@ -0,0 +1,180 @@
+import datetime
+import json
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterator, List, Optional
+
+import requests
+
+# Spans listed individually in the run record, per stage
+SLOWEST_SPANS = 5
+# Attributes summed per stage in the run record
+SUMMED_ATTRIBUTES = ('bytes', 'samples')
+
+DEFAULT_INGESTION_ENDPOINT = 'https://dc.services.visualstudio.com'
+
+
+def span(metrics: Optional['RunMetrics'], name: str, **attributes):
+    """Time a block into metrics, or do nothing if no metrics are collected"""
+    if metrics is None:
+        return nullcontext({})
+    return metrics.span(name, **attributes)
+
+
+class RunMetrics:
+
+    def __init__(self, run_name: str, **attributes):
+        """
+        Args:
+            run_name: Kind of run, e.g. checkInverterPower
+            attributes: Values describing the run (site, date, priority)
+        """
+        self.run_id = uuid.uuid4().hex
+        self.run_name = run_name
+        self.attributes = attributes
+        self.started_at = datetime.datetime.utcnow()
+        self._started = time.perf_counter()
+        self._finished: Optional[float] = None
+        self._lock = threading.Lock()
+        self._spans: List[dict] = []
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[dict]:
+        """
+        Time a block as one span of a stage
+
+        Yields:
+            The span attributes, so the block can add values it only learns while running (bytes, samples)
+        """
+        started = time.perf_counter()
+        try:
+            yield attributes
+        except Exception as e:
+            attributes['error'] = type(e).__name__
+            raise
+        finally:
+            entry = {
+                'name': name,
+                'offset_ms': (started - self._started) * 1000.0,
+                'duration_ms': (time.perf_counter() - started) * 1000.0,
+                'attributes': attributes
+            }
+            with self._lock:
+                self._spans.append(entry)
+
+    def finish(self, **attributes) -> None:
+        """Mark the run as complete, adding attributes known only at the end"""
+        self.attributes.update(attributes)
+        self._finished = time.perf_counter()
+
+    def getStages(self) -> Dict[str, dict]:
+        """Summarize spans per stage: count, total, percentiles and summed byte and sample counts"""
+        with self._lock:
+            spans = list(self._spans)
+
+        grouped: Dict[str, List[dict]] = {}
+        for entry in spans:
+            grouped.setdefault(entry['name'], []).append(entry)
+
+        stages = {}
+        for name, entries in grouped.items():
+            durations = sorted(entry['duration_ms'] for entry in entries)
+            stage = {
+                'count': len(durations),
+                'total_ms': round(sum(durations), 3),
+                'min_ms': round(durations[0], 3),
+                'p50_ms': round(self._percentile(durations, 0.5), 3),
+                'p90_ms': round(self._percentile(durations, 0.9), 3),
+                'max_ms': round(durations[-1], 3),
+                'errors': sum(1 for entry in entries if 'error' in entry['attributes'])
+            }
+            for attribute in SUMMED_ATTRIBUTES:
+                values = [entry['attributes'][attribute] for entry in entries if attribute in entry['attributes']]
+                if values:
+                    stage[attribute] = sum(values)
+            stage['slowest'] = [
+                {'duration_ms': round(entry['duration_ms'], 3), **entry['attributes']}
+                for entry in sorted(entries, key=lambda entry: entry['duration_ms'], reverse=True)[:SLOWEST_SPANS]
+            ]
+            stages[name] = stage
+        return stages
+
+    def toRecord(self) -> dict:
+        """Build the structured record of this run"""
+        finished = self._finished if self._finished is not None else time.perf_counter()
+        return {
+            'run_id': self.run_id,
+            'run': self.run_name,
+            'started_at': self.started_at.isoformat() + 'Z',
+            'duration_ms': round((finished - self._started) * 1000.0, 3),
+            'attributes': self.attributes,
+            'stages': self.getStages()
+        }
+
+    def _percentile(self, ordered: List[float], fraction: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+class AppInsightsExporter:
+
+    def __init__(self, instrumentation_key: str, ingestion_endpoint: str = DEFAULT_INGESTION_ENDPOINT, timeout: float = 5.0):
+        """
+        Args:
+            instrumentation_key: Application Insights instrumentation key
+            ingestion_endpoint: Ingestion endpoint from the connection string
+            timeout: Timeout in seconds for the export request
+        """
+        self.instrumentation_key = instrumentation_key
+        self.url = f'{ingestion_endpoint.rstrip("/")}/v2/track'
+        self.timeout = timeout
+
+    @staticmethod
+    def fromConnectionString(connection_string: str) -> Optional['AppInsightsExporter']:
+        """Build an exporter from an APPLICATIONINSIGHTS_CONNECTION_STRING value"""
+        values = dict(part.split('=', 1) for part in connection_string.split(';') if '=' in part)
+        instrumentation_key = values.get('InstrumentationKey')
+        if not instrumentation_key:
+            return None
+        return AppInsightsExporter(instrumentation_key, values.get('IngestionEndpoint') or DEFAULT_INGESTION_ENDPOINT)
+
+    def export(self, record: dict) -> None:
+        """Send a run record as Application Insights custom metrics, one aggregated metric per stage"""
+        properties = {'run_id': record['run_id'], 'run': record['run']}
+        properties.update({key: str(value) for key, value in record['attributes'].items()})
+
+        envelopes = [self._buildEnvelope(f'{record["run"]}.duration_ms', record['duration_ms'], 1,
+                                         record['duration_ms'], record['duration_ms'], properties)]
+        for name, stage in record['stages'].items():
+            envelopes.append(self._buildEnvelope(f'{record["run"]}.{name}_ms', stage['total_ms'], stage['count'],
+                                                 stage['min_ms'], stage['max_ms'], properties))
+            for attribute in SUMMED_ATTRIBUTES:
+                if attribute in stage:
+                    envelopes.append(self._buildEnvelope(f'{record["run"]}.{name}_{attribute}', stage[attribute], 1,
+                                                         stage[attribute], stage[attribute], properties))
+
+        try:
+            response = requests.post(self.url, data=json.dumps(envelopes), timeout=self.timeout,
+                                     headers={'Content-Type': 'application/json'})
+            response.raise_for_status()
+            logging.info(f'Exported {len(envelopes)} run metrics to Application Insights')
+        except requests.RequestException as e:
+            # Metrics are best effort and must never fail the run
+            logging.warning(f'Failed to export run metrics to Application Insights: {e}')
+
+    def _buildEnvelope(self, name: str, value: float, count: int, minimum: float, maximum: float, properties: dict) -> dict:
+        return {
+            'name': 'Microsoft.ApplicationInsights.Metric',
+            'time': datetime.datetime.utcnow().isoformat() + 'Z',
+            'iKey': self.instrumentation_key,
+            'data': {
+                'baseType': 'MetricData',
+                'baseData': {
+                    'ver': 2,
+                    'metrics': [{'name': name, 'kind': 1, 'value': value, 'count': count, 'min': minimum, 'max': maximum}],
+                    'properties': properties
+                }
+            }
+        }
@@ -0,0 +1,76 @@
+import logging
+import threading
+from typing import Dict, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Sessions live at module level so warm Azure Functions invocations reuse open connections
+_shared_sessions: Dict[int, requests.Session] = {}
+_shared_sessions_lock = threading.Lock()
+
+
+def getSharedSession(pool_size: int) -> requests.Session:
+    """Get the process-wide keep-alive session for the given connection pool size"""
+    with _shared_sessions_lock:
+        session = _shared_sessions.get(pool_size)
+        if session is None:
+            session = requests.Session()
+            session.mount('https://', HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size))
+            session.mount('http://', HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size))
+            session.headers.update({
+                'Accept-Encoding': 'gzip, deflate',
+                'Connection': 'keep-alive'
+            })
+            _shared_sessions[pool_size] = session
+            logging.info(f'Created shared HTTP session with pool size {pool_size}')
+        return session
+
+
+class SessionManager:
+
+    def __init__(self, pool_size: int = 10):
+        """
+        Args:
+            pool_size: Maximum number of pooled keep-alive connections per host
+        """
+        self.pool_size = max(1, int(pool_size))
+        self.session = getSharedSession(self.pool_size)
+        self.resetStats()
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """Issue a GET request over the shared session"""
+        return self.session.get(url, **kwargs)
+
+    def resetStats(self) -> None:
+        """Start a new stats window, e.g. at the beginning of a run"""
+        self._baseline = self._readCounters()
+
+    def getStats(self) -> dict:
+        """Get connection stats since the last reset"""
+        baseline_connections, baseline_requests = self._baseline
+        connections, requests_made = self._readCounters()
+
+        new_connections = max(0, connections - baseline_connections)
+        total_requests = max(0, requests_made - baseline_requests)
+        return {
+            'requests': total_requests,
+            'new_connections': new_connections,
+            'reused_connections': max(0, total_requests - new_connections)
+        }
+
+    def _readCounters(self) -> Tuple[int, int]:
+        """Sum connection and request counters across all urllib3 pools of the session"""
+        connections = 0
+        requests_made = 0
+        for adapter in self.session.adapters.values():
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                try:
+                    pool = pools[key]
+                except KeyError:
+                    # Pool was evicted between keys() and lookup
+                    continue
+                connections += pool.num_connections
+                requests_made += pool.num_requests
+        return connections, requests_made
@@ -0,0 +1,305 @@
+import datetime
+import logging
+import random
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from shared_code.models.evaluation_config import EvaluationWindow
+from shared_code.models.telemetry_series import TelemetrySeries
+
+PERCENTILES = (10, 50, 90)
+
+# Samples kept by RunningAggregator to estimate percentiles with bounded memory
+RESERVOIR_SIZE = 2048
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def toSeries(serial: str, samples: List[dict], fields: Sequence[str] = ()) -> TelemetrySeries:
+    """
+    Convert telemetry samples into a time-ordered TelemetrySeries
+
+    Args:
+        serial: Inverter serial number
+        samples: Telemetry samples from the API
+        fields: Extra numeric fields (e.g. dcVoltage, temperature) to keep next to timestamps and power
+    """
+    count = len(samples)
+    timestamps = _toTimestamps([sample.get('date') for sample in samples])
+    power = np.fromiter((_toFloat(sample.get('totalActivePower')) for sample in samples),
+                        dtype=np.float64, count=count)
+    columns = {field: np.fromiter((_toFloat(sample.get(field)) for sample in samples), dtype=np.float64, count=count)
+               for field in fields}
+
+    # Slicing by time needs ascending timestamps; the API already returns them in order
+    if np.isnan(timestamps).any() or np.any(np.diff(timestamps) < 0):
+        order = np.argsort(timestamps, kind='stable')
+        timestamps = timestamps[order]
+        power = power[order]
+        columns = {field: column[order] for field, column in columns.items()}
+
+    return TelemetrySeries(serial, timestamps, power, columns)
+
+
+def aggregateColumns(columns: Dict[str, np.ndarray], alert_threshold: Optional[float] = None) -> dict:
+    """
+    Compute power statistics for one inverter from telemetry columns
+
+    Args:
+        columns: Epoch-second 'timestamps' and 'totalActivePower' columns, e.g. from TelemetrySeries.getColumns
+        alert_threshold: Power threshold in Watts used to count low samples
+
+    Returns:
+        Dictionary with average, last, minimum, maximum, percentiles, energy and sample counts
+    """
+    # Missing power readings count as zero, matching how the API reports an idle inverter
+    power = np.nan_to_num(columns['totalActivePower'], nan=0.0)
+    count = int(power.size)
+
+    if count == 0:
+        return emptyStats()
+
+    stats = {
+        'samples': count,
+        'average': float(power.mean()),
+        'last': float(power[-1]),
+        'minimum': float(power.min()),
+        'maximum': float(power.max()),
+        'percentiles': {
+            f'p{percentile}': float(value)
+            for percentile, value in zip(PERCENTILES, np.percentile(power, PERCENTILES))
+        },
+        'energy_wh': _integrateEnergy(columns['timestamps'], power),
+        'samples_below_threshold': int(np.count_nonzero(power < alert_threshold)) if alert_threshold is not None else 0
+    }
+    return stats
+
+
+def aggregateSeries(series: TelemetrySeries, alert_threshold: Optional[float] = None) -> dict:
+    """Compute power statistics for one inverter from a TelemetrySeries"""
+    return aggregateColumns(series.getColumns(), alert_threshold)
+
+
+def aggregateFields(series: TelemetrySeries, fields: Sequence[str]) -> Dict[str, dict]:
+    """
+    Compute the range and average of extra telemetry fields, ignoring missing readings
+
+    Returns:
+        Dictionary per field with samples, minimum, maximum and average (all 0 when no readings)
+    """
+    result = {}
+    for field in fields:
+        column = series.fields.get(field)
+        values = column[~np.isnan(column)] if column is not None else np.empty(0)
+        if values.size == 0:
+            result[field] = {'samples': 0, 'minimum': 0.0, 'maximum': 0.0, 'average': 0.0}
+            continue
+        result[field] = {
+            'samples': int(values.size),
+            'minimum': float(values.min()),
+            'maximum': float(values.max()),
+            'average': float(values.mean())
+        }
+    return result
+
+
+def aggregateWindows(series: TelemetrySeries, date: datetime.date, windows: List[EvaluationWindow],
+                     alert_threshold: Optional[float] = None, fields: Sequence[str] = ()) -> Dict[str, dict]:
+    """
+    Compute statistics for several windows of a day from one series
+
+    Each window is a view of the series, so no sample is copied or parsed twice.
+
+    Returns:
+        Statistics per window name, with the range of each extra field under 'fields'
+    """
+    result = {}
+    for window in windows:
+        window_series = series.slice(*window.getRange(date))
+        stats = aggregateSeries(window_series, alert_threshold)
+        stats['fields'] = aggregateFields(window_series, fields)
+        result[window.name] = stats
+    return result
+
+
+class RunningAggregator:
+    """
+    Aggregates telemetry one sample at a time with constant memory
+
+    Produces the same statistics as aggregateColumns. Count, average, last, minimum, maximum,
+    energy and samples below threshold are exact; percentiles are estimated from a fixed-size
+    reservoir sample once a window holds more than RESERVOIR_SIZE samples.
+    """
+
+    def __init__(self, alert_threshold: Optional[float] = None):
+        self.alert_threshold = alert_threshold
+        self.samples = 0
+        self.total = 0.0
+        self.last = 0.0
+        self.minimum = 0.0
+        self.maximum = 0.0
+        self.energy_wh = 0.0
+        self.samples_below_threshold = 0
+        self.reservoir: List[float] = []
+        self._previous_timestamp: Optional[float] = None
+        self._previous_power = 0.0
+        # Seeded so repeated runs over the same data report the same percentiles
+        self._random = random.Random(0)
+
+    def update(self, sample: dict) -> None:
+        """Fold one telemetry sample into the running statistics"""
+        power = _toFloat(sample.get('totalActivePower'))
+        if power != power:
+            power = 0.0
+
+        if self.samples == 0:
+            self.minimum = power
+            self.maximum = power
+        else:
+            self.minimum = min(self.minimum, power)
+            self.maximum = max(self.maximum, power)
+
+        self.samples += 1
+        self.total += power
+        self.last = power
+        if self.alert_threshold is not None and power < self.alert_threshold:
+            self.samples_below_threshold += 1
+
+        if len(self.reservoir) < RESERVOIR_SIZE:
+            self.reservoir.append(power)
+        else:
+            index = self._random.randrange(self.samples)
+            if index < RESERVOIR_SIZE:
+                self.reservoir[index] = power
+
+        timestamp = parseTimestamp(sample.get('date'))
+        if timestamp is not None:
+            if self._previous_timestamp is not None and timestamp > self._previous_timestamp:
+                self.energy_wh += (power + self._previous_power) * (timestamp - self._previous_timestamp) / 2.0 / 3600.0
+            self._previous_timestamp = timestamp
+            self._previous_power = power
+
+    def toState(self) -> dict:
+        """Get the running statistics as a JSON-serializable dictionary, to resume with fromState later"""
+        return {
+            'alert_threshold': self.alert_threshold,
+            'samples': self.samples,
+            'total': self.total,
+            'last': self.last,
+            'minimum': self.minimum,
+            'maximum': self.maximum,
+            'energy_wh': self.energy_wh,
+            'samples_below_threshold': self.samples_below_threshold,
+            'reservoir': self.reservoir,
+            'previous_timestamp': self._previous_timestamp,
+            'previous_power': self._previous_power
+        }
+
+    @staticmethod
+    def fromState(state: dict) -> 'RunningAggregator':
+        """Resume an aggregator from toState, so new samples are folded in without revisiting old ones"""
+        aggregator = RunningAggregator(state['alert_threshold'])
+        aggregator.samples = state['samples']
+        aggregator.total = state['total']
+        aggregator.last = state['last']
+        aggregator.minimum = state['minimum']
+        aggregator.maximum = state['maximum']
+        aggregator.energy_wh = state['energy_wh']
+        aggregator.samples_below_threshold = state['samples_below_threshold']
+        aggregator.reservoir = list(state['reservoir'])
+        aggregator._previous_timestamp = state['previous_timestamp']
+        aggregator._previous_power = state['previous_power']
+        # Reseeded from the sample count so resumed runs stay deterministic
+        aggregator._random = random.Random(aggregator.samples)
+        return aggregator
+
+    def getStats(self) -> dict:
+        """Get the statistics for every sample seen so far"""
+        if self.samples == 0:
+            return emptyStats()
+
+        percentiles = np.percentile(np.array(self.reservoir, dtype=np.float64), PERCENTILES)
+        return {
+            'samples': self.samples,
+            'average': self.total / self.samples,
+            'last': self.last,
+            'minimum': self.minimum,
+            'maximum': self.maximum,
+            'percentiles': {f'p{percentile}': float(value) for percentile, value in zip(PERCENTILES, percentiles)},
+            'energy_wh': self.energy_wh,
+            'samples_below_threshold': self.samples_below_threshold
+        }
+
+
+def emptyStats() -> dict:
+    """Statistics reported for an inverter with no usable samples"""
+    return {
+        'samples': 0,
+        'average': 0.0,
+        'last': 0.0,
+        'minimum': 0.0,
+        'maximum': 0.0,
+        'percentiles': {f'p{percentile}': 0.0 for percentile in PERCENTILES},
+        'energy_wh': 0.0,
+        'samples_below_threshold': 0
+    }
+
+
+def _integrateEnergy(timestamps: np.ndarray, power: np.ndarray) -> float:
+    """Trapezoidal integral of power over time, in Watt-hours"""
+    valid = ~np.isnan(timestamps)
+    if np.count_nonzero(valid) < 2:
+        return 0.0
+
+    seconds = timestamps[valid]
+    watts = power[valid]
+    if np.any(np.diff(seconds) < 0):
+        logging.warning('Telemetry samples are out of order, sorting before integrating energy')
+        order = np.argsort(seconds, kind='stable')
+        seconds = seconds[order]
+        watts = watts[order]
+
+    return float(np.sum((watts[1:] + watts[:-1]) * np.diff(seconds)) / 2.0 / 3600.0)
+
+
+def _toTimestamps(dates: List[Optional[str]]) -> np.ndarray:
+    """Parse 'YYYY-MM-DD HH:MM:SS' strings into epoch seconds, NaN where missing or invalid"""
+    try:
+        parsed = np.array([date or 'NaT' for date in dates], dtype='datetime64[s]')
+    except ValueError:
+        parsed = np.array([_toDatetime(date) for date in dates], dtype='datetime64[s]')
+
+    timestamps = parsed.astype('int64').astype('float64')
+    timestamps[np.isnat(parsed)] = np.nan
+    return timestamps
+
+
+def _toDatetime(date: Optional[str]) -> np.datetime64:
+    try:
+        return np.datetime64(date or 'NaT', 's')
+    except ValueError:
+        return np.datetime64('NaT', 's')
+
+
+def parseTimestamp(date: Optional[str]) -> Optional[float]:
+    """Parse a 'YYYY-MM-DD HH:MM:SS' string into epoch seconds (UTC-naive, like _toTimestamps)"""
+    if not date:
+        return None
+    try:
+        parsed = datetime.datetime.strptime(date, '%Y-%m-%d %H:%M:%S')
+    except (TypeError, ValueError):
+        return None
+    return (parsed - _EPOCH).total_seconds()
+
+
+def formatTimestamp(timestamp: float) -> str:
+    """Format epoch seconds from parseTimestamp back into a 'YYYY-MM-DD HH:MM:SS' string"""
+    return (_EPOCH + datetime.timedelta(seconds=timestamp)).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _toFloat(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
@@ -0,0 +1,103 @@
+import datetime
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, Optional
+
+from shared_code.models.telemetry_series import TelemetrySeries
+
+# Stores are kept open at module level so warm invocations reuse the SQLite connection
+_stores: Dict[str, 'TelemetryStore'] = {}
+_stores_lock = threading.Lock()
+
+
+def getTelemetryStore(db_path: str, finalize_after_hours: float = 24) -> 'TelemetryStore':
+    """Get the process-wide telemetry store for a database file"""
+    with _stores_lock:
+        store = _stores.get(db_path)
+        if store is None:
+            store = TelemetryStore(db_path, finalize_after_hours)
+            _stores[db_path] = store
+        store.finalize_after_hours = finalize_after_hours
+        return store
+
+
+class TelemetryStore:
+
+    def __init__(self, db_path: str, finalize_after_hours: float = 24):
+        """
+        Args:
+            db_path: SQLite database file holding fetched telemetry as timestamp and power columns
+            finalize_after_hours: Hours after a window ends before its data is treated as final and cached
+        """
+        self.db_path = db_path
+        self.finalize_after_hours = finalize_after_hours
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock:
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS telemetry_series ('
+                ' site_id TEXT NOT NULL,'
+                ' serial TEXT NOT NULL,'
+                ' start_time TEXT NOT NULL,'
+                ' end_time TEXT NOT NULL,'
+                ' fetched_at REAL NOT NULL,'
+                ' samples INTEGER NOT NULL,'
+                ' payload BLOB NOT NULL,'
+                ' PRIMARY KEY (site_id, serial, start_time, end_time)'
+                ') WITHOUT ROWID')
+            self._connection.commit()
+
+    def isFinalized(self, end_datetime: str) -> bool:
+        """Check whether a window ended long enough ago that SolarEdge will not change its data"""
+        try:
+            window_end = datetime.datetime.strptime(end_datetime, '%Y-%m-%d %H:%M:%S')
+        except ValueError:
+            return False
+        # Window times are site-local; the margin covers timezone offsets and late uploads
+        return window_end + datetime.timedelta(hours=self.finalize_after_hours) <= datetime.datetime.utcnow()
+
+    def get(self, site_id: str, serial: str, start_datetime: str, end_datetime: str) -> Optional[TelemetrySeries]:
+        """Get stored telemetry for an inverter window, or None if it was never stored"""
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT samples, payload FROM telemetry_series '
+                'WHERE site_id = ? AND serial = ? AND start_time = ? AND end_time = ?',
+                (site_id, serial, start_datetime, end_datetime)).fetchone()
+
+        if row is None:
+            return None
+
+        samples, payload = row
+        try:
+            series = TelemetrySeries.fromBytes(serial, zlib.decompress(payload))
+        except zlib.error as e:
+            logging.warning(f'Ignoring corrupt stored telemetry for inverter {serial}: {e}')
+            return None
+        if len(series) != samples:
+            logging.warning(f'Ignoring truncated stored telemetry for inverter {serial}')
+            return None
+        return series
+
+    def put(self, site_id: str, serial: str, start_datetime: str, end_datetime: str, series: TelemetrySeries) -> None:
+        """Store telemetry for an inverter window"""
+        payload = zlib.compress(series.toBytes())
+        with self._lock:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO telemetry_series (site_id, serial, start_time, end_time, fetched_at, samples, payload) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (site_id, serial, start_datetime, end_datetime, time.time(), len(series), payload))
+            self._connection.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
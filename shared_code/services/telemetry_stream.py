@@ -0,0 +1,64 @@
+import codecs
+import json
+import re
+from typing import Iterable, Iterator
+
+# Matches the opening of the telemetry array: "telemetries" : [
+_TELEMETRIES_START = re.compile(r'"telemetries"\s*:\s*\[')
+_WHITESPACE = ' \t\r\n'
+
+
+def iterTelemetries(chunks: Iterable[bytes]) -> Iterator[dict]:
+    """
+    Incrementally parse the telemetries array of an equipment data response
+
+    Only the current partial sample is buffered, so memory stays flat no matter how many
+    samples the response holds.
+
+    Args:
+        chunks: Raw response body chunks, e.g. from response.iter_content()
+
+    Yields:
+        Telemetry samples in response order
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    in_array = False
+    finished = False
+
+    for chunk in chunks:
+        if finished:
+            break
+
+        buffer += text_decoder.decode(chunk)
+
+        if not in_array:
+            match = _TELEMETRIES_START.search(buffer)
+            if match is None:
+                # Keep a short tail in case the key is split across chunks
+                buffer = buffer[-64:]
+                continue
+            buffer = buffer[match.end():]
+            in_array = True
+
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in _WHITESPACE + ',':
+                position += 1
+            if position >= len(buffer):
+                break
+            if buffer[position] == ']':
+                finished = True
+                break
+            try:
+                sample, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # Sample is incomplete, wait for the next chunk
+                break
+            yield sample
+
+        buffer = buffer[position:]
+
+    if in_array and not finished:
+        raise ValueError('Telemetry response ended before the telemetries array was closed')